@@ -1,7 +1,39 @@
-import requests
 import json
-import time
 import auth
+import batchEnrich
+import workerPool
+import zoominfoClient
+from contactEnrich import CONTACT_ENRICH_URL, CONTACT_OUTPUT_FIELDS
+
+
+def build_new_contact_input(entry):
+    """
+    Builds the matchPersonInput element for an entry with a found personId.
+
+    Args:
+        entry (dict): A dictionary containing contact information.
+
+    Returns:
+        dict: The match input for the entry.
+    """
+
+    return {"personId": entry["personId"]}
+
+
+def build_new_contact_payload(entry):
+    """
+    Builds the contact enrich request payload for an entry with a found personId.
+
+    Args:
+        entry (dict): A dictionary containing contact information.
+
+    Returns:
+        dict: The request payload.
+    """
+
+    return batchEnrich.build_batch_payload(
+        [entry], build_new_contact_input, "matchPersonInput", CONTACT_OUTPUT_FIELDS
+    )
 
 
 def get_new_contact_data(entry, jwt_token):
@@ -20,21 +52,13 @@ def get_new_contact_data(entry, jwt_token):
         dict or None: A dictionary containing enriched contact information, or None if there was an error.
     """
 
-    url = "https://api.zoominfo.com/enrich/contact"
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {jwt_token}",
-    }
+    url = CONTACT_ENRICH_URL
 
-    match_person_input = {"personId": entry["personId"]}
+    payload = build_new_contact_payload(entry)
 
-    payload = {
-        "matchPersonInput": [match_person_input],
-        "outputFields": ["firstName", "lastName", "email", "phone", "jobTitle"],
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
+    response = zoominfoClient.get_client().post(
+        url, jwt_token=jwt_token, json=payload
+    )
 
     if response.status_code != 200:  # 200 is the HTTP status code for 'OK'
         print(f"Error: Received status code {response.status_code}")
@@ -74,51 +98,85 @@ def update_new_contact_data(entry, new_data_item):
     return entry
 
 
-def add_new_contact(input_filename, jwt_token, last_auth_time, username, password):
+def add_new_contact_records(
+    data,
+    jwt_token,
+    last_auth_time,
+    username,
+    password,
+    workers=1,
+    batch_size=batchEnrich.MAX_BATCH_SIZE,
+):
     """
-    Adds new contact data to the existing data in the input file.
+    Adds new contact data to every record with a found personId, in place.
 
     Args:
-        input_filename (str): The path to the input file.
+        data (list): The records to update.
         jwt_token (str): The JWT token for authentication.
         last_auth_time (float): The timestamp of the last authentication.
         username (str): The username for authentication.
         password (str): The password for authentication.
+        workers (int): The number of requests sent concurrently.
+        batch_size (int): The number of records updated per request.
 
     Returns:
         tuple: A tuple containing the updated JWT token and last authentication time.
     """
 
-    with open(input_filename, "r", encoding="utf-8") as file:
-        old_data = json.load(file)
+    tokens = auth.TokenRefresher(username, password, jwt_token, last_auth_time)
+    progress = workerPool.ProgressCounter("Contacts updated")
+
+    found_contacts = [
+        entry
+        for entry in data
+        if entry.get("needsContact") == "Yes" and entry.get("personId")
+    ]
+    results = batchEnrich.enrich_in_batches(
+        CONTACT_ENRICH_URL,
+        found_contacts,
+        build_new_contact_input,
+        "matchPersonInput",
+        CONTACT_OUTPUT_FIELDS,
+        tokens.get_token,
+        batch_size=batch_size,
+        workers=workers,
+        progress=progress,
+    )
+
+    for entry, result in zip(found_contacts, results):
+        try:
+            if result:
+                update_new_contact_data(entry, result)
 
-    merged_data = []
-    processed_records = 0
+        except IndexError as e:
+            print(f"Error processing record: {entry}. Error: {e}")
 
-    for entry in old_data:
+    return tokens.jwt_token, tokens.last_auth_time
 
-        if time.time() - last_auth_time >= 55 * 60:
-            jwt_token = auth.authenticate(username, password)
-            last_auth_time = time.time()
 
-        try:
-            if entry.get("needsContact") == "Yes" and entry.get("personId"):
-                new_data = get_new_contact_data(entry, jwt_token)
-                if new_data and new_data.get("success"):
-                    entry = update_new_contact_data(
-                        entry, new_data["data"]["result"][0]
-                    )
-                    processed_records += 1
-                    print(
-                        f"\rContacts updated: {processed_records}", end="", flush=True
-                    )
+def add_new_contact(input_filename, jwt_token, last_auth_time, username, password):
+    """
+    Adds new contact data to the existing data in the input file.
 
-        except IndexError as e:
-            print(f"Error processing record: {entry}. Error: {e}")
+    Args:
+        input_filename (str): The path to the input file.
+        jwt_token (str): The JWT token for authentication.
+        last_auth_time (float): The timestamp of the last authentication.
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+
+    Returns:
+        tuple: A tuple containing the updated JWT token and last authentication time.
+    """
+
+    with open(input_filename, "r", encoding="utf-8") as file:
+        data = json.load(file)
 
-        merged_data.append(entry)
+    jwt_token, last_auth_time = add_new_contact_records(
+        data, jwt_token, last_auth_time, username, password
+    )
 
     with open(input_filename, "w", encoding="utf-8") as file:
-        json.dump(merged_data, file, indent=4, ensure_ascii=False)
+        json.dump(data, file, indent=4, ensure_ascii=False)
 
     return jwt_token, last_auth_time
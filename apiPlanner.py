@@ -0,0 +1,369 @@
+import argparse
+import csv
+import math
+import os
+import batchEnrich
+import companyDedup
+import companyEnrich
+import contactEnrich
+import contactSearch
+import fileConvert
+import negativeCache
+import rateLimiter
+import responseCache
+
+# Per-record API call planner and dry-run cost estimator.
+
+# - plan_record decides, for every API stage, whether a record will call the API or why
+#   it will not: no contact fields to enrich from, a company that is already enriched or
+#   shares a lookup with an earlier row, an answer already in the response cache, or an
+#   input the negative cache knows has no match.
+# - The enrichment stages use the same checks, so calls that cannot succeed are skipped
+#   in real runs too.
+# - estimate turns the plans into requests, credits and wall-clock time per stage. Request
+#   counts are upper bounds: every non-strict company lookup and every cascade step is
+#   assumed to be needed, and in single search mode every page is assumed to come back
+#   incomplete and fall back to the cascade.
+# - Contact searches are counted per search key, as SearchMemo shares them: per location
+#   ID and per company ID. Rows that are not enriched yet have no IDs, so each company
+#   lookup (companyDedup.company_key) is assumed to resolve to its own location and
+#   company.
+# - plan_records and estimate stream the records and keep only the search keys, so a
+#   dry run does not hold the file in memory.
+#
+# Dry run from the command line:
+#     python apiPlanner.py input.csv --concurrency 100 --plan plan.csv
+
+STAGES = ["contact_enrich", "company_enrich", "contact_search", "add_new_contact"]
+
+# Credits charged per record a stage enriches. Searches are free; enrich calls are not.
+CREDITS_PER_RECORD = {
+    "contact_enrich": 1,
+    "company_enrich": 1,
+    "contact_search": 0,
+    "add_new_contact": 1,
+}
+
+# Average time a ZoomInfo request takes, used for the wall-clock estimate.
+DEFAULT_LATENCY = 0.5
+
+CALL = "call"
+CALL_IF_FOUND = "call if a contact is found"
+CACHED = "cached"
+SHARED = "shared with an earlier row"
+NO_CONTACT_FIELDS = "skip: no contact fields"
+HAS_CONTACT = "skip: has contact fields"
+ALREADY_ENRICHED = "skip: company already enriched"
+KNOWN_NO_MATCH = "skip: known no match"
+NO_SEARCH = "skip: no contact search"
+NO_COMPANY = "skip: no company to search"
+
+
+def _is_cached(cache, url, input_key, match_input, output_fields):
+    if cache is None:
+        return False
+    return cache.contains(
+        cache.endpoint(url), {input_key: match_input, "outputFields": output_fields}
+    )
+
+
+def search_keys(entry):
+    """
+    Returns the keys the contact searches of a record are shared under.
+
+    Args:
+        entry (dict): The record.
+
+    Returns:
+        tuple: The location key and the company key, each None when the cascade skips those
+        steps, or None if the record has nothing to search by.
+    """
+    company_id = entry.get("zi_c_company_id")
+    location_id = entry.get("zi_c_location_id")
+    if company_id or location_id:
+        return (
+            ("location", str(location_id)) if location_id else None,
+            ("company", str(company_id)) if company_id else None,
+        )
+
+    # Not enriched yet: the company lookup decides both IDs
+    company_key = companyDedup.company_key(entry)
+    if company_key is None:
+        return None
+    return ("lookup",) + company_key, ("lookup",) + company_key
+
+
+def plan_record(entry, seen_companies, seen_searches, cache=None, no_matches=None):
+    """
+    Plans the API calls of one record.
+
+    Args:
+        entry (dict): The record.
+        seen_companies (set): Company keys planned by earlier records; updated in place.
+        seen_searches (set): search_keys of earlier records; updated in place.
+        cache (ResponseCache): The response cache to check, if any.
+        no_matches (NegativeCache): The negative cache to check, if any.
+
+    Returns:
+        dict: The action of every stage in STAGES.
+    """
+    plan = {}
+
+    if not contactEnrich.has_contact_fields(entry):
+        plan["contact_enrich"] = NO_CONTACT_FIELDS
+    elif _is_cached(
+        cache,
+        contactEnrich.CONTACT_ENRICH_URL,
+        "matchPersonInput",
+        contactEnrich.build_contact_input(entry),
+        contactEnrich.CONTACT_OUTPUT_FIELDS,
+    ):
+        plan["contact_enrich"] = CACHED
+    else:
+        plan["contact_enrich"] = CALL
+
+    company_key = companyDedup.company_key(entry)
+    if companyEnrich.is_company_enriched(entry):
+        plan["company_enrich"] = ALREADY_ENRICHED
+    elif company_key is not None and company_key in seen_companies:
+        plan["company_enrich"] = SHARED
+    elif no_matches is not None and no_matches.contains(
+        negativeCache.COMPANY, company_key
+    ):
+        plan["company_enrich"] = KNOWN_NO_MATCH
+    elif _is_cached(
+        cache,
+        companyEnrich.COMPANY_ENRICH_URL,
+        "matchCompanyInput",
+        companyEnrich.build_company_input(entry, True),
+        companyEnrich.COMPANY_OUTPUT_FIELDS,
+    ):
+        plan["company_enrich"] = CACHED
+    else:
+        plan["company_enrich"] = CALL
+    if company_key is not None:
+        seen_companies.add(company_key)
+
+    # Only rows without any contact field are searched (see jsonParser.update_needs_contact_records).
+    has_contact = contactEnrich.has_contact_fields(entry)
+    keys = search_keys(entry)
+    if has_contact:
+        plan["contact_search"] = HAS_CONTACT
+        plan["add_new_contact"] = NO_SEARCH
+    elif keys is None:
+        plan["contact_search"] = NO_COMPANY
+        plan["add_new_contact"] = NO_SEARCH
+    elif keys in seen_searches:
+        plan["contact_search"] = SHARED
+        plan["add_new_contact"] = CALL_IF_FOUND
+    elif no_matches is not None and no_matches.contains(
+        negativeCache.CONTACT_SEARCH, contactSearch.no_match_key(entry)
+    ):
+        plan["contact_search"] = KNOWN_NO_MATCH
+        plan["add_new_contact"] = NO_SEARCH
+    else:
+        plan["contact_search"] = CALL
+        plan["add_new_contact"] = CALL_IF_FOUND
+    if plan["contact_search"] == CALL:
+        seen_searches.add(keys)
+
+    return plan
+
+
+def plan_records(records, cache=None, no_matches=None):
+    """
+    Plans the API calls of every record.
+
+    Args:
+        records (iterable): The records, in file order.
+        cache (ResponseCache): The response cache to check, if any.
+        no_matches (NegativeCache): The negative cache to check, if any.
+
+    Yields:
+        tuple: The record and its plan, one record at a time.
+    """
+    seen_companies = set()
+    seen_searches = set()
+    for entry in records:
+        yield entry, plan_record(entry, seen_companies, seen_searches, cache, no_matches)
+
+
+def estimate(
+    plans,
+    concurrency=1,
+    rate=None,
+    batch_size=batchEnrich.MAX_BATCH_SIZE,
+    search_mode=None,
+    latency=DEFAULT_LATENCY,
+):
+    """
+    Estimates the requests, credits and wall-clock time of a run.
+
+    Args:
+        plans (iterable): The (record, plan) pairs from plan_records, consumed once.
+        concurrency (int): The number of requests in flight at once.
+        rate (float): The request rate limit per second. Defaults to ZOOMINFO_RATE_LIMIT.
+        batch_size (int): The number of records per batched enrich request.
+        search_mode (str): The contact search mode. Defaults to ZOOMINFO_CONTACT_SEARCH_MODE.
+        latency (float): The average request latency in seconds.
+
+    Returns:
+        dict: Per-stage "records", "requests" and "credits", the totals, and "seconds".
+    """
+    if rate is None:
+        rate = float(os.environ.get("ZOOMINFO_RATE_LIMIT", rateLimiter.DEFAULT_RATE))
+    search_mode = contactSearch.get_search_mode(search_mode)
+
+    rows = 0
+    calls = {stage: 0 for stage in STAGES}
+    locations = set()
+    companies = set()
+    for entry, plan in plans:
+        rows += 1
+        for stage in STAGES:
+            if plan[stage] in (CALL, CALL_IF_FOUND):
+                calls[stage] += 1
+        if plan["contact_search"] == CALL:
+            location, company = search_keys(entry)
+            locations.add(location)
+            companies.add(company)
+    locations.discard(None)
+    companies.discard(None)
+
+    # Strict and loose steps per location and per company.
+    search_requests = 2 * len(locations) + 2 * len(companies)
+    if search_mode == "single":
+        # One page per company, and the cascade when a page cannot decide.
+        search_requests += len(companies)
+
+    requests = {
+        "contact_enrich": math.ceil(calls["contact_enrich"] / batch_size),
+        # A strict batch, then at most as many non-strict batches.
+        "company_enrich": 2 * math.ceil(calls["company_enrich"] / batch_size),
+        "contact_search": search_requests,
+        "add_new_contact": math.ceil(calls["add_new_contact"] / batch_size),
+    }
+
+    summary = {
+        "rows": rows,
+        "stages": {
+            stage: {
+                "records": calls[stage],
+                "requests": requests[stage],
+                "credits": calls[stage] * CREDITS_PER_RECORD[stage],
+            }
+            for stage in STAGES
+        },
+    }
+    summary["requests"] = sum(requests.values())
+    summary["credits"] = sum(stage["credits"] for stage in summary["stages"].values())
+    throughput = min(rate, concurrency / latency)
+    summary["seconds"] = summary["requests"] / throughput if throughput else 0.0
+    return summary
+
+
+def format_estimate(summary):
+    """
+    Formats a dry-run summary for printing.
+
+    Args:
+        summary (dict): The summary from estimate.
+
+    Returns:
+        str: The summary table.
+    """
+    lines = [f"Dry run for {summary['rows']} rows:"]
+    for stage, counts in summary["stages"].items():
+        lines.append(
+            f"  {stage:<16} {counts['records']:>8} records  "
+            f"{counts['requests']:>8} requests  {counts['credits']:>8} credits"
+        )
+    minutes, seconds = divmod(round(summary["seconds"]), 60)
+    lines.append(
+        f"  Total: up to {summary['requests']} requests and {summary['credits']} "
+        f"credits, about {minutes}m {seconds:02d}s"
+    )
+    return "\n".join(lines)
+
+
+def _write_plan_rows(plans, csv_file):
+    """
+    Writes each plan to a plan CSV file as it passes through.
+
+    Args:
+        plans (iterable): The (record, plan) pairs from plan_records.
+        csv_file (file): The open plan CSV file.
+
+    Yields:
+        tuple: The same (record, plan) pairs.
+    """
+    writer = csv.writer(csv_file)
+    writer.writerow(["Row", "Supplier Company"] + STAGES)
+    for row, (entry, plan) in enumerate(plans, start=1):
+        writer.writerow([row, entry.get("companyName")] + [plan[s] for s in STAGES])
+        yield entry, plan
+
+
+def write_plan(plans, output_path):
+    """
+    Writes the per-record plan as a CSV file.
+
+    Args:
+        plans (iterable): The (record, plan) pairs from plan_records.
+        output_path (str): The path of the plan CSV file.
+    """
+    with open(output_path, "w", newline="", encoding="utf-8-sig") as csv_file:
+        for _ in _write_plan_rows(plans, csv_file):
+            pass
+
+
+def dry_run(input_csv, concurrency=1, plan_path=None, search_mode=None):
+    """
+    Plans a run over an input CSV file without calling the API.
+
+    Args:
+        input_csv (str): The path of the input CSV file.
+        concurrency (int): The number of requests in flight at once.
+        plan_path (str): Where to write the per-record plan, if anywhere.
+        search_mode (str): The contact search mode. Defaults to ZOOMINFO_CONTACT_SEARCH_MODE.
+
+    Returns:
+        dict: The summary from estimate.
+    """
+    plans = plan_records(
+        fileConvert.iter_csv_records(input_csv, strip_values=True),
+        responseCache.get_cache(),
+        negativeCache.get_cache(),
+    )
+    if not plan_path:
+        return estimate(plans, concurrency, search_mode=search_mode)
+
+    with open(plan_path, "w", newline="", encoding="utf-8-sig") as csv_file:
+        return estimate(
+            _write_plan_rows(plans, csv_file), concurrency, search_mode=search_mode
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate the ZoomInfo requests and credits of an enrichment run."
+    )
+    parser.add_argument("input_csv", help="The input CSV file.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("ENRICHMENT_CONCURRENCY", 1)),
+        help="The number of requests in flight at once.",
+    )
+    parser.add_argument("--plan", help="Write the per-record plan to this CSV file.")
+    parser.add_argument(
+        "--search-mode", choices=contactSearch.SEARCH_MODES, help="Contact search mode."
+    )
+    args = parser.parse_args()
+
+    summary = dry_run(args.input_csv, args.concurrency, args.plan, args.search_mode)
+    print(format_estimate(summary))
+
+
+if __name__ == "__main__":
+    main()
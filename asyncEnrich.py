@@ -0,0 +1,662 @@
+import asyncio
+import functools
+import json
+import aiohttp
+import addNewContact
+import batchEnrich
+import companyEnrich
+import contactEnrich
+import contactSearch
+import rateLimiter
+import responseCache
+import workerPool
+import zoominfoClient
+
+# asyncio enrichment engine.
+
+# - AsyncZoomInfoClient keeps one aiohttp session with a keep-alive connector and a
+#   semaphore, so hundreds of requests can be in flight on a single thread. Requests are
+#   paced by the same adaptive rate limiter and served from the same response cache as
+#   the threaded client.
+# - The response cache and the negative cache are SQLite lookups, so they run on worker
+#   threads (asyncio.to_thread) instead of stalling every request in flight on the loop.
+# - Each API stage (company-master enrich, contact enrich, contact search and personId
+#   enrich) is a coroutine per record or per batch that reuses the payload builders and
+#   update functions of the threaded modules, so both engines produce the same records.
+# - AsyncStageRunner owns the event loop and the session, so a caller can run many
+#   windows or stages through the same open connections.
+
+DEFAULT_CONCURRENCY = 100
+
+
+class AsyncResponse:
+    """
+    The status and body of a completed request.
+    """
+
+    __slots__ = ("status_code", "text")
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text) if self.text else None
+
+
+class AsyncZoomInfoClient:
+    """
+    asyncio-native ZoomInfo client with a bounded number of in-flight requests.
+    """
+
+    def __init__(
+        self,
+        concurrency=DEFAULT_CONCURRENCY,
+        timeout=zoominfoClient.DEFAULT_TIMEOUT,
+        rate_limiter=None,
+        cache=None,
+    ):
+        """
+        Initialize the client. The session is opened by entering the client as an async context manager.
+
+        Args:
+            concurrency (int): The maximum number of requests in flight at once.
+            timeout (tuple): The (connect, read) timeout in seconds.
+            rate_limiter (AdaptiveRateLimiter): The limiter to pace requests with. Defaults to the shared one.
+            cache (ResponseCache): The response cache to use. Defaults to the shared one, if enabled.
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or rateLimiter.get_limiter()
+        self.cache = cache or responseCache.get_cache()
+        self.session = None
+        self._semaphore = None
+        self._auth = (None, None)
+
+        # tokenManager.TokenManager used to replace tokens the API rejects.
+        self.token_manager = None
+
+    async def __aenter__(self):
+        connect_timeout, read_timeout = self.timeout
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def auth_headers(self, jwt_token):
+        token, headers = self._auth
+        if jwt_token != token:
+            headers = {"Authorization": f"Bearer {jwt_token}"}
+            self._auth = (jwt_token, headers)
+        return headers
+
+    async def post(self, url, jwt_token=None, json=None):
+        """
+        Sends a POST request once the rate limiter and a request slot allow it, unless the
+        response cache answers it. Throttled (429) requests are retried after the Retry-After, and a 401 is retried
+        once with a refreshed token when a token manager is registered.
+
+        Args:
+            url (str): The request URL.
+            jwt_token (str): The JWT token to authorize with, if any.
+            json (dict): The JSON payload.
+
+        Returns:
+            AsyncResponse: The status and body of the response.
+        """
+        cached = None
+        if self.cache is not None and json is not None:
+            cached = await asyncio.to_thread(self.cache.request, url, json)
+            if cached is not None:
+                if cached.payload is None:
+                    return cached.cached_response()
+                json = cached.payload
+
+        response = await self._send(url, jwt_token, json)
+
+        if response.status_code == 401 and jwt_token and self.token_manager:
+            new_token = await asyncio.to_thread(self.token_manager.refresh, jwt_token)
+            if new_token and new_token != jwt_token:
+                response = await self._send(url, new_token, json)
+
+        if cached is None:
+            return response
+        return await asyncio.to_thread(cached.complete, response)
+
+    async def _send(self, url, jwt_token, json):
+        headers = self.auth_headers(jwt_token) if jwt_token else None
+
+        for attempt in range(rateLimiter.MAX_THROTTLE_RETRIES + 1):
+            delay = self.rate_limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            async with self._semaphore:
+                async with self.session.post(
+                    url, json=json, headers=headers
+                ) as response:
+                    result = AsyncResponse(response.status, await response.text())
+                    retry_after = response.headers.get("Retry-After")
+
+            if result.status_code != 429:
+                self.rate_limiter.on_success()
+                return result
+
+            self.rate_limiter.on_throttle(
+                rateLimiter.throttle_delay(
+                    rateLimiter.parse_retry_after(retry_after), attempt
+                )
+            )
+
+        return result
+
+
+class AsyncTokenSource:
+    """
+    Awaitable view of a tokenManager.TokenManager.
+    A blocking refresh runs in a worker thread while other coroutines wait on a lock.
+    """
+
+    def __init__(self, token_manager):
+        """
+        Initialize the token source.
+
+        Args:
+            token_manager (TokenManager): The manager that caches and refreshes the token.
+        """
+        self.token_manager = token_manager
+        self._lock = None
+
+    async def get_token(self):
+        """
+        Returns a current JWT token.
+
+        Returns:
+            str: The JWT token.
+        """
+        if self.token_manager.needs_refresh():
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                return await asyncio.to_thread(self.token_manager.get_token)
+        return self.token_manager.get_token()
+
+
+def _mark_failed(entry, message):
+    entry["enrichmentStatus"] = "Failed"
+    entry["errorMessage"] = message
+
+
+async def _for_each_in_thread(function, entries):
+    """
+    Runs a negative-cache check or update for every entry in one worker thread.
+    """
+    if not entries:
+        return []
+    return await asyncio.to_thread(lambda: [function(entry) for entry in entries])
+
+
+async def _post_batch(
+    client,
+    tokens,
+    url,
+    entries,
+    build_input,
+    input_key,
+    output_fields,
+    fallback_input=None,
+):
+    """
+    Sends one batch of inputs, splitting it when the API rejects it.
+
+    Returns:
+        list: One result per entry, or None where the entry was not matched or failed.
+    """
+    payload = batchEnrich.build_batch_payload(
+        entries, build_input, input_key, output_fields
+    )
+    try:
+        response = await client.post(
+            url, jwt_token=await tokens.get_token(), json=payload
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        batchEnrich.mark_failed(entries, str(e) or type(e).__name__)
+        return [None] * len(entries)
+
+    if response.status_code == 400 and len(entries) > 1:
+        middle = len(entries) // 2
+        halves = await asyncio.gather(
+            _post_batch(
+                client,
+                tokens,
+                url,
+                entries[:middle],
+                build_input,
+                input_key,
+                output_fields,
+                fallback_input,
+            ),
+            _post_batch(
+                client,
+                tokens,
+                url,
+                entries[middle:],
+                build_input,
+                input_key,
+                output_fields,
+                fallback_input,
+            ),
+        )
+        return halves[0] + halves[1]
+
+    if response.status_code == 400 and fallback_input:
+        return await _post_batch(
+            client, tokens, url, entries, fallback_input, input_key, output_fields
+        )
+
+    if response.status_code != 200:
+        batchEnrich.mark_failed(entries, response.text)
+        return [None] * len(entries)
+
+    return batchEnrich.match_results(response.json(), len(entries))
+
+
+async def enrich_companies(client, tokens, entries):
+    """
+    Company-master enrichment for a batch of entries: a strict batch, then a
+    non-strict batch of the entries the strict pass did not match. Companies known to
+    have no match are skipped.
+    """
+
+    async def enrich_pass(entries, strict):
+        build_input, fallback_input = companyEnrich.company_input_builders(strict)
+        return await _post_batch(
+            client,
+            tokens,
+            companyEnrich.COMPANY_ENRICH_URL,
+            entries,
+            build_input,
+            "matchCompanyInput",
+            companyEnrich.COMPANY_OUTPUT_FIELDS,
+            fallback_input,
+        )
+
+    for entry in entries:
+        entry["company_match_criteria"] = "None"
+    known = await _for_each_in_thread(companyEnrich.is_known_no_match, entries)
+    entries = [entry for entry, no_match in zip(entries, known) if not no_match]
+
+    strict_misses = []
+    for entry, result in zip(entries, await enrich_pass(entries, True)):
+        if companyEnrich.is_strict_match(result):
+            entry["company_match_criteria"] = "Strict"
+            companyEnrich.apply_company_result(entry, result)
+        else:
+            strict_misses.append(entry)
+
+    if strict_misses:
+        loose_results = await enrich_pass(strict_misses, False)
+        no_matches = []
+        for entry, result in zip(strict_misses, loose_results):
+            if companyEnrich.is_strict_match(result):
+                entry["company_match_criteria"] = "Non-strict"
+                companyEnrich.apply_company_result(entry, result)
+            else:
+                no_matches.append(entry)
+        await _for_each_in_thread(companyEnrich.remember_no_match, no_matches)
+
+
+async def enrich_contacts(client, tokens, entries):
+    """
+    Contact enrichment for a batch of entries from their own contact fields.
+    """
+    results = await _post_batch(
+        client,
+        tokens,
+        contactEnrich.CONTACT_ENRICH_URL,
+        entries,
+        contactEnrich.build_contact_input,
+        "matchPersonInput",
+        contactEnrich.CONTACT_OUTPUT_FIELDS,
+    )
+    for entry, result in zip(entries, results):
+        if contactEnrich.is_contact_match(result):
+            contactEnrich.update_contact_data(entry, result)
+
+
+class AsyncSearchMemo:
+    """
+    asyncio counterpart of contactSearch.SearchMemo: one search per key for the run,
+    shared by every coroutine that needs it. Failed searches are not remembered.
+    """
+
+    def __init__(self):
+        self.searches = 0
+        self.reused = 0
+        self._futures = {}
+
+    async def lookup(self, key, search):
+        """
+        Returns the remembered result for a key, or awaits the search and remembers it.
+
+        Args:
+            key (tuple): The key from contactSearch.search_key, or ("page", company ID).
+            search (callable): Coroutine function returning (result, error).
+
+        Returns:
+            tuple: The result (or None) and the error message (or None).
+        """
+        while True:
+            future = self._futures.get(key)
+            if future is not None:
+                result = await future
+                if result is contactSearch._RETRY:
+                    continue
+                self.reused += 1
+                return result, None
+
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+            try:
+                result, error = await search()
+            except BaseException:
+                self._forget(key, future)
+                raise
+
+            if error is not None:
+                self._forget(key, future)
+                return None, error
+
+            self.searches += 1
+            future.set_result(result)
+            return result, None
+
+    def _forget(self, key, future):
+        self._futures.pop(key, None)
+        future.set_result(contactSearch._RETRY)
+
+    def report(self):
+        return f"Contact searches: {self.searches} sent, {self.reused} reused."
+
+
+async def _search_person_id(client, tokens, entry, strict, use_location_id):
+    payload = contactSearch.build_search_payload(entry, strict, use_location_id)
+    try:
+        response = await client.post(
+            contactSearch.CONTACT_SEARCH_URL,
+            jwt_token=await tokens.get_token(),
+            json=payload,
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return None, str(e) or type(e).__name__
+
+    if response.status_code != 200:
+        return None, response.text
+    return contactSearch.parse_person_id(response.json()), None
+
+
+async def _get_person_id(client, tokens, entry, strict, use_location_id, memo=None):
+    if not entry.get("zi_c_company_id") and not entry.get("zi_c_location_id"):
+        return None
+
+    def search():
+        return _search_person_id(client, tokens, entry, strict, use_location_id)
+
+    key = contactSearch.search_key(entry, strict, use_location_id)
+    if memo is None or key is None:
+        person_id, error = await search()
+    else:
+        person_id, error = await memo.lookup(key, search)
+
+    if error is not None:
+        _mark_failed(entry, error)
+        return None
+    return person_id
+
+
+async def _search_page(client, tokens, entry):
+    try:
+        response = await client.post(
+            contactSearch.CONTACT_SEARCH_URL,
+            jwt_token=await tokens.get_token(),
+            json=contactSearch.build_page_payload(entry),
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return None, str(e) or type(e).__name__
+
+    if response.status_code != 200:
+        return None, response.text
+    return contactSearch.parse_search_page(response.json()), None
+
+
+async def _find_contact(client, tokens, entry, memo, mode):
+    start = 0
+    if mode == "single" and entry.get("zi_c_company_id"):
+
+        def search():
+            return _search_page(client, tokens, entry)
+
+        if memo is None:
+            page, error = await search()
+        else:
+            key = ("page", str(entry["zi_c_company_id"]))
+            page, error = await memo.lookup(key, search)
+        if error is not None:
+            _mark_failed(entry, error)
+            return None, None
+
+        person_id, match_criteria, start = contactSearch.choose_contact(entry, page)
+        if start is None:
+            return person_id, match_criteria
+
+    cascade = contactSearch.SEARCH_CASCADE[start:]
+    for strict, use_location_id, match_criteria, id_field in cascade:
+        if not entry.get(id_field):
+            continue
+        person_id = await _get_person_id(
+            client, tokens, entry, strict, use_location_id, memo
+        )
+        if person_id:
+            return person_id, match_criteria
+
+    return None, None
+
+
+async def search_contact(client, tokens, entry, memo=None, mode="cascade"):
+    """
+    Contact search for one entry, walking the same cascade as contactSearch, or deciding
+    from one page of the company's contacts in "single" mode.
+    Results are shared through memo with every entry at the same company or location.
+    """
+    if await asyncio.to_thread(contactSearch.is_known_no_match, entry):
+        entry["newContactFound"] = "No"
+        return
+
+    person_id, match_criteria = await _find_contact(client, tokens, entry, memo, mode)
+    if person_id:
+        entry["personId"] = person_id
+        entry["contactMatchCriteria"] = match_criteria
+    else:
+        await asyncio.to_thread(contactSearch.remember_no_match, entry)
+    entry["newContactFound"] = "Yes" if person_id else "No"
+
+
+async def add_new_contacts(client, tokens, entries):
+    """
+    personId enrichment for a batch of entries with a found contact.
+    """
+    results = await _post_batch(
+        client,
+        tokens,
+        contactEnrich.CONTACT_ENRICH_URL,
+        entries,
+        addNewContact.build_new_contact_input,
+        "matchPersonInput",
+        contactEnrich.CONTACT_OUTPUT_FIELDS,
+    )
+    for entry, result in zip(entries, results):
+        try:
+            if result:
+                addNewContact.update_new_contact_data(entry, result)
+        except IndexError as e:
+            print(f"Error processing record: {entry}. Error: {e}")
+
+
+# Stage name -> (coroutine, which entries it applies to, progress label, batch size).
+# A batch size of None calls the coroutine once per entry; otherwise once per batch.
+STAGES = {
+    "contact_enrich": (
+        enrich_contacts,
+        contactEnrich.has_contact_fields,
+        "Contacts processed",
+        batchEnrich.MAX_BATCH_SIZE,
+    ),
+    "company_enrich": (
+        enrich_companies,
+        lambda entry: not companyEnrich.is_company_enriched(entry),
+        "Companies processed",
+        batchEnrich.MAX_BATCH_SIZE,
+    ),
+    "contact_search": (
+        search_contact,
+        lambda entry: entry.get("needsContact") == "Yes",
+        "Processed records",
+        None,
+    ),
+    "add_new_contact": (
+        add_new_contacts,
+        lambda entry: entry.get("needsContact") == "Yes" and entry.get("personId"),
+        "Contacts updated",
+        batchEnrich.MAX_BATCH_SIZE,
+    ),
+}
+
+async def _run_concurrently(function, records, concurrency):
+    # A fixed set of workers pulls from one shared iterator, so memory is bounded by the
+    # concurrency rather than by the number of records.
+    pending = iter(records)
+
+    async def worker():
+        for entry in pending:
+            await function(entry)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(records)))))
+
+
+class AsyncStageRunner:
+    """
+    Runs enrichment stages on an event loop and session that stay open across calls.
+
+    Use as a context manager:
+
+        with AsyncStageRunner(token_manager) as runner:
+            runner.run(records, ["company_enrich"])
+    """
+
+    def __init__(
+        self,
+        token_manager,
+        concurrency=DEFAULT_CONCURRENCY,
+        client=None,
+        search_mode=None,
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            token_manager (TokenManager): The manager that caches and refreshes the JWT token.
+            concurrency (int): The maximum number of requests and records in flight at once.
+            client (AsyncZoomInfoClient): The client to use. Defaults to a new AsyncZoomInfoClient.
+            search_mode (str): The contact search mode. Defaults to ZOOMINFO_CONTACT_SEARCH_MODE.
+        """
+        self.tokens = AsyncTokenSource(token_manager)
+        self.concurrency = concurrency
+        self.client = client or AsyncZoomInfoClient(concurrency)
+        self.client.token_manager = token_manager
+        self.company_dedup = companyEnrich.company_deduplicator()
+        self.search_memo = AsyncSearchMemo()
+        self.search_mode = contactSearch.get_search_mode(search_mode)
+        self._runner = None
+
+    def __enter__(self):
+        self._runner = asyncio.Runner()
+        self._runner.run(self.client.__aenter__())
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self._runner.run(self.client.__aexit__(*exc_info))
+        finally:
+            self._runner.close()
+            self._runner = None
+
+    @property
+    def jwt_token(self):
+        return self.tokens.token_manager.jwt_token
+
+    @property
+    def last_auth_time(self):
+        return self.tokens.token_manager.issued_at
+
+    async def _run_steps(self, records, steps):
+        for step in steps:
+            if callable(step):
+                step(records)
+                continue
+
+            function, applies_to, label, batch_size = STAGES[step]
+            progress = workerPool.ProgressCounter(label)
+
+            if step == "contact_search":
+                # Searches are shared by every entry at the same company for the whole run.
+                function = functools.partial(
+                    function, memo=self.search_memo, mode=self.search_mode
+                )
+
+            async def run_item(item):
+                await function(self.client, self.tokens, item)
+                progress.increment(len(item) if batch_size else 1)
+
+            selected = [entry for entry in records if applies_to(entry)]
+            pending = None
+            if step == "company_enrich":
+                # One lookup per company for the whole run; the rest are filled after.
+                selected, pending = self.company_dedup.plan(selected)
+            if batch_size:
+                selected = batchEnrich.iter_batches(selected, batch_size)
+            await _run_concurrently(run_item, selected, self.concurrency)
+            if pending is not None:
+                self.company_dedup.fan_out(pending)
+
+    def run(self, records, steps):
+        """
+        Runs each step over the records in order, enriching the records in place.
+
+        Args:
+            records (list): The records to enrich.
+            steps (list): API stage names from STAGES, or local functions called with the records.
+        """
+        self._runner.run(self._run_steps(records, steps))
+
+    def run_each(self, function, records):
+        """
+        Runs a coroutine function over each record, up to concurrency at a time, on the
+        runner's event loop and session.
+
+        Args:
+            function (callable): Called as function(client, tokens, entry) and awaited.
+            records (list): The records to enrich in place.
+        """
+
+        async def run_item(entry):
+            await function(self.client, self.tokens, entry)
+
+        self._runner.run(_run_concurrently(run_item, records, self.concurrency))
+
@@ -1,6 +1,8 @@
-import requests
 import json
 import getpass
+import threading
+import tokenManager
+import zoominfoClient
 
 
 def get_login_credentials():
@@ -14,7 +16,7 @@ def get_login_credentials():
         username = input("Enter your Zoominfo username: ")
         password = getpass.getpass("Enter your Zoominfo password: ")
 
-        if authenticate(username, password):
+        if login(username, password):
             print("User authenticated.\n")
             return (username, password)
         else:
@@ -34,9 +36,7 @@ def authenticate(username, password):
 
     payload = json.dumps({"username": username, "password": password})
 
-    headers = {"Content-Type": "application/json"}
-
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = zoominfoClient.get_client().post(url, data=payload)
 
     # if the response status code is 200, returns the JWT token
     if response.status_code == 200:  # 200 is the HTTP status code for 'OK'
@@ -44,3 +44,80 @@ def authenticate(username, password):
         return response_data["jwt"]
     else:
         return None
+
+
+def login(username, password):
+    """
+    Authenticates once and hands the JWT token to the shared token manager, so the
+    enrichment stages start with it instead of authenticating again.
+
+    :param username: str, the username of the user
+    :param password: str, the password of the user
+    :return: str, the JWT token if authentication is successful, None otherwise
+    """
+
+    jwt_token = authenticate(username, password)
+    if jwt_token:
+        get_token_manager(username, password).set_token(jwt_token)
+    return jwt_token
+
+
+_token_managers = {}
+_token_managers_lock = threading.Lock()
+
+
+def get_token_manager(username, password):
+    """
+    Returns the token manager shared by every stage that uses these credentials,
+    and registers it with the ZoomInfo client so rejected tokens are refreshed.
+
+    :param username: str, the username of the user
+    :param password: str, the password of the user
+    :return: TokenManager, the shared token manager
+    """
+
+    with _token_managers_lock:
+        manager = _token_managers.get((username, password))
+        if manager is None:
+            manager = tokenManager.TokenManager(
+                lambda: authenticate(username, password)
+            )
+            _token_managers[(username, password)] = manager
+
+    zoominfoClient.get_client().token_manager = manager
+    return manager
+
+
+class TokenRefresher:
+    """
+    Holds the current JWT token for a stage and refreshes it before it expires.
+    Safe to share between worker threads: only one thread refreshes, the others wait for it.
+    """
+
+    def __init__(self, username, password, jwt_token, last_auth_time):
+        """
+        Initialize the refresher with an already issued token.
+
+        :param username: str, the username of the user
+        :param password: str, the password of the user
+        :param jwt_token: str, the current JWT token
+        :param last_auth_time: float, the timestamp the token was issued at
+        """
+        self.manager = get_token_manager(username, password)
+        self.manager.set_token(jwt_token, last_auth_time)
+
+    @property
+    def jwt_token(self):
+        return self.manager.jwt_token
+
+    @property
+    def last_auth_time(self):
+        return self.manager.issued_at
+
+    def get_token(self):
+        """
+        Returns a current JWT token, re-authenticating once the token is about to expire.
+
+        :return: str, the JWT token
+        """
+        return self.manager.get_token()
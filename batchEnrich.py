@@ -0,0 +1,201 @@
+import requests
+import workerPool
+import zoominfoClient
+
+# Batched ZoomInfo enrich requests.
+
+# - The enrich endpoints accept up to MAX_BATCH_SIZE inputs per request and answer with
+#   one data.result entry per input, in input order.
+# - enrich_in_batches packs records into full-size requests and maps result[i] back to
+#   the record that produced input i.
+# - When the API rejects a batch with a 400, the batch is split in half and resent until
+#   the rejected input is isolated, so one bad row does not fail the rows around it.
+#   An isolated input can be retried once with a fallback input (e.g. without the email).
+
+MAX_BATCH_SIZE = 25
+
+
+def iter_batches(records, batch_size=MAX_BATCH_SIZE):
+    """
+    Splits records into consecutive batches.
+
+    Args:
+        records (list): The records to split.
+        batch_size (int): The maximum number of records per batch.
+
+    Returns:
+        list: The batches, in input order.
+    """
+    return [
+        records[start : start + batch_size]
+        for start in range(0, len(records), batch_size)
+    ]
+
+
+def build_batch_payload(entries, build_input, input_key, output_fields):
+    """
+    Builds one enrich request payload holding an input for every entry.
+
+    Args:
+        entries (list): The records in the batch.
+        build_input (callable): Builds the match input for one record.
+        input_key (str): The payload key of the input list, e.g. "matchPersonInput".
+        output_fields (list): The fields to request.
+
+    Returns:
+        dict: The request payload.
+    """
+    return {
+        input_key: [build_input(entry) for entry in entries],
+        "outputFields": output_fields,
+    }
+
+
+def match_results(response_data, count):
+    """
+    Aligns the results of an enrich response with the inputs that were sent.
+
+    Args:
+        response_data (dict): The parsed API response.
+        count (int): The number of inputs in the request.
+
+    Returns:
+        list: One result per input, or None where the API returned no result.
+    """
+    if not response_data or not response_data.get("success"):
+        return [None] * count
+
+    results = (response_data.get("data") or {}).get("result") or []
+    return [results[index] if index < len(results) else None for index in range(count)]
+
+
+def mark_failed(entries, message):
+    """
+    Records an API error on every entry of a batch.
+
+    Args:
+        entries (list): The records in the batch.
+        message (str): The error message.
+    """
+    for entry in entries:
+        entry["enrichmentStatus"] = "Failed"
+        entry["errorMessage"] = message
+
+
+def post_batch(
+    url,
+    entries,
+    build_input,
+    input_key,
+    output_fields,
+    jwt_token,
+    fallback_input=None,
+):
+    """
+    Sends one batch of inputs, splitting it when the API rejects it.
+
+    Args:
+        url (str): The enrich endpoint URL.
+        entries (list): The records in the batch.
+        build_input (callable): Builds the match input for one record.
+        input_key (str): The payload key of the input list.
+        output_fields (list): The fields to request.
+        jwt_token (str): The JWT token for authentication.
+        fallback_input (callable): Builds the input to retry a single rejected record with, if any.
+
+    Returns:
+        list: One result per entry, or None where the entry was not matched or failed.
+    """
+    payload = build_batch_payload(entries, build_input, input_key, output_fields)
+
+    try:
+        response = zoominfoClient.get_client().post(
+            url, jwt_token=jwt_token, json=payload
+        )
+    except requests.exceptions.RequestException as e:
+        mark_failed(entries, str(e))
+        return [None] * len(entries)
+
+    if response.status_code == 400 and len(entries) > 1:
+        middle = len(entries) // 2
+        return post_batch(
+            url,
+            entries[:middle],
+            build_input,
+            input_key,
+            output_fields,
+            jwt_token,
+            fallback_input,
+        ) + post_batch(
+            url,
+            entries[middle:],
+            build_input,
+            input_key,
+            output_fields,
+            jwt_token,
+            fallback_input,
+        )
+
+    if response.status_code == 400 and fallback_input:
+        return post_batch(
+            url, entries, fallback_input, input_key, output_fields, jwt_token
+        )
+
+    if response.status_code != 200:
+        print(f"Error: Received status code {response.status_code}")
+        print(response.text)
+        mark_failed(entries, response.text)
+        return [None] * len(entries)
+
+    return match_results(response.json(), len(entries))
+
+
+def enrich_in_batches(
+    url,
+    entries,
+    build_input,
+    input_key,
+    output_fields,
+    get_token,
+    batch_size=MAX_BATCH_SIZE,
+    workers=1,
+    progress=None,
+    fallback_input=None,
+):
+    """
+    Enriches records with as few requests as possible.
+
+    Args:
+        url (str): The enrich endpoint URL.
+        entries (list): The records to enrich.
+        build_input (callable): Builds the match input for one record.
+        input_key (str): The payload key of the input list.
+        output_fields (list): The fields to request.
+        get_token (callable): Returns a current JWT token.
+        batch_size (int): The maximum number of inputs per request.
+        workers (int): The number of batches sent concurrently.
+        progress (ProgressCounter): Optional counter advanced by the size of each finished batch.
+        fallback_input (callable): Builds the input to retry a single rejected record with, if any.
+
+    Returns:
+        list: One result per entry, in input order, or None where the entry was not matched or failed.
+    """
+
+    def send(batch):
+        results = post_batch(
+            url,
+            batch,
+            build_input,
+            input_key,
+            output_fields,
+            get_token(),
+            fallback_input,
+        )
+        if progress:
+            progress.increment(len(batch))
+        return results
+
+    batch_results = workerPool.map_records(
+        send, iter_batches(entries, batch_size), workers
+    )
+    return [result for results in batch_results for result in results]
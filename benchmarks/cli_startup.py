@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup benchmark for the main.py entry point.
+#
+# Each run starts a fresh interpreter and reports the time to import main and the
+# modules it loads, and the wall time of `python main.py --help`. With --baseline, the
+# same is measured for the tree as of a git revision, e.g. the version that imported
+# PySimpleGUI and every enrichment module at the top of main.py.
+#
+#     python benchmarks/cli_startup.py --baseline HEAD~1 --runs 20
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+print(json.dumps({"import_ms": imported * 1000, "modules": len(sys.modules)}))
+"""
+
+
+def measure(directory, runs):
+    """
+    Imports main and runs main.py --help from a directory in fresh interpreters.
+
+    Args:
+        directory (str): The directory holding main.py.
+        runs (int): The number of measured runs.
+
+    Returns:
+        dict: The median of every measurement, or the error of the first failed import.
+    """
+    command = [sys.executable, "-c", CHILD]
+    # The first run writes the bytecode cache; it is not measured.
+    first = subprocess.run(command, cwd=directory, capture_output=True, text=True)
+    if first.returncode != 0:
+        return {"error": first.stderr.strip().splitlines()[-1]}
+
+    samples = []
+    for _ in range(runs):
+        sample = json.loads(
+            subprocess.run(
+                command, cwd=directory, check=True, capture_output=True, text=True
+            ).stdout
+        )
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "main.py", "--help"],
+            cwd=directory,
+            check=True,
+            capture_output=True,
+        )
+        sample["help_ms"] = (time.perf_counter() - start) * 1000
+        samples.append(sample)
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def baseline_directory(revision):
+    """
+    Exports the tree of a git revision into a temporary directory.
+
+    Args:
+        revision (str): The git revision.
+
+    Returns:
+        str: The temporary directory.
+    """
+    directory = tempfile.mkdtemp(prefix="cli-baseline-")
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", revision],
+        cwd=REPO_DIR,
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        ["tar", "-x", "-C", directory], input=archive.stdout, check=True
+    )
+    return directory
+
+
+def print_row(label, result):
+    if "error" in result:
+        print(f"{label:<10} import failed: {result['error']}")
+        return
+    print(
+        f"{label:<10} import main {result['import_ms']:7.2f} ms "
+        f"({result['modules']:.0f} modules loaded)   main.py --help {result['help_ms']:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark for main.py.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--baseline", help="A git revision to compare against.")
+    args = parser.parse_args()
+
+    if args.baseline:
+        directory = baseline_directory(args.baseline)
+        try:
+            print_row("baseline", measure(directory, args.runs))
+        finally:
+            shutil.rmtree(directory)
+    print_row("current", measure(REPO_DIR, args.runs))
+
+
+if __name__ == "__main__":
+    main()
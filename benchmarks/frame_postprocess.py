@@ -0,0 +1,134 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import frameParser
+import jsonParser
+import naicsMatch
+from enrichmentRecord import EnrichmentRecord
+
+# Post-processing benchmark: the per-row loops in jsonParser and naicsMatch against the
+# DataFrame-backed versions in frameParser.
+#
+# Each size is timed three ways on the same synthetic records:
+#   loop    - jsonParser/naicsMatch *_records over the list of records
+#   frame   - frameParser *_records, including loading the columns and writing back
+#   grouped - frameParser.run_local_stages, all four stages on one DataFrame
+#   columns - frameParser *_frame on a DataFrame that is already loaded
+#
+#     python benchmarks/frame_postprocess.py --rows 100000 1000000
+
+NAICS_CODES = [digits for digits, _ in naicsMatch.iter_naics_file() if len(digits) == 6]
+
+
+def make_records(rows, seed=0):
+    """
+    Builds synthetic records shaped like a filled-in Data Enrichment Template.
+
+    Args:
+        rows (int): The number of records.
+        seed (int): The random seed.
+
+    Returns:
+        list: The records.
+    """
+    rng = random.Random(seed)
+    records = []
+    for row in range(rows):
+        has_contact = rng.random() < 0.6
+        has_address = rng.random() < 0.5
+        record = EnrichmentRecord.from_row(
+            {
+                "companyName": f"  Supplier {row % 5000}  Inc ",
+                "firstName": " Jane " if has_contact else "",
+                "lastName": "Doe  " if has_contact else "",
+                "emailAddress": "",
+                "phone": "",
+                "companyStreet": " 1  Main St" if has_address else "",
+                "companyCity": "Boston" if has_address else "",
+                "companyState": "",
+                "companyZipCode": "",
+            }
+        )
+        record["zi_c_street"] = "2 Elm  St "
+        record["zi_c_city"] = "Dallas"
+        record["zi_c_state"] = "TX"
+        record["zi_c_zip"] = "75201"
+        record["zi_c_naics6"] = rng.choice(NAICS_CODES) if rng.random() < 0.9 else ""
+        records.append(record)
+    return records
+
+
+def run_loop(records):
+    jsonParser.remove_spaces_records(records)
+    jsonParser.update_needs_contact_records(records)
+    naicsMatch.get_sector_and_industry_records(records)
+    jsonParser.update_address_records(records)
+
+
+def run_frame(records):
+    frameParser.remove_spaces_records(records)
+    frameParser.update_needs_contact_records(records)
+    frameParser.get_sector_and_industry_records(records)
+    frameParser.update_address_records(records)
+
+
+def run_grouped(records):
+    frameParser.run_local_stages(records, frameParser.LOCAL_STAGES)
+
+
+def run_columns(frame):
+    frameParser.remove_spaces_frame(frame)
+    frameParser.update_needs_contact_frame(frame)
+    frameParser.get_sector_and_industry_frame(frame)
+    frameParser.update_address_frame(frame)
+
+
+def timed(function, argument):
+    start = time.perf_counter()
+    function(argument)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare loop and DataFrame post-processing."
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    naicsMatch.load_prefix_index()
+    columns = list(dict.fromkeys(
+        frameParser.CONTACT_COLUMNS
+        + list(frameParser.ADDRESS_COLUMNS)
+        + list(frameParser.ADDRESS_COLUMNS.values())
+        + ["companyName", "zi_c_naics6", "sectorTitle", "primaryIndustry"]
+    ))
+
+    for rows in args.rows:
+        # Output of the stages' "missing contacts" prints is not part of the comparison.
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            loop = timed(run_loop, make_records(rows))
+            frame = timed(run_frame, make_records(rows))
+            grouped = timed(run_grouped, make_records(rows))
+            columns_only = timed(
+                run_columns, frameParser.records_to_frame(make_records(rows), columns)
+            )
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print(
+            f"{rows:>9} rows   loop {loop:7.2f} s   frame {frame:7.2f} s "
+            f"({loop / frame:4.1f}x)   grouped {grouped:7.2f} s "
+            f"({loop / grouped:4.1f}x)   columns only {columns_only:7.2f} s "
+            f"({loop / columns_only:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
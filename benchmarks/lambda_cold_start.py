@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold-start benchmark for the Lambda handler.
+#
+# Each run imports lambda_function in a fresh interpreter, the way the Lambda runtime
+# does during init, and reports the init duration, the modules loaded and whether the
+# heavy optional packages were imported. It then times the client setup the first and a
+# warm invocation do before touching S3: the shared client after this change, a new
+# boto3 S3 client per invocation before it. With --baseline, the same is measured for
+# the tree as of a git revision.
+#
+# No AWS account is needed: a region is set so boto3 can build clients, and nothing is
+# sent over the network.
+#
+#     python benchmarks/lambda_cold_start.py --baseline HEAD~1 --runs 10
+#     POWERTOOLS_TRACE_DISABLED=false python benchmarks/lambda_cold_start.py
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import lambda_function
+init = time.perf_counter() - start
+
+def s3_client():
+    if hasattr(lambda_function, "get_s3_client"):
+        return lambda_function.get_s3_client()
+    return lambda_function.boto3.client("s3")
+
+start = time.perf_counter()
+s3_client()
+first = time.perf_counter() - start
+start = time.perf_counter()
+s3_client()
+warm = time.perf_counter() - start
+print(json.dumps({
+    "init_ms": init * 1000,
+    "first_invoke_setup_ms": first * 1000,
+    "warm_invoke_setup_ms": warm * 1000,
+    "modules": len(sys.modules),
+    "heavy": sorted(m for m in ("pandas", "pydantic", "aws_xray_sdk") if m in sys.modules),
+}))
+"""
+
+
+def child_environment(cache_dir):
+    environment = dict(os.environ)
+    environment.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    environment.setdefault("POWERTOOLS_TRACE_DISABLED", "true")
+    environment["ZOOMINFO_CACHE_PATH"] = os.path.join(cache_dir, "zoominfo-cache.sqlite")
+    return environment
+
+
+def measure(directory, runs):
+    """
+    Imports lambda_function from a directory in fresh interpreters.
+
+    Args:
+        directory (str): The directory holding lambda_function.py.
+        runs (int): The number of measured runs.
+
+    Returns:
+        dict: The median of every timing, the module count and the heavy packages loaded.
+    """
+    command = [sys.executable, "-c", CHILD]
+    cache_dir = tempfile.mkdtemp(prefix="lambda-cache-")
+    try:
+        environment = child_environment(cache_dir)
+        # The first run writes the bytecode cache; it is not measured.
+        subprocess.run(
+            command, cwd=directory, env=environment, check=True, capture_output=True
+        )
+        samples = []
+        for _ in range(runs):
+            # Every cold start begins with an empty /tmp.
+            for name in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, name))
+            samples.append(
+                json.loads(
+                    subprocess.run(
+                        command,
+                        cwd=directory,
+                        env=environment,
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                    ).stdout
+                )
+            )
+    finally:
+        shutil.rmtree(cache_dir)
+
+    result = {
+        key: statistics.median(s[key] for s in samples)
+        for key in samples[0]
+        if key.endswith("_ms") or key == "modules"
+    }
+    result["heavy"] = samples[0]["heavy"]
+    return result
+
+
+def baseline_directory(revision):
+    """
+    Exports the tree of a git revision into a temporary directory.
+
+    Args:
+        revision (str): The git revision.
+
+    Returns:
+        str: The temporary directory.
+    """
+    directory = tempfile.mkdtemp(prefix="lambda-baseline-")
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", revision],
+        cwd=REPO_DIR,
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(["tar", "-x", "-C", directory], input=archive.stdout, check=True)
+    return directory
+
+
+def print_row(label, result):
+    print(
+        f"{label:<10} init {result['init_ms']:7.1f} ms ({result['modules']:.0f} modules, "
+        f"heavy: {', '.join(result['heavy']) or 'none'})   "
+        f"S3 client setup: first invocation {result['first_invoke_setup_ms']:6.1f} ms, "
+        f"warm {result['warm_invoke_setup_ms']:6.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for lambda_function.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--baseline", help="A git revision to compare against.")
+    args = parser.parse_args()
+
+    if args.baseline:
+        directory = baseline_directory(args.baseline)
+        try:
+            print_row("baseline", measure(directory, args.runs))
+        finally:
+            shutil.rmtree(directory)
+    print_row("current", measure(REPO_DIR, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Import-time benchmark for naicsMatch.
+#
+# Each run imports naicsMatch in a fresh interpreter and reports the import time, the
+# memory held after import, and the time and memory of the first lookup (which loads
+# the data file in the lazy version). With --baseline, the same measurements are taken
+# for naicsMatch.py as of a git revision, e.g. the version with the import-time literal.
+#
+#     python benchmarks/naics_import.py --baseline HEAD~1 --runs 20
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time, tracemalloc
+tracemalloc.start()
+start = time.perf_counter()
+import naicsMatch
+imported = time.perf_counter() - start
+import_memory = tracemalloc.get_traced_memory()[0]
+records = [{"zi_c_naics6": "541511", "sectorTitle": "", "primaryIndustry": ""}]
+start = time.perf_counter()
+naicsMatch.get_sector_and_industry_records(records)
+lookup = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": imported * 1000,
+    "import_kb": import_memory / 1024,
+    "first_lookup_ms": lookup * 1000,
+    "after_lookup_kb": tracemalloc.get_traced_memory()[0] / 1024,
+}))
+"""
+
+
+def measure(directory, runs):
+    """
+    Imports naicsMatch from a directory in fresh interpreters.
+
+    Args:
+        directory (str): The directory holding naicsMatch.py.
+        runs (int): The number of measured runs.
+
+    Returns:
+        dict: The median of every measurement.
+    """
+    command = [sys.executable, "-c", CHILD]
+    # The first run writes the bytecode cache; it is not measured.
+    subprocess.run(command, cwd=directory, check=True, capture_output=True)
+
+    samples = [
+        json.loads(
+            subprocess.run(
+                command, cwd=directory, check=True, capture_output=True, text=True
+            ).stdout
+        )
+        for _ in range(runs)
+    ]
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def baseline_directory(revision):
+    """
+    Checks naicsMatch.py (and its data file, if any) out of a git revision into a temporary directory.
+
+    Args:
+        revision (str): The git revision.
+
+    Returns:
+        str: The temporary directory.
+    """
+    directory = tempfile.mkdtemp(prefix="naics-baseline-")
+    for name in ("naicsMatch.py", "naics_codes.tsv"):
+        result = subprocess.run(
+            ["git", "show", f"{revision}:{name}"],
+            cwd=REPO_DIR,
+            capture_output=True,
+        )
+        if result.returncode == 0:
+            with open(os.path.join(directory, name), "wb") as file:
+                file.write(result.stdout)
+    return directory
+
+
+def print_row(label, result):
+    print(
+        f"{label:<10} import {result['import_ms']:7.2f} ms {result['import_kb']:8.1f} KB   "
+        f"first lookup {result['first_lookup_ms']:7.2f} ms   "
+        f"held after lookup {result['after_lookup_kb']:8.1f} KB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for naicsMatch.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--baseline", help="A git revision to compare against.")
+    args = parser.parse_args()
+
+    if args.baseline:
+        directory = baseline_directory(args.baseline)
+        try:
+            print_row("baseline", measure(directory, args.runs))
+        finally:
+            shutil.rmtree(directory)
+    print_row("current", measure(REPO_DIR, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+import re
+from collections import OrderedDict
+
+# Within-run company deduplication.
+
+# - Supplier files list the same company on many rows (one per site). Rows are grouped
+#   by a normalized company key: name and country, plus street and zip code when
+#   include_address is set (the default, so each site keeps its own location match).
+# - Only the first row of each key is sent to company-master. Its outcome is captured and
+#   fanned out to every other row with the same key, including rows in later windows.
+# - At most max_outcomes outcomes are kept (ENRICHMENT_DEDUP_MAX_COMPANIES, default
+#   DEFAULT_MAX_OUTCOMES), least recently used first out, so a streamed file with many
+#   distinct companies does not grow memory without bound. A company whose outcome was
+#   evicted is looked up again the next time it appears.
+# - report() summarizes how many lookups the deduplication saved.
+
+DEFAULT_MAX_OUTCOMES = 100000
+
+# Legal-form suffixes dropped from company names before comparing them.
+COMPANY_SUFFIXES = {
+    "co",
+    "company",
+    "corp",
+    "corporation",
+    "gmbh",
+    "inc",
+    "incorporated",
+    "llc",
+    "llp",
+    "lp",
+    "ltd",
+    "limited",
+    "plc",
+}
+
+COUNTRY_ALIASES = {
+    "us": "united states",
+    "usa": "united states",
+    "united states of america": "united states",
+    "uk": "united kingdom",
+    "gb": "united kingdom",
+    "great britain": "united kingdom",
+}
+
+
+def normalize_text(value):
+    """
+    Lowercases a value and reduces it to words separated by single spaces.
+
+    Args:
+        value (str): The value to normalize.
+
+    Returns:
+        str: The normalized value.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", str(value or "").lower()).split())
+
+
+def normalize_company_name(name):
+    """
+    Normalizes a company name, ignoring punctuation, case and legal-form suffixes.
+
+    Args:
+        name (str): The company name.
+
+    Returns:
+        str: The normalized name.
+    """
+    words = normalize_text(name).split()
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def normalize_country(country):
+    """
+    Normalizes a country name, mapping common abbreviations to the full name.
+
+    Args:
+        country (str): The country.
+
+    Returns:
+        str: The normalized country.
+    """
+    country = normalize_text(country)
+    return COUNTRY_ALIASES.get(country, country)
+
+
+def company_key(entry, include_address=True):
+    """
+    Builds the deduplication key of a row.
+
+    Args:
+        entry (dict): The row.
+        include_address (bool): Whether rows must also share a street and zip code.
+
+    Returns:
+        tuple: The key, or None if the row has no company name to match on.
+    """
+    name = normalize_company_name(entry.get("companyName"))
+    if not name:
+        return None
+
+    key = (name, normalize_country(entry.get("companyCountry")))
+    if include_address:
+        zip_code = normalize_text(entry.get("companyZipCode")).replace(" ", "")
+        key += (normalize_text(entry.get("companyStreet")), zip_code[:5])
+    return key
+
+
+class CompanyDeduplicator:
+    """
+    Sends one row per company key to enrichment and fans the outcome out to the rest.
+    Keeps the most recently used outcomes, so it can be reused across windows of one run.
+    """
+
+    def __init__(self, fields, copy_fields=(), include_address=True, max_outcomes=None):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            fields (list): Fields filled from the enriched row where a member row is empty.
+            copy_fields (list): Fields always copied from the enriched row.
+            include_address (bool): Whether rows must also share a street and zip code.
+            max_outcomes (int): The number of company outcomes kept. Defaults to
+                ENRICHMENT_DEDUP_MAX_COMPANIES.
+        """
+        if max_outcomes is None:
+            max_outcomes = int(
+                os.environ.get("ENRICHMENT_DEDUP_MAX_COMPANIES", DEFAULT_MAX_OUTCOMES)
+            )
+
+        self.fields = list(fields)
+        self.copy_fields = list(copy_fields)
+        self.include_address = include_address
+        self.max_outcomes = max_outcomes
+        self.rows = 0
+        self.lookups = 0
+
+        self._outcomes = OrderedDict()
+        self._planned = {}
+
+    def plan(self, entries):
+        """
+        Splits rows into the ones to enrich and the ones to fill from another row.
+
+        Args:
+            entries (list): The rows of one stage or window.
+
+        Returns:
+            tuple: The rows to enrich, and the (key, row) pairs to pass to fan_out afterwards.
+        """
+        to_enrich = []
+        pending = []
+
+        for entry in entries:
+            self.rows += 1
+            key = company_key(entry, self.include_address)
+            if key is None:
+                to_enrich.append(entry)
+            elif key in self._outcomes:
+                self._outcomes.move_to_end(key)
+                pending.append((key, entry))
+            elif key in self._planned:
+                pending.append((key, entry))
+            else:
+                self._planned[key] = (
+                    entry,
+                    entry.get("enrichmentStatus"),
+                    entry.get("errorMessage"),
+                )
+                to_enrich.append(entry)
+
+        self.lookups += len(to_enrich)
+        return to_enrich, pending
+
+    def capture(self):
+        """
+        Records the outcome of every planned row once it has been enriched.
+        """
+        for key, (entry, status, error) in self._planned.items():
+            outcome = {field: entry.get(field) for field in self.fields}
+            for field in self.copy_fields:
+                if field in entry:
+                    outcome[field] = entry[field]
+            # A failure during this stage belongs to the company, not just the one row.
+            if (entry.get("enrichmentStatus"), entry.get("errorMessage")) != (
+                status,
+                error,
+            ):
+                outcome["enrichmentStatus"] = entry.get("enrichmentStatus")
+                outcome["errorMessage"] = entry.get("errorMessage")
+            self._outcomes[key] = outcome
+        self._planned = {}
+
+    def fan_out(self, pending):
+        """
+        Fills every pending row from the outcome captured for its key.
+
+        Args:
+            pending (list): The (key, row) pairs returned by plan.
+        """
+        self.capture()
+
+        for key, entry in pending:
+            for field, value in self._outcomes[key].items():
+                if field in self.fields and entry.get(field):
+                    continue
+                entry[field] = value
+
+        # Evict only after fanning out, so every pending key is still present.
+        while len(self._outcomes) > self.max_outcomes:
+            self._outcomes.popitem(last=False)
+
+    @property
+    def saved(self):
+        return self.rows - self.lookups
+
+    def report(self):
+        """
+        Summarizes the lookups saved by deduplication.
+
+        Returns:
+            str: The report line.
+        """
+        return (
+            f"Company deduplication: {self.rows} rows, {self.lookups} unique "
+            f"companies looked up, {self.saved} lookups saved."
+        )
@@ -1,7 +1,122 @@
 import requests
 import json
-import time
 import auth
+import batchEnrich
+import companyDedup
+import negativeCache
+import workerPool
+import zoominfoClient
+
+
+COMPANY_ENRICH_URL = "https://api.zoominfo.com/enrich/company-master"
+
+COMPANY_OUTPUT_FIELDS = [
+    "zi_c_location_id",
+    "zi_c_name",
+    "zi_c_company_name",
+    "zi_c_phone",
+    "zi_c_url",
+    "zi_c_company_url",
+    "zi_c_naics6",
+    "zi_c_employees",
+    "zi_c_street",
+    "zi_c_city",
+    "zi_c_state",
+    "zi_c_zip",
+    "zi_c_country",
+    "zi_c_company_id",
+    "zi_c_linkedin_url",
+]
+
+# Entry fields filled from a company-master result.
+COMPANY_RESULT_FIELDS = [
+    "zi_c_location_id",
+    "zi_c_company_name",
+    "zi_c_phone",
+    "zi_c_url",
+    "zi_c_naics6",
+    "zi_c_employees",
+    "zi_c_street",
+    "zi_c_city",
+    "zi_c_state",
+    "zi_c_zip",
+    "zi_c_country",
+    "zi_c_name",
+    "zi_c_company_id",
+    "zi_c_linkedin_url",
+]
+
+
+def company_deduplicator(include_address=True):
+    """
+    Returns a deduplicator that fans company-master outcomes out to rows of the same company.
+
+    Args:
+        include_address (bool): Whether rows must also share a street and zip code.
+
+    Returns:
+        CompanyDeduplicator: The deduplicator.
+    """
+
+    return companyDedup.CompanyDeduplicator(
+        COMPANY_RESULT_FIELDS,
+        copy_fields=["company_match_criteria"],
+        include_address=include_address,
+    )
+
+
+def build_company_input(entry, strict, include_email=True):
+    """
+    Builds the matchCompanyInput element for an entry.
+
+    Args:
+        entry (dict): A dictionary containing the company information to be enriched.
+        strict (bool): Whether to match on the full address and exact name.
+        include_email (bool): Whether to include the contact email address.
+
+    Returns:
+        dict: The match input for the entry.
+    """
+
+    match_input = {
+        "zi_c_name": entry["companyName"],
+        "phone": {"zi_c_phone": entry["phone"]},
+        "address": {"zi_c_country": entry["companyCountry"]},
+        "match_reasons": [{"zi_c_country": "E"}],
+    }
+    if include_email and entry.get("emailAddress"):
+        match_input["email"] = entry["emailAddress"]
+
+    if strict:
+        updated_address = {
+            "zi_c_street": entry["companyStreet"],
+            "zi_c_city": entry["companyCity"],
+            "zi_c_state": entry["companyState"],
+            "zi_c_zip": entry["companyZipCode"],
+        }
+        match_input["address"].update(updated_address)
+        match_input["match_reasons"] = [{"zi_c_country": "E", "zi_c_name": "F"}]
+
+    return match_input
+
+
+def build_company_payload(entry, strict, include_email=True):
+    """
+    Builds the company-master request payload for a single entry.
+
+    Args:
+        entry (dict): A dictionary containing the company information to be enriched.
+        strict (bool): Whether to match on the full address and exact name.
+        include_email (bool): Whether to include the contact email address.
+
+    Returns:
+        dict: The request payload.
+    """
+
+    return {
+        "matchCompanyInput": [build_company_input(entry, strict, include_email)],
+        "outputFields": COMPANY_OUTPUT_FIELDS,
+    }
 
 
 def get_company_enrichment_data(entry, jwt_token, strict):
@@ -16,67 +131,18 @@ def get_company_enrichment_data(entry, jwt_token, strict):
         dict: A dictionary containing the enriched company data, or None if an error occurred.
     """
 
-    url = "https://api.zoominfo.com/enrich/company-master"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {jwt_token}",
-    }
-
-    def create_payload(include_email):
-
-        payload = {
-            "matchCompanyInput": [
-                {
-                    "zi_c_name": entry["companyName"],
-                    "phone": {"zi_c_phone": entry["phone"]},
-                    "address": {"zi_c_country": entry["companyCountry"]},
-                    "match_reasons": [{"zi_c_country": "E"}],
-                }
-            ],
-            "outputFields": [
-                "zi_c_location_id",
-                "zi_c_name",
-                "zi_c_company_name",
-                "zi_c_phone",
-                "zi_c_url",
-                "zi_c_company_url",
-                "zi_c_naics6",
-                "zi_c_employees",
-                "zi_c_street",
-                "zi_c_city",
-                "zi_c_state",
-                "zi_c_zip",
-                "zi_c_country",
-                "zi_c_company_id",
-                "zi_c_linkedin_url",
-            ],
-        }
-        if include_email and entry.get("emailAddress"):
-            payload["matchCompanyInput"][0]["email"] = entry["emailAddress"]
-
-        if strict:
-            updated_address = {
-                "zi_c_street": entry["companyStreet"],
-                "zi_c_city": entry["companyCity"],
-                "zi_c_state": entry["companyState"],
-                "zi_c_zip": entry["companyZipCode"],
-            }
-            payload["matchCompanyInput"][0]["address"].update(updated_address)
-            payload["matchCompanyInput"][0]["match_reasons"] = [
-                {"zi_c_country": "E", "zi_c_name": "F"}
-            ]
-
-        return payload
+    url = COMPANY_ENRICH_URL
+    client = zoominfoClient.get_client()
 
     try:
-        payload = create_payload(include_email=True)
-        response = requests.post(url, headers=headers, json=payload)
+        payload = build_company_payload(entry, strict, include_email=True)
+        response = client.post(url, jwt_token=jwt_token, json=payload)
         response.raise_for_status()  # Raises an exception for 4XX and 5XX status codes
 
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 400:
-            payload = create_payload(include_email=False)
-            response = requests.post(url, headers=headers, json=payload)
+            payload = build_company_payload(entry, strict, include_email=False)
+            response = client.post(url, jwt_token=jwt_token, json=payload)
             response.raise_for_status()
         else:
             entry["enrichmentStatus"] = "Failed"
@@ -91,6 +157,59 @@ def get_company_enrichment_data(entry, jwt_token, strict):
     return response.json()
 
 
+def company_input_builders(strict):
+    """
+    Returns the match input builders for one company-master pass.
+
+    Args:
+        strict (bool): Whether to match on the full address and exact name.
+
+    Returns:
+        tuple: The input builder and the fallback builder used when the API rejects an email.
+    """
+
+    return (
+        lambda entry: build_company_input(entry, strict),
+        lambda entry: build_company_input(entry, strict, include_email=False),
+    )
+
+
+def is_strict_match(result):
+    """
+    Checks whether a company-master result holds company data. A no-match result
+    ({"matchStatus": "NO_MATCH", "data": {}}) does not.
+
+    Args:
+        result (dict): A data.result item from the ZoomInfo API, or None.
+
+    Returns:
+        bool: True if the pass matched a company.
+    """
+
+    return bool(result) and bool(result.get("data"))
+
+
+def apply_company_result(entry, result):
+    """
+    Fills the empty company fields of an entry from one company-master result.
+
+    Args:
+        entry (dict): A dictionary containing the company data to be updated.
+        result (dict): A data.result item from the ZoomInfo API.
+
+    Returns:
+        dict: The updated company data.
+    """
+
+    company_data = result.get("data") or {}
+
+    for field in COMPANY_RESULT_FIELDS:
+        if entry[field] == "" and field in company_data:
+            entry[field] = company_data[field]
+
+    return entry
+
+
 def update_company_data(entry, new_data_item):
     """
     Updates the company data in the given entry with the new data item.
@@ -104,28 +223,7 @@ def update_company_data(entry, new_data_item):
     """
 
     if "data" in new_data_item and new_data_item["data"].get("result"):
-        company_data = new_data_item["data"]["result"][0]["data"]
-
-        fields_to_update = [
-            "zi_c_location_id",
-            "zi_c_company_name",
-            "zi_c_phone",
-            "zi_c_url",
-            "zi_c_naics6",
-            "zi_c_employees",
-            "zi_c_street",
-            "zi_c_city",
-            "zi_c_state",
-            "zi_c_zip",
-            "zi_c_country",
-            "zi_c_name",
-            "zi_c_company_id",
-            "zi_c_linkedin_url",
-        ]
-
-        for field in fields_to_update:
-            if entry[field] == "" and field in company_data:
-                entry[field] = company_data[field]
+        apply_company_result(entry, new_data_item["data"]["result"][0])
 
     else:
         print("No 'data' key in the response or 'result' list is empty.")
@@ -133,57 +231,149 @@ def update_company_data(entry, new_data_item):
     return entry
 
 
-def company_enrich(input_filename, jwt_token, last_auth_time, username, password):
+def is_company_enriched(entry):
     """
-    Enriches company data in the input file using the provided JWT token and authentication credentials.
+    Checks whether an entry already holds company-master data, e.g. after resuming a run.
 
     Args:
-        input_filename (str): The path to the input file containing the company data.
+        entry (dict): The entry.
+
+    Returns:
+        bool: True if the company lookup can be skipped.
+    """
+    return bool(entry.get("zi_c_company_id"))
+
+
+def is_known_no_match(entry):
+    """
+    Checks whether company-master found no match for the entry's company in a recent run.
+
+    Args:
+        entry (dict): The entry.
+
+    Returns:
+        bool: True if the strict and non-strict lookups can be skipped.
+    """
+    cache = negativeCache.get_cache()
+    return cache is not None and cache.contains(
+        negativeCache.COMPANY, companyDedup.company_key(entry)
+    )
+
+
+def remember_no_match(entry):
+    """
+    Records that neither the strict nor the non-strict lookup matched the entry's company.
+    Entries whose lookup failed are not recorded.
+
+    Args:
+        entry (dict): The entry.
+    """
+    cache = negativeCache.get_cache()
+    if cache is not None and entry.get("enrichmentStatus") != "Failed":
+        cache.add(negativeCache.COMPANY, companyDedup.company_key(entry))
+
+
+def company_enrich_records(
+    data,
+    jwt_token,
+    last_auth_time,
+    username,
+    password,
+    workers=1,
+    batch_size=batchEnrich.MAX_BATCH_SIZE,
+):
+    """
+    Enriches the company data of a list of records in place.
+
+    Rows of the same company are looked up once and the outcome is copied to the rest.
+    Rows that already hold company data and companies known to have no match are skipped. Every looked-up record is sent in a
+    strict batch first; only the records the strict pass did not match are sent again in
+    a non-strict batch.
+
+    Args:
+        data (list): The records to enrich.
         jwt_token (str): The JWT token for authentication.
         last_auth_time (float): The timestamp of the last authentication.
         username (str): The username for authentication.
         password (str): The password for authentication.
+        workers (int): The number of requests sent concurrently.
+        batch_size (int): The number of records enriched per request.
 
     Returns:
         tuple: A tuple containing the updated JWT token and the timestamp of the last authentication.
     """
 
-    with open(input_filename, "r", encoding="utf-8") as file:
-        old_data = json.load(file)
+    tokens = auth.TokenRefresher(username, password, jwt_token, last_auth_time)
+    progress = workerPool.ProgressCounter("Companies processed")
+
+    def enrich_pass(entries, strict, progress=None):
+        build_input, fallback_input = company_input_builders(strict)
+        return batchEnrich.enrich_in_batches(
+            COMPANY_ENRICH_URL,
+            entries,
+            build_input,
+            "matchCompanyInput",
+            COMPANY_OUTPUT_FIELDS,
+            tokens.get_token,
+            batch_size=batch_size,
+            workers=workers,
+            progress=progress,
+            fallback_input=fallback_input,
+        )
+
+    dedup = company_deduplicator()
+    lookups, pending = dedup.plan(
+        [entry for entry in data if not is_company_enriched(entry)]
+    )
+
+    for entry in lookups:
+        entry["company_match_criteria"] = "None"
+    lookups = [entry for entry in lookups if not is_known_no_match(entry)]
 
-    merged_data = []
-    companies_processed = 0
+    strict_misses = []
+    for entry, result in zip(lookups, enrich_pass(lookups, True, progress)):
+        if is_strict_match(result):
+            entry["company_match_criteria"] = "Strict"
+            apply_company_result(entry, result)
+        else:
+            strict_misses.append(entry)
 
-    for entry in old_data:
+    for entry, result in zip(strict_misses, enrich_pass(strict_misses, False)):
+        if is_strict_match(result):
+            entry["company_match_criteria"] = "Non-strict"
+            apply_company_result(entry, result)
+        else:
+            remember_no_match(entry)
 
-        if time.time() - last_auth_time >= 55 * 60:
-            jwt_token = auth.authenticate(username, password)
-            last_auth_time = time.time()
+    dedup.fan_out(pending)
+    print(f"\n{dedup.report()}")
 
-        entry["company_match_criteria"] = "None"
+    return tokens.jwt_token, tokens.last_auth_time
 
-        new_data = get_company_enrichment_data(entry, jwt_token, strict=True)
-        if (
-            new_data
-            and new_data.get("success")
-            and new_data["data"].get("result")
-            and new_data["data"]["result"][0].get("data")
-        ):
-            entry["company_match_criteria"] = "Strict"
-        else:
-            new_data = get_company_enrichment_data(entry, jwt_token, strict=False)
-            if new_data and new_data.get("success") and new_data["data"].get("result"):
-                entry["company_match_criteria"] = "Non-strict"
 
-        if new_data and new_data.get("success") and new_data["data"].get("result"):
-            entry = update_company_data(entry, new_data)
+def company_enrich(input_filename, jwt_token, last_auth_time, username, password):
+    """
+    Enriches company data in the input file using the provided JWT token and authentication credentials.
 
-        merged_data.append(entry)
+    Args:
+        input_filename (str): The path to the input file containing the company data.
+        jwt_token (str): The JWT token for authentication.
+        last_auth_time (float): The timestamp of the last authentication.
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+
+    Returns:
+        tuple: A tuple containing the updated JWT token and the timestamp of the last authentication.
+    """
+
+    with open(input_filename, "r", encoding="utf-8") as file:
+        data = json.load(file)
 
-        companies_processed += 1
-        print(f"\rCompanies processed: {companies_processed}", end="", flush=True)
+    jwt_token, last_auth_time = company_enrich_records(
+        data, jwt_token, last_auth_time, username, password
+    )
 
     with open(input_filename, "w", encoding="utf-8") as file:
-        json.dump(merged_data, file, indent=4, ensure_ascii=False)
+        json.dump(data, file, indent=4, ensure_ascii=False)
 
     return jwt_token, last_auth_time
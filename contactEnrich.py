@@ -1,33 +1,44 @@
-import requests
 import json
-import time
 import auth
+import batchEnrich
+import workerPool
+import zoominfoClient
 
 
-def get_contact_enrichment_data(entry, jwt_token):
-    """
-    Enriches contact data using the Zoominfo API.
+CONTACT_ENRICH_URL = "https://api.zoominfo.com/enrich/contact"
 
-    Constructs a request to the Zoominfo API using contact entry,
-    and attempts to enrich the provided contact information. The function handles API response
-    and returns enriched data if successful, or None if there's an error.
+CONTACT_OUTPUT_FIELDS = ["firstName", "lastName", "email", "phone", "jobTitle"]
+
+# The fields contact enrichment matches on; an entry with none of them cannot match.
+CONTACT_FIELDS = ["firstName", "lastName", "emailAddress", "phone"]
+
+
+def has_contact_fields(entry):
+    """
+    Checks whether an entry has any contact field to enrich the contact from.
 
     Args:
         entry (dict): A dictionary containing contact information.
-        jwt_token (str): A JWT token for authentication with the Zoominfo API.
 
     Returns:
-        dict or None: A dictionary containing enriched contact information, or None if there was an error.
+        bool: True if at least one of CONTACT_FIELDS is set.
     """
 
-    url = "https://api.zoominfo.com/enrich/contact"
+    return any(str(entry.get(field) or "").strip() for field in CONTACT_FIELDS)
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {jwt_token}",
-    }
 
-    match_person_input = {
+def build_contact_input(entry):
+    """
+    Builds the matchPersonInput element for an entry.
+
+    Args:
+        entry (dict): A dictionary containing contact information.
+
+    Returns:
+        dict: The match input for the entry.
+    """
+
+    return {
         "companyName": entry["companyName"],
         "firstName": entry["firstName"],
         "lastName": entry["lastName"],
@@ -35,12 +46,46 @@ def get_contact_enrichment_data(entry, jwt_token):
         "phone": entry["phone"],
     }
 
-    payload = {
-        "matchPersonInput": [match_person_input],
-        "outputFields": ["firstName", "lastName", "email", "phone", "jobTitle"],
-    }
 
-    response = requests.post(url, headers=headers, json=payload)
+def build_contact_payload(entry):
+    """
+    Builds the contact enrich request payload for an entry.
+
+    Args:
+        entry (dict): A dictionary containing contact information.
+
+    Returns:
+        dict: The request payload.
+    """
+
+    return batchEnrich.build_batch_payload(
+        [entry], build_contact_input, "matchPersonInput", CONTACT_OUTPUT_FIELDS
+    )
+
+
+def get_contact_enrichment_data(entry, jwt_token):
+    """
+    Enriches contact data using the Zoominfo API.
+
+    Constructs a request to the Zoominfo API using contact entry,
+    and attempts to enrich the provided contact information. The function handles API response
+    and returns enriched data if successful, or None if there's an error.
+
+    Args:
+        entry (dict): A dictionary containing contact information.
+        jwt_token (str): A JWT token for authentication with the Zoominfo API.
+
+    Returns:
+        dict or None: A dictionary containing enriched contact information, or None if there was an error.
+    """
+
+    url = CONTACT_ENRICH_URL
+
+    payload = build_contact_payload(entry)
+
+    response = zoominfoClient.get_client().post(
+        url, jwt_token=jwt_token, json=payload
+    )
 
     if response.status_code != 200:
         print(f"Error: Received status code {response.status_code}")
@@ -52,6 +97,23 @@ def get_contact_enrichment_data(entry, jwt_token):
     return response.json()
 
 
+def is_contact_match(result):
+    """
+    Checks whether a contact enrich result matched a person.
+
+    Args:
+        result (dict): A data.result item from the Zoominfo API, or None.
+
+    Returns:
+        bool: True for a contact-only or full match.
+    """
+
+    return bool(result) and result.get("matchStatus") in [
+        "CONTACT_ONLY_MATCH",
+        "FULL_MATCH",
+    ]
+
+
 def update_contact_data(entry, new_data_item):
     """
     Updates an existing contact entry with new data from the Zoominfo API.
@@ -84,44 +146,77 @@ def update_contact_data(entry, new_data_item):
     return entry
 
 
-def contact_enrich(input_filename, jwt_token, last_auth_time, username, password):
+def contact_enrich_records(
+    data,
+    jwt_token,
+    last_auth_time,
+    username,
+    password,
+    workers=1,
+    batch_size=batchEnrich.MAX_BATCH_SIZE,
+):
     """
-    Enriches the contact data in the input file.
+    Enriches the contact data of a list of records in place.
+    Records without any contact field are skipped, since they cannot match.
 
     Args:
-        input_filename (str): The path to the input file containing the contact data.
+        data (list): The records to enrich.
         jwt_token (str): The JWT token used for authentication.
         last_auth_time (float): The timestamp of the last authentication.
         username (str): The username for authentication.
         password (str): The password for authentication.
+        workers (int): The number of requests sent concurrently.
+        batch_size (int): The number of records enriched per request.
 
     Returns:
         tuple: A tuple containing the updated JWT token and the updated last authentication time.
     """
-    with open(input_filename, "r", encoding="utf-8") as file:
-        old_data = json.load(file)
+    tokens = auth.TokenRefresher(username, password, jwt_token, last_auth_time)
+    progress = workerPool.ProgressCounter("Contacts processed")
+
+    entries = [entry for entry in data if has_contact_fields(entry)]
+
+    results = batchEnrich.enrich_in_batches(
+        CONTACT_ENRICH_URL,
+        entries,
+        build_contact_input,
+        "matchPersonInput",
+        CONTACT_OUTPUT_FIELDS,
+        tokens.get_token,
+        batch_size=batch_size,
+        workers=workers,
+        progress=progress,
+    )
 
-    merged_data = []
-    contacts_processed = 0
+    for entry, result in zip(entries, results):
+        if is_contact_match(result):
+            update_contact_data(entry, result)
 
-    for entry in old_data:
+    return tokens.jwt_token, tokens.last_auth_time
+
+
+def contact_enrich(input_filename, jwt_token, last_auth_time, username, password):
+    """
+    Enriches the contact data in the input file.
 
-        if time.time() - last_auth_time >= 55 * 60:
-            jwt_token = auth.authenticate(username, password)
-            last_auth_time = time.time()
+    Args:
+        input_filename (str): The path to the input file containing the contact data.
+        jwt_token (str): The JWT token used for authentication.
+        last_auth_time (float): The timestamp of the last authentication.
+        username (str): The username for authentication.
+        password (str): The password for authentication.
 
-        new_data = get_contact_enrichment_data(entry, jwt_token)
-        if new_data.get("success") and new_data["data"]["result"][0]["matchStatus"] in [
-            "CONTACT_ONLY_MATCH",
-            "FULL_MATCH",
-        ]:
-            entry = update_contact_data(entry, new_data["data"]["result"][0])
-        merged_data.append(entry)
+    Returns:
+        tuple: A tuple containing the updated JWT token and the updated last authentication time.
+    """
+    with open(input_filename, "r", encoding="utf-8") as file:
+        data = json.load(file)
 
-        contacts_processed += 1
-        print(f"\rContacts processed: {contacts_processed}", end="", flush=True)
+    jwt_token, last_auth_time = contact_enrich_records(
+        data, jwt_token, last_auth_time, username, password
+    )
 
     with open(input_filename, "w", encoding="utf-8") as file:
-        json.dump(merged_data, file, indent=4, ensure_ascii=False)
+        json.dump(data, file, indent=4, ensure_ascii=False)
 
     return jwt_token, last_auth_time
@@ -1,27 +1,218 @@
-import requests
 import json
-import time
+import os
+import threading
+from concurrent.futures import Future
 import auth
+import negativeCache
+import workerPool
+import zoominfoClient
 
 
-def get_contact_person_id(entry, jwt_token, strict, use_location_id):
+CONTACT_SEARCH_URL = "https://api.zoominfo.com/search/contact"
+
+STRICT_MANAGEMENT_LEVELS = "C Level Exec, VP Level Exec, Director, Manager"
+STRICT_DEPARTMENTS = "C-Suite, Operations, Marketing, Engineering & Technical"
+
+# The searches tried for a record, in order, until one returns a contact:
+# (strict, use_location_id, contactMatchCriteria, identifier the search needs)
+SEARCH_CASCADE = [
+    (True, True, "locationId_strict", "zi_c_location_id"),
+    (False, True, "locationId_loose", "zi_c_location_id"),
+    (True, False, "companyId_strict", "zi_c_company_id"),
+    (False, False, "companyId_loose", "zi_c_company_id"),
+]
+
+# Returned to callers waiting on a search that failed, so they search again themselves.
+_RETRY = object()
+
+# "cascade" sends one rpp=1 search per cascade step. "single" fetches one page of the
+# company's contacts, with management level, department and location in the output, and
+# applies the cascade's filters locally to pick the same contact.
+SEARCH_MODES = ("cascade", "single")
+SEARCH_PAGE_SIZE = 100
+SEARCH_PAGE_OUTPUT_FIELDS = ["id", "managementLevel", "department", "locationCompanyId"]
+
+
+def _split_values(text):
+    return {value.strip().lower() for value in text.split(",") if value.strip()}
+
+
+STRICT_MANAGEMENT_LEVEL_SET = _split_values(STRICT_MANAGEMENT_LEVELS)
+STRICT_DEPARTMENT_SET = _split_values(STRICT_DEPARTMENTS)
+
+
+def get_search_mode(mode=None):
     """
-    Retrieves the contact person ID based on the provided entry, JWT token, strict flag, and use_location_id flag.
+    Returns the contact search mode, defaulting to ZOOMINFO_CONTACT_SEARCH_MODE.
+
+    Parameters:
+    - mode (str): "cascade", "single", or None to read the environment.
+
+    Returns:
+    - str: The search mode.
+    """
+
+    if mode is None:
+        mode = os.environ.get("ZOOMINFO_CONTACT_SEARCH_MODE", "cascade")
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown contact search mode: {mode}")
+    return mode
+
+
+def search_key(entry, strict, use_location_id):
+    """
+    Returns the key identifying a contact search, shared by every record of the same
+    company or location.
 
     Parameters:
     - entry (dict): The entry containing the identifiers for the contact search.
-    - jwt_token (str): The JWT token for authentication.
     - strict (bool): Flag indicating whether to apply strict search criteria.
     - use_location_id (bool): Flag indicating whether to use location ID for the search.
 
     Returns:
-    - str or None: The contact person ID if found, or None if not found.
+    - tuple or None: The (id, strict, use_location_id) key, or None if the entry lacks the id.
     """
 
-    url = "https://api.zoominfo.com/search/contact"
+    value = entry.get("zi_c_location_id" if use_location_id else "zi_c_company_id")
+    if not value:
+        return None
+    return (str(value), strict, use_location_id)
 
-    if not entry.get("zi_c_company_id") and not entry.get("zi_c_location_id"):
+
+def no_match_key(entry):
+    """
+    Returns the identity the negative cache records a fruitless search cascade under.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+
+    Returns:
+    - list or None: The [location ID, company ID] pair, or None if the entry has neither.
+    """
+
+    location_id = str(entry.get("zi_c_location_id") or "")
+    company_id = str(entry.get("zi_c_company_id") or "")
+    if not location_id and not company_id:
         return None
+    return [location_id, company_id]
+
+
+def is_known_no_match(entry):
+    """
+    Checks whether the search cascade found no contact for the entry in a recent run.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+
+    Returns:
+    - bool: True if the cascade can be skipped.
+    """
+
+    cache = negativeCache.get_cache()
+    return cache is not None and cache.contains(
+        negativeCache.CONTACT_SEARCH, no_match_key(entry)
+    )
+
+
+def remember_no_match(entry):
+    """
+    Records that the whole search cascade found no contact for the entry.
+    Entries with a failed search are not recorded.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+    """
+
+    cache = negativeCache.get_cache()
+    if cache is not None and entry.get("enrichmentStatus") != "Failed":
+        cache.add(negativeCache.CONTACT_SEARCH, no_match_key(entry))
+
+
+class SearchMemo:
+    """
+    Remembers contact search results for the length of a run, so the search cascade runs
+    once per company or location and every other record there reuses the answer.
+    Concurrent searches for the same key wait for the first one instead of calling the
+    API again. Failed searches are not remembered.
+    """
+
+    def __init__(self):
+        self.searches = 0
+        self.reused = 0
+
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key, search):
+        """
+        Returns the remembered result for a key, or runs the search and remembers it.
+
+        Parameters:
+        - key (tuple): The key from search_key, or ("page", company ID) for a search page.
+        - search (callable): Runs the search and returns (result, error).
+
+        Returns:
+        - tuple: The result (or None) and the error message (or None).
+        """
+
+        while True:
+            with self._lock:
+                future = self._futures.get(key)
+                owner = future is None
+                if owner:
+                    future = self._futures[key] = Future()
+
+            if not owner:
+                result = future.result()
+                if result is _RETRY:
+                    continue
+                with self._lock:
+                    self.reused += 1
+                return result, None
+
+            try:
+                result, error = search()
+            except BaseException:
+                self._forget(key, future)
+                raise
+
+            if error is not None:
+                self._forget(key, future)
+                return None, error
+
+            with self._lock:
+                self.searches += 1
+            future.set_result(result)
+            return result, None
+
+    def _forget(self, key, future):
+        with self._lock:
+            self._futures.pop(key, None)
+        future.set_result(_RETRY)
+
+    def report(self):
+        """
+        Summarizes the searches sent and reused.
+
+        Returns:
+        - str: The report line.
+        """
+
+        return f"Contact searches: {self.searches} sent, {self.reused} reused."
+
+
+def build_search_payload(entry, strict, use_location_id):
+    """
+    Builds the contact search request payload for an entry.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+    - strict (bool): Flag indicating whether to apply strict search criteria.
+    - use_location_id (bool): Flag indicating whether to use location ID for the search.
+
+    Returns:
+    - dict: The request payload.
+    """
 
     payload = {
         "requiredFields": "email, phone",
@@ -41,32 +232,321 @@ def get_contact_person_id(entry, jwt_token, strict, use_location_id):
     if strict:
         payload.update(
             {
-                "managementLevel": "C Level Exec, VP Level Exec, Director, Manager",
-                "department": "C-Suite, Operations, Marketing, Engineering & Technical",
+                "managementLevel": STRICT_MANAGEMENT_LEVELS,
+                "department": STRICT_DEPARTMENTS,
             }
         )
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {jwt_token}",
+    return payload
+
+
+def parse_person_id(response_data):
+    """
+    Returns the personId of the first contact in a contact search response.
+
+    Parameters:
+    - response_data (dict): The parsed contact search response.
+
+    Returns:
+    - str or None: The contact person ID if found, or None if not found.
+    """
+
+    if response_data.get("data") and response_data["data"][0].get("id"):
+        return response_data["data"][0]["id"]
+    else:
+        return None
+
+
+def build_page_payload(entry):
+    """
+    Builds the request payload for one page of a company's contacts, in the same
+    order the cascade searches use.
+
+    Parameters:
+    - entry (dict): The entry containing the company ID.
+
+    Returns:
+    - dict: The request payload.
+    """
+
+    return {
+        "requiredFields": "email, phone",
+        "sortBy": "hierarchy",
+        "rpp": SEARCH_PAGE_SIZE,
+        "page": 1,
+        "companyId": str(entry["zi_c_company_id"]),
+        "outputFields": SEARCH_PAGE_OUTPUT_FIELDS,
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+
+def parse_search_page(response_data):
+    """
+    Returns the contacts of a search page and whether they are all of the company's contacts.
+
+    Parameters:
+    - response_data (dict): The parsed contact search response.
+
+    Returns:
+    - dict: The "contacts" list and the "complete" flag.
+    """
+
+    contacts = response_data.get("data") or []
+    total = response_data.get("totalResults")
+    if total is None:
+        complete = len(contacts) < SEARCH_PAGE_SIZE
+    else:
+        complete = total <= len(contacts)
+    return {"contacts": contacts, "complete": complete}
+
+
+def _contact_values(value):
+    if isinstance(value, str):
+        return _split_values(value)
+    return {str(item).strip().lower() for item in value or []}
+
+
+def matches_search(contact, entry, strict, use_location_id):
+    """
+    Applies the filters of one cascade step to a contact from a search page.
+
+    Parameters:
+    - contact (dict): The contact.
+    - entry (dict): The entry the contact is searched for.
+    - strict (bool): Flag indicating whether to apply strict search criteria.
+    - use_location_id (bool): Flag indicating whether the contact must be at the entry's location.
+
+    Returns:
+    - bool: True if the step's search would return the contact.
+    """
+
+    if use_location_id and str(contact.get("locationCompanyId") or "") != str(
+        entry.get("zi_c_location_id")
+    ):
+        return False
+    if strict:
+        return bool(
+            _contact_values(contact.get("managementLevel"))
+            & STRICT_MANAGEMENT_LEVEL_SET
+            and _contact_values(contact.get("department")) & STRICT_DEPARTMENT_SET
+        )
+    return True
+
+
+def choose_contact(entry, page):
+    """
+    Picks the contact the search cascade would have picked from a page of the company's contacts.
+
+    Parameters:
+    - entry (dict): The entry the contact is searched for.
+    - page (dict): The parsed search page.
+
+    Returns:
+    - tuple: The person ID and contactMatchCriteria (or None, None), and the cascade step
+      to continue from with real searches when an incomplete page cannot decide (or None).
+    """
+
+    for step, (strict, use_location_id, match_criteria, id_field) in enumerate(
+        SEARCH_CASCADE
+    ):
+        if not entry.get(id_field):
+            continue
+        for contact in page["contacts"]:
+            if contact.get("id") and matches_search(
+                contact, entry, strict, use_location_id
+            ):
+                return contact["id"], match_criteria, None
+        if not page["complete"]:
+            return None, None, step
+
+    return None, None, None
+
+
+def search_page(entry, jwt_token):
+    """
+    Sends one request for a page of the entry's company contacts.
+
+    Parameters:
+    - entry (dict): The entry containing the company ID.
+    - jwt_token (str): The JWT token for authentication.
+
+    Returns:
+    - tuple: The parsed page (or None), and the error message if the request failed (or None).
+    """
+
+    response = zoominfoClient.get_client().post(
+        CONTACT_SEARCH_URL, jwt_token=jwt_token, json=build_page_payload(entry)
+    )
 
     if response.status_code != 200:
         print(f"Error: Received status code {response.status_code}")
         print(response.text)
-        entry["enrichmentStatus"] = "Failed"
-        entry["errorMessage"] = response.text
-        return None
+        return None, response.text
 
-    response_data = response.json()
+    return parse_search_page(response.json()), None
 
-    if response_data.get("data") and response_data["data"][0].get("id"):
-        return response_data["data"][0]["id"]
+
+def search_person_id(entry, jwt_token, strict, use_location_id):
+    """
+    Sends one contact search request for an entry.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+    - jwt_token (str): The JWT token for authentication.
+    - strict (bool): Flag indicating whether to apply strict search criteria.
+    - use_location_id (bool): Flag indicating whether to use location ID for the search.
+
+    Returns:
+    - tuple: The contact person ID (or None), and the error message if the request failed (or None).
+    """
+
+    url = CONTACT_SEARCH_URL
+
+    payload = build_search_payload(entry, strict, use_location_id)
+
+    response = zoominfoClient.get_client().post(
+        url, jwt_token=jwt_token, json=payload
+    )
+
+    if response.status_code != 200:
+        print(f"Error: Received status code {response.status_code}")
+        print(response.text)
+        return None, response.text
+
+    return parse_person_id(response.json()), None
+
+
+def get_contact_person_id(entry, jwt_token, strict, use_location_id, memo=None):
+    """
+    Retrieves the contact person ID based on the provided entry, JWT token, strict flag, and use_location_id flag.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+    - jwt_token (str): The JWT token for authentication.
+    - strict (bool): Flag indicating whether to apply strict search criteria.
+    - use_location_id (bool): Flag indicating whether to use location ID for the search.
+    - memo (SearchMemo): Optional memo shared by the records of one run.
+
+    Returns:
+    - str or None: The contact person ID if found, or None if not found.
+    """
+
+    if not entry.get("zi_c_company_id") and not entry.get("zi_c_location_id"):
+        return None
+
+    key = search_key(entry, strict, use_location_id)
+    if memo is None or key is None:
+        person_id, error = search_person_id(entry, jwt_token, strict, use_location_id)
     else:
+        person_id, error = memo.lookup(
+            key,
+            lambda: search_person_id(entry, jwt_token, strict, use_location_id),
+        )
+
+    if error is not None:
+        entry["enrichmentStatus"] = "Failed"
+        entry["errorMessage"] = error
         return None
 
+    return person_id
+
+
+def find_contact(entry, get_token, memo=None, mode="cascade"):
+    """
+    Finds a contact for an entry, walking the search cascade until a search returns one.
+
+    Parameters:
+    - entry (dict): The entry containing the identifiers for the contact search.
+    - get_token (callable): Returns a current JWT token.
+    - memo (SearchMemo): Optional memo shared by the records of one run.
+    - mode (str): "cascade", or "single" to decide from one page of the company's contacts.
+
+    Returns:
+    - tuple: The person ID and contactMatchCriteria, or (None, None) if no contact was found.
+    """
+
+    start = 0
+    if mode == "single" and entry.get("zi_c_company_id"):
+        company_id = str(entry["zi_c_company_id"])
+        if memo is None:
+            page, error = search_page(entry, get_token())
+        else:
+            page, error = memo.lookup(
+                ("page", company_id), lambda: search_page(entry, get_token())
+            )
+        if error is not None:
+            entry["enrichmentStatus"] = "Failed"
+            entry["errorMessage"] = error
+            return None, None
+
+        person_id, match_criteria, start = choose_contact(entry, page)
+        if start is None:
+            return person_id, match_criteria
+
+    for strict, use_location_id, match_criteria, id_field in SEARCH_CASCADE[start:]:
+        if not entry.get(id_field):
+            continue
+        person_id = get_contact_person_id(
+            entry,
+            get_token(),
+            strict=strict,
+            use_location_id=use_location_id,
+            memo=memo,
+        )
+        if person_id:
+            return person_id, match_criteria
+
+    return None, None
+
+
+def contact_search_records(
+    data, jwt_token, last_auth_time, username, password, workers=1, mode=None
+):
+    """
+    Search for contacts for every record that needs one and enrich the records in place.
+
+    Parameters:
+    data (list): The records to process.
+    jwt_token (str): The JWT token for authentication.
+    last_auth_time (float): The timestamp of the last authentication.
+    username (str): The username for authentication.
+    password (str): The password for authentication.
+    workers (int): The number of records searched concurrently.
+    mode (str): "cascade" or "single". Defaults to ZOOMINFO_CONTACT_SEARCH_MODE.
+
+    Returns:
+    tuple: A tuple containing the updated JWT token and last authentication time.
+    """
+
+    tokens = auth.TokenRefresher(username, password, jwt_token, last_auth_time)
+    progress = workerPool.ProgressCounter("Processed records")
+    memo = SearchMemo()
+    mode = get_search_mode(mode)
+
+    def search(entry):
+        if is_known_no_match(entry):
+            entry["newContactFound"] = "No"
+            progress.increment()
+            return False
+
+        person_id, match_criteria = find_contact(entry, tokens.get_token, memo, mode)
+        if person_id:
+            entry["personId"] = person_id
+            entry["contactMatchCriteria"] = match_criteria
+        else:
+            remember_no_match(entry)
+        entry["newContactFound"] = "Yes" if person_id else "No"
+
+        progress.increment()
+        return person_id is not None
+
+    needs_contact = [entry for entry in data if entry.get("needsContact") == "Yes"]
+    person_id_count = sum(workerPool.map_records(search, needs_contact, workers))
+
+    print(f"\nTotal contact's found: {person_id_count}")
+    print(memo.report())
+
+    return tokens.jwt_token, tokens.last_auth_time
+
 
 def contact_search(input_filename, jwt_token, last_auth_time, username, password):
     """
@@ -86,57 +566,9 @@ def contact_search(input_filename, jwt_token, last_auth_time, username, password
     with open(input_filename, "r", encoding="utf-8") as file:
         data = json.load(file)
 
-    processed_records = 0
-    person_id_count = 0
-
-    for entry in data:
-        if time.time() - last_auth_time >= 55 * 60:
-            jwt_token = auth.authenticate(username, password)
-            last_auth_time = time.time()
-
-        if entry.get("needsContact") == "Yes":
-            person_id = None
-
-            if entry.get("zi_c_location_id"):
-                person_id = get_contact_person_id(
-                    entry, jwt_token, strict=True, use_location_id=True
-                )
-                if person_id:
-                    entry["personId"] = person_id
-                    entry["contactMatchCriteria"] = "locationId_strict"
-                    person_id_count += 1
-                else:
-                    person_id = get_contact_person_id(
-                        entry, jwt_token, strict=False, use_location_id=True
-                    )
-                    if person_id:
-                        entry["personId"] = person_id
-                        entry["contactMatchCriteria"] = "locationId_loose"
-                        person_id_count += 1
-
-            if person_id is None and entry.get("zi_c_company_id"):
-                person_id = get_contact_person_id(
-                    entry, jwt_token, strict=True, use_location_id=False
-                )
-                if person_id:
-                    entry["personId"] = person_id
-                    entry["contactMatchCriteria"] = "companyId_strict"
-                    person_id_count += 1
-                else:
-                    person_id = get_contact_person_id(
-                        entry, jwt_token, strict=False, use_location_id=False
-                    )
-                    if person_id:
-                        entry["personId"] = person_id
-                        entry["contactMatchCriteria"] = "companyId_loose"
-                        person_id_count += 1
-
-            entry["newContactFound"] = "Yes" if person_id else "No"
-
-            processed_records += 1
-            print(f"\rProcessed records: {processed_records}", end="", flush=True)
-
-    print(f"\nTotal contact's found: {person_id_count}")
+    jwt_token, last_auth_time = contact_search_records(
+        data, jwt_token, last_auth_time, username, password
+    )
 
     with open(input_filename, "w", encoding="utf-8") as file:
         json.dump(data, file, indent=4, ensure_ascii=False)
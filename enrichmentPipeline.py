@@ -0,0 +1,352 @@
+import contextlib
+import functools
+import json
+import os
+import asyncEnrich
+import auth
+import fileConvert
+import jsonParser
+import contactEnrich
+import companyEnrich
+import contactSearch
+import addNewContact
+import naicsMatch
+import zoominfoClient
+from enrichmentRecord import EnrichmentRecord
+
+# In-memory enrichment pipeline.
+
+# - Loads the input CSV once into a list of records.
+# - Passes the same list through every enrichment stage without touching disk.
+# - Optionally checkpoints the records at stage boundaries so a failed run can resume.
+# - Writes the enhanced CSV once at the end.
+# - API stages can enrich several records at once on a bounded worker pool (workers=N).
+# - For files too large to hold in memory, stream() runs every stage over bounded windows
+#   of rows and writes each finished window straight to the output CSV.
+# - engine="async" runs the API stages on one asyncio event loop instead of threads,
+#   with up to `concurrency` requests in flight over a single aiohttp session.
+# - frame=True runs the local stages (whitespace, needs-contact, NAICS titles, address
+#   backfill) as pandas column operations from frameParser instead of per-row loops.
+#   Local stages that run back to back share one DataFrame, so the records are converted
+#   once per group (e.g. NAICS titles and address backfill together) instead of per stage.
+# - stages=[...] runs only the named stages, e.g. to redo the local clean-up of a file.
+
+# Every stage, in the order the pipeline runs them.
+STAGE_NAMES = (
+    "remove_spaces",
+    "contact_enrich",
+    "company_enrich",
+    "needs_contact",
+    "contact_search",
+    "add_new_contact",
+    "sector_and_industry",
+    "update_address",
+)
+
+
+class EnrichmentPipeline:
+    """
+    Runs every enrichment stage over a single in-memory list of records.
+    """
+
+    def __init__(
+        self,
+        input_csv,
+        username,
+        password,
+        jwt_token=None,
+        checkpoint=False,
+        workers=1,
+        engine="threads",
+        concurrency=asyncEnrich.DEFAULT_CONCURRENCY,
+        frame=False,
+        output_csv=None,
+        stages=None,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            input_csv (str): The path of the input CSV file.
+            username (str): The ZoomInfo username.
+            password (str): The ZoomInfo password.
+            jwt_token (str): An already issued JWT token, if any.
+            checkpoint (bool): Whether to write the records to disk after every stage.
+            workers (int): The number of records each API stage enriches concurrently.
+            engine (str): "threads" to run API stages on the worker pool, or "async" to run them on asyncio.
+            concurrency (int): The number of requests in flight at once with the async engine.
+            frame (bool): Whether to run the local stages on a pandas DataFrame.
+            output_csv (str): The path of the enhanced CSV file. Defaults to "<input> - Enhanced.csv".
+            stages (list): The names of the stages to run, in pipeline order. Defaults to every stage.
+        """
+        if engine not in ("threads", "async"):
+            raise ValueError(f"Unknown enrichment engine: {engine}")
+
+        self.input_csv = input_csv
+        self.output_csv = output_csv or fileConvert.enhanced_csv_path(input_csv)
+        self.checkpoint_path = os.path.splitext(input_csv)[0] + ".checkpoint.json"
+        self.checkpoint = checkpoint
+        self.username = username
+        self.password = password
+        self.token_manager = auth.get_token_manager(username, password)
+        self.token_manager.set_token(jwt_token)
+        self.jwt_token = self.token_manager.jwt_token
+        self.last_auth_time = self.token_manager.issued_at
+        self.records = []
+        self.completed_stages = []
+        self.records_streamed = 0
+        self.workers = workers
+        self.engine = engine
+        self.concurrency = concurrency
+        self.async_runner = None
+
+        if engine == "threads" and workers > 1:
+            zoominfoClient.get_client().ensure_pool_size(workers)
+
+        self.frame_parser = None
+        if frame:
+            import frameParser
+
+            self.frame_parser = frameParser
+
+        # (name, function, needs_auth, message printed before the stage)
+        self.stages = [
+            ("remove_spaces", jsonParser.remove_spaces_records, False, None),
+            (
+                "contact_enrich",
+                contactEnrich.contact_enrich_records,
+                True,
+                "Beginning contact enrichment...",
+            ),
+            (
+                "company_enrich",
+                companyEnrich.company_enrich_records,
+                True,
+                "\nContact enrichment complete.\nBeginning company enrichment...",
+            ),
+            (
+                "needs_contact",
+                jsonParser.update_needs_contact_records,
+                False,
+                "\nCompany enrichment complete.\nScanning for missing Contacts...",
+            ),
+            (
+                "contact_search",
+                contactSearch.contact_search_records,
+                True,
+                "Returning Contact IDs...",
+            ),
+            (
+                "add_new_contact",
+                addNewContact.add_new_contact_records,
+                True,
+                "Updating Missing Contacts...",
+            ),
+            (
+                "sector_and_industry",
+                naicsMatch.get_sector_and_industry_records,
+                False,
+                "\nContact updates complete.\nPreparing new CSV file...",
+            ),
+            ("update_address", jsonParser.update_address_records, False, None),
+        ]
+
+        if stages is not None:
+            unknown = set(stages) - set(STAGE_NAMES)
+            if unknown:
+                raise ValueError(f"Unknown enrichment stages: {', '.join(sorted(unknown))}")
+            self.stages = [stage for stage in self.stages if stage[0] in stages]
+
+    def load(self):
+        """
+        Load the records, resuming from the checkpoint file when one exists.
+        """
+        if self.checkpoint and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            self.records = [EnrichmentRecord(record) for record in state["records"]]
+            self.completed_stages = state["completed_stages"]
+            print(
+                f"Resuming from checkpoint after stage '{self.completed_stages[-1]}'."
+            )
+        else:
+            self.records = fileConvert.read_csv_records(self.input_csv)
+            self.completed_stages = []
+
+    def write_checkpoint(self):
+        """
+        Write the records and the completed stage names to the checkpoint file.
+        """
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"completed_stages": self.completed_stages, "records": self.records},
+                file,
+                ensure_ascii=False,
+                default=EnrichmentRecord.to_dict,
+            )
+        os.replace(temp_path, self.checkpoint_path)
+
+    @contextlib.contextmanager
+    def engine_session(self):
+        """
+        Keep the async engine's event loop and connections open for the duration of a run.
+        Does nothing with the threaded engine.
+        """
+        if self.engine != "async":
+            yield
+            return
+
+        with asyncEnrich.AsyncStageRunner(
+            self.token_manager, self.concurrency
+        ) as runner:
+            self.async_runner = runner
+            try:
+                yield
+            finally:
+                self.async_runner = None
+
+    def apply_stage(self, name, function, needs_auth, records):
+        """
+        Apply one stage function to a list of records.
+
+        Args:
+            name (str): The stage name.
+            function (callable): The record-level stage function.
+            needs_auth (bool): Whether the stage calls the ZoomInfo API.
+            records (list): The records to update in place.
+        """
+        if not needs_auth:
+            function(records)
+            return
+
+        if self.token_manager.needs_refresh():
+            print("Requesting new security token...")
+        self.jwt_token = self.token_manager.get_token()
+        self.last_auth_time = self.token_manager.issued_at
+
+        if self.async_runner is not None:
+            self.async_runner.run(records, [name])
+            self.jwt_token = self.async_runner.jwt_token
+            self.last_auth_time = self.async_runner.last_auth_time
+        else:
+            self.jwt_token, self.last_auth_time = function(
+                records,
+                self.jwt_token,
+                self.last_auth_time,
+                self.username,
+                self.password,
+                workers=self.workers,
+            )
+
+    def stage_groups(self, stages):
+        """
+        Group stages that run with one call. With frame=True, local stages that run back to
+        back are one group, run over a single DataFrame by frameParser.run_local_stages.
+
+        Args:
+            stages (list): (name, function, needs_auth, message) stages, in pipeline order.
+
+        Yields:
+            tuple: The (name, function, needs_auth, message) to run, and the names of the stages it covers.
+        """
+        group = []
+        for stage in stages + [None]:
+            if (
+                stage is not None
+                and self.frame_parser is not None
+                and stage[0] in self.frame_parser.LOCAL_STAGES
+            ):
+                group.append(stage)
+                continue
+
+            if group:
+                names = [name for name, _, _, _ in group]
+                messages = [message for _, _, _, message in group if message]
+                function = functools.partial(
+                    self.frame_parser.run_local_stages, names=names
+                )
+                yield (names[0], function, False, "\n".join(messages) or None), names
+                group = []
+            if stage is not None:
+                yield stage, [stage[0]]
+
+    def run_stage(self, name, function, needs_auth, names=None):
+        """
+        Run one stage, or one group of stages, over the in-memory records.
+
+        Args:
+            name (str): The stage name.
+            function (callable): The record-level stage function.
+            needs_auth (bool): Whether the stage calls the ZoomInfo API.
+            names (list): Every stage name the call completes, for a group. Defaults to [name].
+        """
+        self.apply_stage(name, function, needs_auth, self.records)
+
+        self.completed_stages.extend(names or [name])
+        if self.checkpoint:
+            self.write_checkpoint()
+
+    def run_window(self, records):
+        """
+        Run every stage over one window of records.
+
+        Args:
+            records (list): The records to update in place.
+        """
+        for (name, function, needs_auth, _), _ in self.stage_groups(self.stages):
+            self.apply_stage(name, function, needs_auth, records)
+
+        self.records_streamed += len(records)
+        print(f"\nRows written: {self.records_streamed}")
+
+    def run(self):
+        """
+        Run every stage that has not completed yet and write the enhanced CSV.
+
+        Returns:
+            str: The path of the enhanced CSV file.
+        """
+        self.load()
+
+        with self.engine_session():
+            pending = [
+                stage for stage in self.stages if stage[0] not in self.completed_stages
+            ]
+            for (name, function, needs_auth, message), names in self.stage_groups(
+                pending
+            ):
+                if message:
+                    print(message)
+                self.run_stage(name, function, needs_auth, names)
+
+        fileConvert.write_csv_records(self.records, self.output_csv)
+
+        if self.checkpoint and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        return self.output_csv
+
+    def stream(self, window_size=500):
+        """
+        Stream the input CSV through every stage in windows of window_size rows.
+        Memory use stays flat regardless of the file size. Checkpoints are not written in this mode.
+
+        Args:
+            window_size (int): The number of rows enriched and written at a time.
+
+        Returns:
+            str: The path of the enhanced CSV file.
+        """
+        self.records_streamed = 0
+
+        with self.engine_session():
+            fileConvert.stream_csv_records(
+                self.input_csv,
+                self.output_csv,
+                self.run_window,
+                window_size=window_size,
+                extra_fields=["company_match_criteria"],
+            )
+
+        return self.output_csv
@@ -0,0 +1,270 @@
+import sys
+from collections.abc import MutableMapping
+
+# Fixed-schema record type for enrichment rows.
+
+# - The template mappings below define every field a row can hold.
+# - EnrichmentRecord stores those fields in __slots__ instead of a per-row dict,
+#   and input values are interned so repeated values (countries, states, company names)
+#   are stored once for the whole file.
+# - Records behave like the dicts they replace, so every enrichment stage works unchanged.
+
+
+HEADER_MAPPING = {
+    "Supplier Company": "companyName",
+    "Supplier First Name": "firstName",
+    "Supplier Last Name": "lastName",
+    "Supplier Email": "emailAddress",
+    "Supplier Phone": "phone",
+    "Supplier Street": "companyStreet",
+    "Supplier City": "companyCity",
+    "Supplier State": "companyState",
+    "Supplier Zip Code": "companyZipCode",
+    "Supplier Country": "companyCountry",
+    "Site Name": "siteName",
+    "Site ID": "siteID",
+    "Additional Contact Info": "additionalContactInfo",
+}
+
+NEW_JSON_VALUES = {
+    "zi_c_name": "",
+    "zi_c_company_id": "",
+    "zi_c_company_name": "",
+    "jobTitle": "",
+    "zi_c_phone": "",
+    "zi_c_url": "",
+    "zi_c_linkedin_url": "",
+    "zi_c_naics6": "",
+    "sectorTitle": "",
+    "primaryIndustry": "",
+    "zi_c_employees": "",
+    "zi_c_street": "",
+    "zi_c_city": "",
+    "zi_c_state": "",
+    "zi_c_zip": "",
+    "zi_c_country": "",
+    "zi_c_location_id": "",
+    "needsContact": "",
+    "newContactFound": "",
+    "personId": "",
+    "contactMatchCriteria": "",
+    "enrichmentStatus": "Success",
+    "errorMessage": "",
+}
+
+CSV_MAPPING = {
+    "companyName": "Supplier Company",
+    "companyStreet": "Supplier Street",
+    "companyCity": "Supplier City",
+    "companyState": "Supplier State",
+    "companyZipCode": "Supplier Zip Code",
+    "companyCountry": "Supplier Country",
+    "firstName": "Supplier First Name",
+    "lastName": "Supplier Last Name",
+    "emailAddress": "Supplier Email",
+    "phone": "Supplier Phone",
+    "siteName": "Site Name",
+    "siteID": "Site ID",
+    "additionalContactInfo": "Additional Contact Info",
+    "zi_c_name": "Zoominfo Company Name",
+    "zi_c_company_id": "Zoominfo Company ID",
+    "zi_c_company_name": "Company HQ Name",
+    "zi_c_phone": "Company Phone",
+    "zi_c_url": "Website",
+    "zi_c_linkedin_url": "Company LinkedIn URL",
+    "jobTitle": "Contact Job Title",
+    "zi_c_naics6": "6-digit NAICS Code",
+    "sectorTitle": "Sector Title",
+    "primaryIndustry": "Primary Industry",
+    "zi_c_employees": "Number of Employees",
+    "zi_c_street": "Company Street",
+    "zi_c_city": "Company City",
+    "zi_c_state": "Company State",
+    "zi_c_zip": "Company Zip Code",
+    "zi_c_country": "Company Country",
+    "zi_c_location_id": "Company Location ID",
+    "needsContact": "Needs New Contact",
+    "newContactFound": "New Contact Found",
+    "personId": "Contact Person ID",
+    "contactMatchCriteria": "Contact Match Criteria",
+    "company_match_criteria": "Company Match Criteria",
+    "enrichmentStatus": "Enrichment Status",
+    "errorMessage": "Error Message",
+}
+
+# Every known field, in template order: input columns, added columns, then output-only columns.
+RECORD_FIELDS = tuple(
+    dict.fromkeys(
+        list(HEADER_MAPPING.values()) + list(NEW_JSON_VALUES) + list(CSV_MAPPING)
+    )
+)
+
+_FIELD_SET = frozenset(RECORD_FIELDS)
+
+# Shared, interned default values for the added columns.
+_DEFAULTS = tuple(
+    (key, sys.intern(value)) for key, value in NEW_JSON_VALUES.items()
+)
+
+
+def intern_value(value):
+    """
+    Interns a string value so identical values share one object.
+
+    Args:
+        value: The value to intern.
+
+    Returns:
+        The interned string, or the value unchanged if it is not a string.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class EnrichmentRecord(MutableMapping):
+    """
+    A single enrichment row stored in fixed slots.
+
+    Fields that have never been set are absent, exactly like missing dict keys.
+    Columns outside the template are kept in a small overflow dict.
+    """
+
+    __slots__ = RECORD_FIELDS + ("_extra",)
+
+    def __init__(self, values=None):
+        """
+        Initialize the record with the default added-column values.
+
+        Args:
+            values (dict): Optional initial field values.
+        """
+        self._extra = None
+        for key, value in _DEFAULTS:
+            setattr(self, key, value)
+        if values:
+            self.update(values)
+
+    @classmethod
+    def from_row(cls, row, header_mapping=HEADER_MAPPING, strip_values=False):
+        """
+        Builds a record from a raw CSV row, mapping the template headers to field names.
+
+        Args:
+            row (dict): The CSV row keyed by header.
+            header_mapping (dict): The CSV header to field name mapping.
+            strip_values (bool): Whether to strip leading and trailing spaces from the values.
+
+        Returns:
+            EnrichmentRecord: The new record.
+        """
+        record = cls.__new__(cls)
+        record._extra = None
+        for key, value in row.items():
+            if strip_values and value:
+                value = value.strip()
+            record[header_mapping.get(key, key)] = intern_value(value)
+        for key, value in _DEFAULTS:
+            setattr(record, key, value)
+        return record
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, EnrichmentRecord):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"EnrichmentRecord({self.to_dict()!r})"
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def keys(self):
+        keys = [key for key in RECORD_FIELDS if hasattr(self, key)]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def items(self):
+        items = []
+        for key in RECORD_FIELDS:
+            try:
+                items.append((key, getattr(self, key)))
+            except AttributeError:
+                pass
+        if self._extra:
+            items.extend(self._extra.items())
+        return items
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def update(self, other=(), **kwargs):
+        if hasattr(other, "items"):
+            other = other.items()
+        for key, value in other:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def to_dict(self):
+        """
+        Returns the record as a plain dict, for JSON serialization.
+
+        Returns:
+            dict: The record's fields and values.
+        """
+        return dict(self.items())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._extra = None
+        self.update(state)
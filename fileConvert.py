@@ -1,6 +1,80 @@
 import csv
+import itertools
 import json
 import os
+import textwrap
+from enrichmentRecord import (
+    CSV_MAPPING,
+    HEADER_MAPPING,
+    NEW_JSON_VALUES,
+    EnrichmentRecord,
+)
+
+
+def _map_rows(csv_reader, strip_values=False):
+    """
+    Yields each CSV row as a record with specific field mappings and additional fields.
+
+    Args:
+    csv_reader (csv.DictReader): The reader over the input CSV file.
+    strip_values (bool): Whether to strip leading and trailing spaces from the input values.
+
+    Yields:
+    EnrichmentRecord: The mapped record.
+    """
+
+    for row in csv_reader:
+        yield EnrichmentRecord.from_row(row, HEADER_MAPPING, strip_values)
+
+
+def iter_csv_records(input_csv_filename, strip_values=False):
+    """
+    Lazily reads a CSV file one mapped record at a time.
+
+    Args:
+    input_csv_filename (str): The path to the input CSV file.
+    strip_values (bool): Whether to strip leading and trailing spaces from the input values.
+
+    Yields:
+    EnrichmentRecord: The mapped record.
+    """
+
+    with open(input_csv_filename, "r", encoding="utf-8-sig") as csv_file:
+        yield from _map_rows(csv.DictReader(csv_file), strip_values)
+
+
+def read_csv_records(input_csv_filename):
+    """
+    Read a CSV file into a list of records with specific field mappings and additional fields.
+
+    Args:
+    input_csv_filename (str): The path to the input CSV file.
+
+    Returns:
+    list: The mapped records.
+    """
+
+    return list(iter_csv_records(input_csv_filename))
+
+
+def iter_windows(records, window_size):
+    """
+    Groups an iterable of records into lists of at most window_size records.
+
+    Args:
+    records (iterable): The records to group.
+    window_size (int): The maximum number of records per window.
+
+    Yields:
+    list: The next window of records.
+    """
+
+    records = iter(records)
+    while True:
+        window = list(itertools.islice(records, window_size))
+        if not window:
+            return
+        yield window
 
 
 def csv_to_json(input_csv_filename):
@@ -13,140 +87,53 @@ def csv_to_json(input_csv_filename):
     Returns:
     None
     """
-    
-    header_mapping = {
-        "Supplier Company": "companyName",
-        "Supplier First Name": "firstName",
-        "Supplier Last Name": "lastName",
-        "Supplier Email": "emailAddress",
-        "Supplier Phone": "phone",
-        "Supplier Street": "companyStreet",
-        "Supplier City": "companyCity",
-        "Supplier State": "companyState",
-        "Supplier Zip Code": "companyZipCode",
-        "Supplier Country": "companyCountry",
-        "Site Name": "siteName",
-        "Site ID": "siteID",
-        "Additional Contact Info": "additionalContactInfo",
-    }
-
-    new_json_values = {
-        "zi_c_name": "",
-        "zi_c_company_id": "",
-        "zi_c_company_name": "",
-        "jobTitle": "",
-        "zi_c_phone": "",
-        "zi_c_url": "",
-        "zi_c_linkedin_url": "",
-        "zi_c_naics6": "",
-        "sectorTitle": "",
-        "primaryIndustry": "",
-        "zi_c_employees": "",
-        "zi_c_street": "",
-        "zi_c_city": "",
-        "zi_c_state": "",
-        "zi_c_zip": "",
-        "zi_c_country": "",
-        "zi_c_location_id": "",
-        "needsContact": "",
-        "newContactFound": "",
-        "personId": "",
-        "contactMatchCriteria": "",
-        "enrichmentStatus": "Success",
-        "errorMessage": "",
-    }
-
-    data = []
 
-    with open(input_csv_filename, "r", encoding="utf-8-sig") as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        for row in csv_reader:
+    base_filename, _ = os.path.splitext(input_csv_filename)
+    output_json_filename = base_filename + ".json"
 
-            mapped_row = {}
+    # Records are written one at a time so the whole file is never held in memory.
+    with open(output_json_filename, "w", encoding="utf-8") as json_file:
+        json_file.write("[")
+        separator = "\n"
+        for record in iter_csv_records(input_csv_filename):
+            entry = json.dumps(record.to_dict(), indent=4, ensure_ascii=False)
+            json_file.write(separator + textwrap.indent(entry, "    "))
+            separator = ",\n"
+        json_file.write("\n]" if separator == ",\n" else "]")
 
-            for key, value in row.items():
-                new_key = header_mapping.get(key, key)
-                mapped_row[new_key] = value
 
-            mapped_row.update(new_json_values)
+def enhanced_csv_path(input_filename):
+    """
+    Returns the path of the enhanced CSV file written for an input file.
 
-            data.append(mapped_row)
+    Args:
+        input_filename (str): The path of the input CSV or JSON file.
 
-        base_filename, _ = os.path.splitext(input_csv_filename)
-        output_json_filename = base_filename + ".json"
+    Returns:
+        str: The path of the enhanced CSV file.
+    """
 
-    with open(output_json_filename, "w", encoding="utf-8") as json_file:
-        json.dump(data, json_file, indent=4, ensure_ascii=False)
+    base_name = os.path.splitext(input_filename)[0]
+    return f"{base_name} - Enhanced.csv"
 
 
-def json_to_csv(input_json):
+def write_csv_records(data, csv_file_path):
     """
-    Converts a JSON file to a CSV file with specified column mappings.
+    Writes a list of records to a CSV file with specified column mappings.
 
     Args:
-        input_json (str): The file path of the input JSON file.
+        data (list): The records to write.
+        csv_file_path (str): The path of the output CSV file.
 
     Returns:
         None
     """
 
-    csv_mapping = {
-        "companyName": "Supplier Company",
-        "companyStreet": "Supplier Street",
-        "companyCity": "Supplier City",
-        "companyState": "Supplier State",
-        "companyZipCode": "Supplier Zip Code",
-        "companyCountry": "Supplier Country",
-        "firstName": "Supplier First Name",
-        "lastName": "Supplier Last Name",
-        "emailAddress": "Supplier Email",
-        "phone": "Supplier Phone",
-        "siteName": "Site Name",
-        "siteID": "Site ID",
-        "additionalContactInfo": "Additional Contact Info",
-        "zi_c_name": "Zoominfo Company Name",
-        "zi_c_company_id": "Zoominfo Company ID",
-        "zi_c_company_name": "Company HQ Name",
-        "zi_c_phone": "Company Phone",
-        "zi_c_url": "Website",
-        "zi_c_linkedin_url": "Company LinkedIn URL",
-        "jobTitle": "Contact Job Title",
-        "zi_c_naics6": "6-digit NAICS Code",
-        "sectorTitle": "Sector Title",
-        "primaryIndustry": "Primary Industry",
-        "zi_c_employees": "Number of Employees",
-        "zi_c_street": "Company Street",
-        "zi_c_city": "Company City",
-        "zi_c_state": "Company State",
-        "zi_c_zip": "Company Zip Code",
-        "zi_c_country": "Company Country",
-        "zi_c_location_id": "Company Location ID",
-        "needsContact": "Needs New Contact",
-        "newContactFound": "New Contact Found",
-        "personId": "Contact Person ID",
-        "contactMatchCriteria": "Contact Match Criteria",
-        "company_match_criteria": "Company Match Criteria",
-        "enrichmentStatus": "Enrichment Status",
-        "errorMessage": "Error Message",
-    }
-
-    with open(input_json, "r", encoding="utf-8") as json_file:
-        data = json.load(json_file)
-
     all_keys = set()
     for entry in data:
         all_keys.update(entry.keys())
 
-    mapped_keys = [k for k in csv_mapping if k in all_keys]
-    unmapped_keys = [k for k in all_keys if k not in mapped_keys]
-
-    combined_keys = mapped_keys + unmapped_keys
-
-    headers = [csv_mapping.get(key, key) for key in combined_keys]
-
-    base_name = os.path.splitext(input_json)[0]
-
-    csv_file_path = f"{base_name} - Enhanced.csv"
+    headers = output_headers(all_keys)
 
     with open(csv_file_path, "w", newline="", encoding="utf-8-sig") as csv_file:
         csv_writer = csv.DictWriter(csv_file, fieldnames=headers)
@@ -154,8 +141,149 @@ def json_to_csv(input_json):
         csv_writer.writeheader()
 
         for entry in data:
-            row = {csv_mapping.get(k, k): v for k, v in entry.items()}
-            csv_writer.writerow(row)
+            csv_writer.writerow(to_csv_row(entry))
+
+
+def output_headers(record_keys):
+    """
+    Returns the output CSV headers for a collection of record keys.
+    Known keys come first in template order, followed by any unmapped input columns.
+
+    Args:
+        record_keys (iterable): The record keys that will be written.
+
+    Returns:
+        list: The output CSV headers.
+    """
+
+    record_keys = list(record_keys)
+    mapped_keys = [k for k in CSV_MAPPING if k in record_keys]
+    unmapped_keys = [k for k in record_keys if k not in CSV_MAPPING]
+
+    return [CSV_MAPPING.get(key, key) for key in mapped_keys + unmapped_keys]
+
+
+def to_csv_row(entry):
+    """
+    Maps a record's keys to the output CSV headers.
+
+    Args:
+        entry (dict): The record to map.
+
+    Returns:
+        dict: The row to write.
+    """
+
+    return {CSV_MAPPING.get(k, k): v for k, v in entry.items()}
+
+
+def stream_csv_records(
+    input_csv_filename,
+    output_csv_filename,
+    process_window,
+    window_size=500,
+    extra_fields=(),
+    strip_values=False,
+    skip_records=0,
+    should_stop=None,
+):
+    """
+    Streams a CSV file through process_window and writes each finished window straight to the output CSV.
+    Only one window of records is held in memory at a time, so memory use does not grow with the file size.
+
+    Args:
+        input_csv_filename (str): The path to the input CSV file.
+        output_csv_filename (str): The path of the output CSV file.
+        process_window (callable): Called with each list of records; updates them in place.
+        window_size (int): The maximum number of records per window.
+        extra_fields (iterable): Record keys added by process_window beyond the template fields.
+        strip_values (bool): Whether to strip leading and trailing spaces from the input values.
+        skip_records (int): The number of input records to skip, e.g. those a previous run already wrote.
+        should_stop (callable): Called before each window; when it returns True, the rest of the file is left.
+
+    Returns:
+        int: The number of records written.
+    """
+
+    with open(input_csv_filename, "r", encoding="utf-8-sig") as input_file, open(
+        output_csv_filename, "w", newline="", encoding="utf-8-sig"
+    ) as output_file:
+        return stream_csv_file(
+            input_file,
+            output_file,
+            process_window,
+            window_size=window_size,
+            extra_fields=extra_fields,
+            strip_values=strip_values,
+            skip_records=skip_records,
+            should_stop=should_stop,
+        )
+
+
+def stream_csv_file(
+    input_file,
+    output_file,
+    process_window,
+    window_size=500,
+    extra_fields=(),
+    strip_values=False,
+    skip_records=0,
+    should_stop=None,
+):
+    """
+    Streams CSV text from one file object through process_window into another, window by window.
+    The file objects can be any text streams, e.g. an S3 object body and a multipart upload.
+
+    Args:
+        input_file (file): The readable input CSV text stream.
+        output_file (file): The writable output text stream.
+        process_window (callable): Called with each list of records; updates them in place.
+        window_size (int): The maximum number of records per window.
+        extra_fields (iterable): Record keys added by process_window beyond the template fields.
+        strip_values (bool): Whether to strip leading and trailing spaces from the input values.
+        skip_records (int): The number of input records to skip, e.g. those a previous run already wrote.
+        should_stop (callable): Called before each window; when it returns True, the rest of the file is left.
+
+    Returns:
+        int: The number of records written.
+    """
+
+    record_count = 0
+
+    csv_reader = csv.DictReader(input_file)
+    input_keys = [HEADER_MAPPING.get(key, key) for key in csv_reader.fieldnames or []]
+    record_keys = dict.fromkeys(itertools.chain(input_keys, NEW_JSON_VALUES, extra_fields))
+
+    csv_writer = csv.DictWriter(output_file, fieldnames=output_headers(record_keys))
+    csv_writer.writeheader()
+
+    # Skipped rows are not mapped to records
+    rows = itertools.islice(csv_reader, skip_records, None)
+    for window in iter_windows(_map_rows(rows, strip_values), window_size):
+        if should_stop is not None and should_stop():
+            break
+        process_window(window)
+        csv_writer.writerows(to_csv_row(entry) for entry in window)
+        record_count += len(window)
+
+    return record_count
+
+
+def json_to_csv(input_json):
+    """
+    Converts a JSON file to a CSV file with specified column mappings.
+
+    Args:
+        input_json (str): The file path of the input JSON file.
+
+    Returns:
+        None
+    """
+
+    with open(input_json, "r", encoding="utf-8") as json_file:
+        data = json.load(json_file)
+
+    write_csv_records(data, enhanced_csv_path(input_json))
 
 
 def count_records(input_csv_filename):
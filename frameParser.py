@@ -0,0 +1,287 @@
+import importlib.util
+import itertools
+import re
+import numpy as np
+import pandas as pd
+import naicsMatch
+
+# DataFrame-backed post-processing.
+
+# - The same steps as jsonParser.remove_spaces_records, update_needs_contact_records,
+#   update_address_records and naicsMatch.get_sector_and_industry_records, written as
+#   column operations on a pandas DataFrame.
+# - The *_frame functions update a DataFrame in place, for callers that already hold one.
+# - run_local_stages loads the records into one DataFrame, runs several steps on it and
+#   writes back only the values that changed, so absent fields stay absent. The records
+#   are converted once per call, not once per step.
+# - The *_records functions are drop-in replacements for the loop versions, one step each.
+# - Whitespace is normalized once per distinct value of the whole frame (pd.factorize over
+#   every cell) with the pandas string methods. With pyarrow installed they run on Arrow
+#   strings in C++; without it pandas still calls Python once per distinct value.
+# - EnrichmentPipeline runs each group of back-to-back local stages through
+#   run_local_stages with frame=True (ENRICHMENT_FRAME=1 in main.py).
+
+CONTACT_COLUMNS = ["firstName", "lastName", "emailAddress", "phone"]
+
+# Address column -> the company-master column it is backfilled from.
+ADDRESS_COLUMNS = {
+    "companyStreet": "zi_c_street",
+    "companyCity": "zi_c_city",
+    "companyState": "zi_c_state",
+    "companyZipCode": "zi_c_zip",
+}
+
+
+# Every character str.split() splits on (str.isspace), so the string methods match the loop path exactly.
+WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004"
+    "\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+_WHITESPACE_RUN = "[" + re.escape(WHITESPACE) + "]+"
+
+STRING_DTYPE = pd.StringDtype(
+    "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "python"
+)
+
+
+def records_to_frame(records, columns=None):
+    """
+    Loads columns of a list of records into a DataFrame. Missing fields become None.
+
+    Args:
+        records (list): The records.
+        columns (iterable): The columns to load. Defaults to every field the records have.
+
+    Returns:
+        DataFrame: One row per record, in record order.
+    """
+    if columns is None:
+        columns = dict.fromkeys(itertools.chain.from_iterable(records))
+    return pd.DataFrame(
+        {column: [record.get(column) for record in records] for column in columns},
+        dtype=object,
+    )
+
+
+def write_back(records, frame, before, columns):
+    """
+    Copies the values a step changed from a DataFrame back into the records.
+
+    Args:
+        records (list): The records the DataFrame was loaded from.
+        frame (DataFrame): The DataFrame after the step.
+        before (DataFrame): A copy of the DataFrame before the step.
+        columns (iterable): The columns the step may have changed.
+    """
+    for column in columns:
+        values = frame[column].to_numpy(dtype=object)
+        if column in before:
+            # Compared as object arrays; pandas' own comparison costs more than the step
+            original = before[column].to_numpy(dtype=object)
+            changed = np.flatnonzero(values != original)
+            both_missing = pd.isna(values[changed]) & pd.isna(original[changed])
+            changed = changed[~both_missing]
+        else:
+            changed = range(len(values))
+        for index in changed:
+            records[index][column] = values[index]
+
+
+def normalize_spaces(values):
+    """
+    Collapses runs of whitespace and strips the string values of a column, once per distinct value.
+
+    Args:
+        values (Series): The column.
+
+    Returns:
+        tuple: The normalized column and a boolean array of the rows that changed.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    is_text = uniques.map(type).to_numpy() == str
+    text = uniques[is_text].astype(STRING_DTYPE)
+    text = text.str.replace(_WHITESPACE_RUN, " ", regex=True).str.strip(WHITESPACE)
+
+    normalized = uniques.to_numpy(copy=True)
+    normalized[is_text] = text.to_numpy(dtype=object)
+    changed_uniques = np.zeros(len(uniques), dtype=bool)
+    changed_uniques[is_text] = (text != uniques[is_text]).to_numpy(dtype=bool)
+
+    changed = np.zeros(len(values), dtype=bool)
+    present = codes >= 0
+    changed[present] = changed_uniques[codes[present]]
+    result = values.to_numpy(dtype=object, copy=True)
+    result[changed] = normalized[codes[changed]]
+    return pd.Series(result, index=values.index, dtype=object), changed
+
+
+def remove_spaces_frame(frame):
+    """
+    Collapses runs of whitespace and strips string values, in every column.
+    Values repeated across columns, like a city that is also a company-master city, are normalized once.
+
+    Args:
+        frame (DataFrame): The DataFrame to update in place.
+    """
+    if frame.empty:
+        return
+    cells = frame.to_numpy(dtype=object)
+    normalized, _ = normalize_spaces(pd.Series(cells.ravel(), dtype=object))
+    normalized = normalized.to_numpy().reshape(cells.shape)
+    for position, column in enumerate(frame.columns):
+        frame[column] = pd.Series(normalized[:, position], index=frame.index, dtype=object)
+
+
+def update_needs_contact_frame(frame):
+    """
+    Sets needsContact to "Yes" where every contact column is empty, and "No" elsewhere.
+
+    Args:
+        frame (DataFrame): The DataFrame to update in place.
+
+    Returns:
+        int: The number of rows with missing contact information.
+    """
+    missing = (frame[CONTACT_COLUMNS] == "").all(axis=1)
+    frame["needsContact"] = missing.map({True: "Yes", False: "No"}).astype(object)
+    return int(missing.sum())
+
+
+def update_address_frame(frame):
+    """
+    Backfills the address from the company-master address where all four address columns are empty.
+
+    Args:
+        frame (DataFrame): The DataFrame to update in place.
+    """
+    address = frame[list(ADDRESS_COLUMNS)].fillna("").astype(bool)
+    missing = ~address.any(axis=1)
+    for column, source in ADDRESS_COLUMNS.items():
+        frame.loc[missing, column] = frame.loc[missing, source].fillna("")
+
+
+def get_sector_and_industry_frame(frame):
+    """
+    Maps zi_c_naics6 to sectorTitle and primaryIndustry. Each distinct code is resolved once.
+
+    Args:
+        frame (DataFrame): The DataFrame to update in place.
+    """
+    # Like the loop path, only an empty string means no code; None resolves to "Unknown"
+    codes = frame["zi_c_naics6"].astype(object).where(frame["zi_c_naics6"].notna(), None)
+    has_code = (codes != "").to_numpy(dtype=bool)
+    if not has_code.any():
+        return
+
+    index, uniques = pd.factorize(codes[has_code], use_na_sentinel=False)
+    titles = np.array([naicsMatch.resolve_naics(code) for code in uniques], dtype=object)
+    titles = titles.reshape(len(uniques), 2)
+    for column, position in (("sectorTitle", 0), ("primaryIndustry", 1)):
+        values = frame[column].to_numpy(dtype=object, copy=True)
+        values[has_code] = titles[index, position]
+        frame[column] = pd.Series(values, index=frame.index, dtype=object)
+
+
+# The *_frame function and the columns it reads or writes, per local pipeline stage.
+LOCAL_STAGES = {
+    "remove_spaces": (remove_spaces_frame, []),
+    "needs_contact": (update_needs_contact_frame, CONTACT_COLUMNS + ["needsContact"]),
+    "sector_and_industry": (
+        get_sector_and_industry_frame,
+        ["zi_c_naics6", "sectorTitle", "primaryIndustry"],
+    ),
+    "update_address": (
+        update_address_frame,
+        list(ADDRESS_COLUMNS) + list(ADDRESS_COLUMNS.values()),
+    ),
+}
+
+
+def run_local_stages(data, names):
+    """
+    Runs local clean-up stages over one DataFrame of the records, converting them once.
+
+    Args:
+        data (list): The records to update in place.
+        names (iterable): Stage names from LOCAL_STAGES, in the order to run them.
+    """
+    names = list(names)
+    columns = itertools.chain.from_iterable(LOCAL_STAGES[name][1] for name in names)
+    if "remove_spaces" in names:
+        # Whitespace is normalized in every field the records have; a stage column no
+        # record has is None throughout.
+        frame = records_to_frame(data)
+        for column in dict.fromkeys(columns):
+            if column not in frame:
+                frame[column] = None
+    else:
+        frame = records_to_frame(data, dict.fromkeys(columns))
+    before = frame.copy()
+
+    for name in names:
+        count = LOCAL_STAGES[name][0](frame)
+        if name == "needs_contact":
+            print(str(count) + " missing contacts found.")
+
+    write_back(data, frame, before, frame.columns)
+
+
+def remove_spaces_records(data):
+    """
+    DataFrame-backed jsonParser.remove_spaces_records.
+
+    Args:
+        data (list): The records to update in place.
+    """
+    for column in dict.fromkeys(itertools.chain.from_iterable(data)):
+        values = pd.Series([record.get(column) for record in data], dtype=object)
+        normalized, changed = normalize_spaces(values)
+        normalized = normalized.to_numpy()
+        for index in np.flatnonzero(changed):
+            data[index][column] = normalized[index]
+
+
+def update_needs_contact_records(data):
+    """
+    DataFrame-backed jsonParser.update_needs_contact_records.
+
+    Args:
+        data (list): The records to update in place.
+
+    Returns:
+        int: The number of records with missing contact information.
+    """
+    frame = records_to_frame(data, CONTACT_COLUMNS)
+    count = update_needs_contact_frame(frame)
+    write_back(data, frame, frame.drop(columns="needsContact"), ["needsContact"])
+    print(str(count) + " missing contacts found.")
+    return count
+
+
+def update_address_records(data):
+    """
+    DataFrame-backed jsonParser.update_address_records.
+
+    Args:
+        data (list): The records to update in place.
+    """
+    address = records_to_frame(data, ADDRESS_COLUMNS).fillna("").astype(bool)
+    for index in np.flatnonzero(~address.any(axis=1).to_numpy()):
+        record = data[index]
+        for column, source in ADDRESS_COLUMNS.items():
+            record[column] = record.get(source, "")
+
+
+def get_sector_and_industry_records(data):
+    """
+    DataFrame-backed naicsMatch.get_sector_and_industry_records.
+
+    Args:
+        data (list): The records to update in place.
+    """
+    columns = ["zi_c_naics6", "sectorTitle", "primaryIndustry"]
+    frame = records_to_frame(data, columns)
+    before = frame.copy()
+    get_sector_and_industry_frame(frame)
+    write_back(data, frame, before, columns[1:])
@@ -1,21 +1,18 @@
 import json
 
 
-def updateNeedsContact(input_filename):
+def update_needs_contact_records(data):
     """
-    Updates the 'needsContact' field in the JSON records based on whether the record has missing contact information.
+    Updates the 'needsContact' field of each record based on whether the record has missing contact information.
     If the record has missing contact information, 'needsContact' is set to 'Yes', otherwise it is set to 'No'.
 
     Args:
-    - input_filename (str): The path to the input JSON file.
+    - data (list): The records to update in place.
 
     Returns:
     - count (int): The number of records with missing contact information.
     """
 
-    with open(input_filename, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
     count = 0
 
     for record in data:
@@ -30,13 +27,49 @@ def updateNeedsContact(input_filename):
         else:
             record["needsContact"] = "No"
 
+    print(str(count) + " missing contacts found.")
+    return count
+
+
+def updateNeedsContact(input_filename):
+    """
+    Updates the 'needsContact' field in the JSON records based on whether the record has missing contact information.
+    If the record has missing contact information, 'needsContact' is set to 'Yes', otherwise it is set to 'No'.
+
+    Args:
+    - input_filename (str): The path to the input JSON file.
+
+    Returns:
+    - count (int): The number of records with missing contact information.
+    """
+
+    with open(input_filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    count = update_needs_contact_records(data)
+
     with open(input_filename, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
 
-    print(str(count) + " missing contacts found.")
     return count
 
 
+def remove_spaces_records(data):
+    """
+    Removes leading and trailing spaces from string values in a list of records.
+
+    Args:
+        data (list): The records to update in place.
+
+    Returns:
+        None
+    """
+    for record in data:
+        for key, value in record.items():
+            if isinstance(value, str):
+                record[key] = " ".join(value.strip().split())
+
+
 def remove_spaces(input_filename):
     """
     Removes leading and trailing spaces from string values in a JSON file.
@@ -50,25 +83,19 @@ def remove_spaces(input_filename):
     with open(input_filename, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    for record in data:
-        for key, value in record.items():
-            if isinstance(value, str):
-                record[key] = " ".join(value.strip().split())
+    remove_spaces_records(data)
 
     with open(input_filename, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
 
 
-def update_address(input_filename):
+def update_address_records(data):
     """
-    Update the address fields of each entry in the JSON file located at input_filename.
+    Update the address fields of each record in a list of records.
     If the companyStreet, companyCity, companyState, and companyZipCode fields are all missing,
     they will be updated with the values of zi_c_street, zi_c_city, zi_c_state, and zi_c_zip respectively.
     """
 
-    with open(input_filename, "r", encoding="utf-8") as file:
-        data = json.load(file)
-
     for entry in data:
         if (
             not entry.get("companyStreet")
@@ -81,5 +108,18 @@ def update_address(input_filename):
             entry["companyState"] = entry.get("zi_c_state", "")
             entry["companyZipCode"] = entry.get("zi_c_zip", "")
 
+
+def update_address(input_filename):
+    """
+    Update the address fields of each entry in the JSON file located at input_filename.
+    If the companyStreet, companyCity, companyState, and companyZipCode fields are all missing,
+    they will be updated with the values of zi_c_street, zi_c_city, zi_c_state, and zi_c_zip respectively.
+    """
+
+    with open(input_filename, "r", encoding="utf-8") as file:
+        data = json.load(file)
+
+    update_address_records(data)
+
     with open(input_filename, "w", encoding="utf-8") as file:
         json.dump(data, file, indent=4, ensure_ascii=False)
@@ -1,24 +1,122 @@
 import json
+import os
+import threading
+import time
 import boto3
 import requests
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 from aws_lambda_powertools import Logger
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, NoRegionError
+import tokenManager
+import zoominfoClient
 
 logger = Logger()
 
 # Constants
 ZOOMINFO_SECRET_NAME = "zoominfo/credentials-dev"
 ZOOMINFO_AUTH_URL = "https://api.zoominfo.com/authenticate"
+SECRET_CACHE_TTL = int(os.environ.get("SECRET_CACHE_TTL", 300))  # seconds between version checks
 
 class AuthError(Exception):
     """Custom exception for authentication errors"""
     pass
 
-@logger.inject_lambda_context
+def _create_secrets_client():
+    """Create the Secrets Manager client, or None when no AWS region is configured"""
+    try:
+        return boto3.client('secretsmanager')
+    except NoRegionError:
+        return None
+
+# Created once per container at module load and reused by every warm invocation
+_secrets_client = _create_secrets_client()
+
+def get_secrets_client():
+    """
+    Get the shared Secrets Manager client, creating it on first use if it
+    could not be created at module load
+    
+    Returns:
+        The boto3 Secrets Manager client
+    """
+    global _secrets_client
+    if _secrets_client is None:
+        _secrets_client = boto3.client('secretsmanager')
+    return _secrets_client
+
+class SecretCache:
+    """
+    In-process cache for one Secrets Manager secret.
+    
+    The secret value is reused for `ttl` seconds. After that, a cheap
+    describe_secret call checks whether the AWSCURRENT version changed;
+    the value is only fetched again when a rotation is detected.
+    """
+    
+    def __init__(self, secret_id: str, client: Any = None, ttl: float = SECRET_CACHE_TTL):
+        """
+        Initialize the cache
+        
+        Args:
+            secret_id: Name or ARN of the secret
+            client: Secrets Manager client (defaults to the shared module client)
+            ttl: Seconds a cached value is used before its version is checked
+        """
+        self.secret_id = secret_id
+        self.client = client
+        self.ttl = ttl
+        self._value = None
+        self._version_id = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def _get_client(self):
+        return self.client or get_secrets_client()
+    
+    def _current_version_id(self) -> Optional[str]:
+        """Return the version ID currently labelled AWSCURRENT"""
+        response = self._get_client().describe_secret(SecretId=self.secret_id)
+        for version_id, stages in response.get('VersionIdsToStages', {}).items():
+            if 'AWSCURRENT' in stages:
+                return version_id
+        return None
+    
+    def _fetch(self) -> None:
+        response = self._get_client().get_secret_value(SecretId=self.secret_id)
+        self._value = response['SecretString']
+        self._version_id = response.get('VersionId')
+        self._checked_at = time.time()
+    
+    def get_secret_string(self) -> str:
+        """
+        Get the secret value, fetching it only on first use or after a rotation
+        
+        Returns:
+            str: The SecretString of the current version
+        """
+        with self._lock:
+            if self._value is None:
+                self._fetch()
+            elif time.time() - self._checked_at >= self.ttl:
+                if self._current_version_id() != self._version_id:
+                    logger.info("Secret rotation detected, refreshing cached credentials")
+                    self._fetch()
+                else:
+                    self._checked_at = time.time()
+            return self._value
+    
+    def invalidate(self) -> None:
+        """Drop the cached value so the next read fetches the secret again"""
+        with self._lock:
+            self._value = None
+            self._version_id = None
+
+# Replace with a SecretCache built on a local stand-in client to test without AWS
+secret_cache = SecretCache(ZOOMINFO_SECRET_NAME)
+
 def get_zoominfo_credentials(event: Dict = None, context: Any = None) -> Tuple[str, str]:
     """
-    Retrieve ZoomInfo credentials from AWS Secrets Manager
+    Retrieve ZoomInfo credentials from AWS Secrets Manager, through the in-process secret cache
     
     Args:
         event: Lambda event object (optional)
@@ -31,13 +129,7 @@ def get_zoominfo_credentials(event: Dict = None, context: Any = None) -> Tuple[s
         AuthError: If credentials cannot be retrieved
     """
     try:
-        session = boto3.session.Session()
-        client = session.client('secretsmanager')
-        
-        response = client.get_secret_value(
-            SecretId=ZOOMINFO_SECRET_NAME
-        )
-        secret = json.loads(response['SecretString'])
+        secret = json.loads(secret_cache.get_secret_string())
         
         if 'username' not in secret or 'password' not in secret:
             raise AuthError("Invalid secret format: missing username or password")
@@ -55,7 +147,21 @@ def get_zoominfo_credentials(event: Dict = None, context: Any = None) -> Tuple[s
         logger.error(f"Unexpected error retrieving credentials: {str(e)}")
         raise AuthError(f"Failed to retrieve credentials: {str(e)}")
 
-@logger.inject_lambda_context
+def _request_token() -> requests.Response:
+    """Post the cached credentials to the ZoomInfo auth endpoint"""
+    username, password = get_zoominfo_credentials()
+    
+    payload = json.dumps({
+        "username": username,
+        "password": password
+    })
+    
+    return zoominfoClient.get_client().post(
+        ZOOMINFO_AUTH_URL,
+        data=payload,
+        timeout=10  # Add timeout for the request
+    )
+
 def authenticate() -> str:
     """
     Authenticate with ZoomInfo API using credentials from Secrets Manager
@@ -67,22 +173,13 @@ def authenticate() -> str:
         AuthError: If authentication fails
     """
     try:
-        username, password = get_zoominfo_credentials()
-        
-        payload = json.dumps({
-            "username": username,
-            "password": password
-        })
-        headers = {
-            "Content-Type": "application/json"
-        }
+        response = _request_token()
         
-        response = requests.post(
-            ZOOMINFO_AUTH_URL,
-            headers=headers,
-            data=payload,
-            timeout=10  # Add timeout for the request
-        )
+        if response.status_code == 401:
+            # The credentials may have been rotated since they were cached
+            logger.info("Credentials rejected, re-reading the secret")
+            secret_cache.invalidate()
+            response = _request_token()
         
         if response.status_code != 200:
             logger.error(f"Authentication failed with status {response.status_code}")
@@ -100,19 +197,25 @@ def authenticate() -> str:
         logger.error(f"Unexpected error during authentication: {str(e)}")
         raise AuthError(f"Authentication failed: {str(e)}")
 
-# Optional: Add token caching if needed
-_cached_token = None
-_token_expiry = None
+# Module scope, so warm invocations reuse the token until it is about to expire
+_token_manager = tokenManager.TokenManager(authenticate)
+
+def get_token_manager() -> tokenManager.TokenManager:
+    """
+    Get the shared token manager, registered with the ZoomInfo client so that
+    requests rejected with a 401 re-authenticate once and retry
+    
+    Returns:
+        TokenManager: The module-level token manager
+    """
+    zoominfoClient.get_client().token_manager = _token_manager
+    return _token_manager
 
 def get_valid_token() -> str:
     """
-    Get a valid JWT token, using cached token if available and not expired
+    Get a valid JWT token, using the cached token until it is about to expire
     
     Returns:
         str: Valid JWT token
     """
-    global _cached_token, _token_expiry
-    
-    # TODO: Implement token caching logic here
-    # For now, just get a new token each time
-    return authenticate() 
\ No newline at end of file
+    return get_token_manager().get_token()
@@ -0,0 +1,197 @@
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+from aws_lambda_powertools import Logger
+from lambda_enrichment import EnrichmentProcessor
+import lambda_s3
+import lambda_shards
+
+logger = Logger()
+
+# Time-budget-aware enrichment that continues in a new invocation instead of timing out.
+
+# - EnrichmentProcessor is given context.get_remaining_time_in_millis and stops between
+#   windows once the next window might not finish before the deadline, keeping
+#   ENRICHMENT_TIME_RESERVE_MS to save its progress.
+# - Each invocation writes the rows it enriched as one segment under the run's work
+#   prefix. Every stage runs on a window before it is written, so a checkpoint never
+#   holds a row part-way through the stages: rows_done is the stage progress.
+# - checkpoint.json records the rows written and the segments so far. Its key is the
+#   continuation token in the event this function sends itself; the next invocation
+#   skips rows_done input rows, so no completed row is sent to ZoomInfo again.
+# - The invocation that reaches the end of the file assembles the segments into the
+#   _enhanced.csv (a server-side copy when there is only one) with the shard merge.
+# - A continuation names the segment it expects to write; a duplicate delivery of an
+#   event whose segment is already checkpointed is ignored.
+# - A run is keyed by the S3 event that started it. Every invocation claims the run
+#   before enriching: the checkpoint records its request ID (owner) and when its time
+#   runs out (expires_at).
+# - An S3 event for a run that is already claimed exits, unless the claim is stale: a
+#   Lambda retry of the owning invocation (same request ID), or a claim that made no
+#   progress and submitted no continuation before its time ran out. Those resume the run,
+#   so a failed first invocation is retried instead of leaving the file unenriched.
+
+CONTINUE_ACTION = "continue_enrichment"
+
+def checkpoint_key(prefix: str) -> str:
+    return f"{prefix}checkpoint.json"
+
+def load_checkpoint(client: Any, bucket: str, key: str) -> Dict[str, Any]:
+    body = client.get_object(Bucket=bucket, Key=key)["Body"]
+    try:
+        return json.loads(body.read())
+    finally:
+        body.close()
+
+def load_claim(client: Any, bucket: str, prefix: str) -> Optional[Dict[str, Any]]:
+    """Load the checkpoint a run wrote under its work prefix, or None if it has not started"""
+    return lambda_shards.load_json(client, bucket, checkpoint_key(prefix))
+
+def claim_is_stale(claim: Dict[str, Any], context: Any) -> bool:
+    """
+    Check whether an S3 event may take over a run that is already claimed
+    
+    Args:
+        claim: The run's checkpoint
+        context: The Lambda context of the invocation handling the event
+    
+    Returns:
+        bool: True for a retry of the owning invocation, or a claim that made no progress
+        and submitted no continuation before its time ran out
+    """
+    if claim["finished"]:
+        return False
+    if claim.get("owner") == context.aws_request_id:
+        return True
+    return claim["segments"] == 0 and time.time() * 1000 > claim.get("expires_at", 0)
+
+def save_checkpoint(client: Any, bucket: str, checkpoint: Dict[str, Any]) -> str:
+    """
+    Write the checkpoint of a run to its work prefix
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The bucket
+        checkpoint: The run's progress
+    
+    Returns:
+        str: The checkpoint key, used as the continuation token
+    """
+    key = checkpoint_key(checkpoint["prefix"])
+    client.put_object(Bucket=bucket, Key=key, Body=json.dumps(checkpoint).encode("utf-8"))
+    return key
+
+def _processor(input_file, output_file, remaining_time: Callable[[], int],
+               skip_records: int) -> EnrichmentProcessor:
+    return EnrichmentProcessor(
+        input_file, output_file, remaining_time=remaining_time, skip_records=skip_records
+    )
+
+def enrich_with_budget(client: Any, bucket: str, key: str, output_key: str, context: Any,
+                       orchestrator: Any, work_prefix: str,
+                       checkpoint: Dict[str, Any] = None,
+                       create_processor: Callable[..., Any] = None,
+                       run_id: str = None) -> Optional[Dict[str, Any]]:
+    """
+    Enrich a raw file for as long as the invocation allows, then checkpoint and continue
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The bucket
+        key: The raw CSV object key
+        output_key: The key of the _enhanced.csv
+        context: The Lambda context, whose get_remaining_time_in_millis sets the budget
+        orchestrator: Where the continuation event is submitted
+        work_prefix: The prefix segments and the checkpoint are written under
+        checkpoint: The progress of earlier invocations, or None to start the run
+        create_processor: Builds the processor from (input_file, output_file, remaining_time, skip_records)
+        run_id: Identifies the event that started the run (defaults to the request ID)
+    
+    Returns:
+        The checkpoint, with "finished" set once the output is complete, or None if
+        another invocation holds the run or has finished it
+    """
+    create_processor = create_processor or _processor
+    if checkpoint is None:
+        prefix = lambda_shards.run_prefix(work_prefix, key, run_id or context.aws_request_id)
+        checkpoint = load_claim(client, bucket, prefix)
+        if checkpoint is None:
+            checkpoint = {
+                "source_key": key,
+                "output_key": output_key,
+                "prefix": prefix,
+                "rows_done": 0,
+                "segments": 0,
+                "finished": False
+            }
+        elif claim_is_stale(checkpoint, context):
+            logger.info(f"Resuming run {prefix} of {key} after {checkpoint['rows_done']} rows")
+        else:
+            logger.info(f"Ignoring duplicate event for {key}; run {prefix} already started")
+            return None
+    
+    # Claim the run before enriching, so a duplicate event sees it
+    checkpoint["owner"] = context.aws_request_id
+    checkpoint["expires_at"] = time.time() * 1000 + context.get_remaining_time_in_millis()
+    save_checkpoint(client, bucket, checkpoint)
+    prefix = checkpoint["prefix"]
+    segment = checkpoint["segments"]
+    
+    with lambda_s3.open_s3_text_reader(client, bucket, key) as input_file, \
+         lambda_s3.open_s3_text_writer(client, bucket, lambda_shards.enhanced_shard_key(prefix, segment)) as output_file:
+        processor = create_processor(
+            input_file, output_file, context.get_remaining_time_in_millis, checkpoint["rows_done"]
+        )
+        processor.process()
+    
+    checkpoint["rows_done"] += processor.records_written
+    checkpoint["segments"] = segment + 1
+    checkpoint["finished"] = processor.finished
+    
+    if processor.finished:
+        if checkpoint["segments"] == 1:
+            client.copy_object(
+                Bucket=bucket, Key=output_key,
+                CopySource={"Bucket": bucket, "Key": lambda_shards.enhanced_shard_key(prefix, 0)}
+            )
+        else:
+            lambda_shards.merge_shards(client, bucket, prefix, checkpoint["segments"], output_key)
+        save_checkpoint(client, bucket, checkpoint)
+        logger.info(f"Finished {key}: {checkpoint['rows_done']} rows in {checkpoint['segments']} invocations")
+        return checkpoint
+    
+    token = save_checkpoint(client, bucket, checkpoint)
+    orchestrator.submit({
+        "action": CONTINUE_ACTION,
+        "bucket": bucket,
+        "checkpoint_key": token,
+        "segment": checkpoint["segments"]
+    })
+    logger.info(f"Checkpointed {key} after {checkpoint['rows_done']} rows; continuing in a new invocation")
+    return checkpoint
+
+def resume(client: Any, event: Dict[str, Any], context: Any, orchestrator: Any,
+           create_processor: Callable[..., Any] = None) -> Dict[str, Any]:
+    """
+    Continue a run from the checkpoint named by a continuation event
+    
+    Args:
+        client: The boto3 S3 client
+        event: The continuation event sent by enrich_with_budget
+        context: The Lambda context
+        orchestrator: Where the next continuation event is submitted
+        create_processor: Builds the processor, as for enrich_with_budget
+    
+    Returns:
+        The checkpoint after this invocation
+    """
+    bucket = event["bucket"]
+    checkpoint = load_checkpoint(client, bucket, event["checkpoint_key"])
+    if checkpoint["finished"] or checkpoint["segments"] != event["segment"]:
+        logger.info(f"Ignoring continuation of segment {event['segment']}; the checkpoint has moved on")
+        return checkpoint
+    
+    return enrich_with_budget(
+        client, bucket, checkpoint["source_key"], checkpoint["output_key"], context,
+        orchestrator, None, checkpoint, create_processor
+    )
@@ -1,114 +1,173 @@
+import asyncio
 import json
 import csv
 import os
 import time
-import requests
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any
 from aws_lambda_powertools import Logger
+import asyncEnrich
+import companyDedup
+import companyEnrich
+import contactEnrich
+import fileConvert
 import lambda_auth
+import negativeCache
+import workerPool
+import zoominfoClient
 
 logger = Logger()
 
+COMPANY_URL = "https://api.zoominfo.com/enrich/company"
+
+# Fields _enrich_company fills; rows of the same company receive them from one lookup
+COMPANY_FIELDS = [
+    "zi_c_name", "zi_c_company_id", "zi_c_url", "zi_c_linkedin_url",
+    "zi_c_naics6", "zi_c_employees"
+]
+
 class EnrichmentProcessor:
     """
     Handles the data enrichment process for CSV files in Lambda
     """
     
-    def __init__(self, input_path: str, output_path: str):
+    def __init__(self, input_path: str, output_path: str, window_size: int = 500,
+                 max_workers: int = None, engine: str = None, concurrency: int = None,
+                 remaining_time: Callable[[], int] = None, time_reserve_ms: int = None,
+                 skip_records: int = 0):
         """
         Initialize the enrichment processor
         
         Args:
-            input_path: Path to input CSV file
-            output_path: Path where output CSV will be saved
+            input_path: Path to input CSV file, or a readable text stream such as an S3 object body
+            output_path: Path where output CSV will be saved, or a writable text stream
+            window_size: Number of rows enriched and written at a time
+            max_workers: Number of rows enriched concurrently (defaults to ENRICHMENT_WORKERS)
+            engine: "threads" or "async" (defaults to ENRICHMENT_ENGINE)
+            concurrency: Requests in flight at once with the async engine (defaults to ENRICHMENT_CONCURRENCY)
+            remaining_time: Returns the milliseconds left in the invocation, e.g. context.get_remaining_time_in_millis.
+                When set, the run stops between windows once the next window might not finish in time.
+            time_reserve_ms: Milliseconds kept back for saving progress after stopping
+                (defaults to ENRICHMENT_TIME_RESERVE_MS, or 30000)
+            skip_records: Number of input records to skip because a previous run already wrote them
         """
+        if time_reserve_ms is None:
+            time_reserve_ms = int(os.environ.get("ENRICHMENT_TIME_RESERVE_MS", 30000))
+        if max_workers is None:
+            max_workers = int(os.environ.get("ENRICHMENT_WORKERS", 1))
+        if engine is None:
+            engine = os.environ.get("ENRICHMENT_ENGINE", "threads")
+        if concurrency is None:
+            concurrency = int(os.environ.get("ENRICHMENT_CONCURRENCY", asyncEnrich.DEFAULT_CONCURRENCY))
+        if engine not in ("threads", "async"):
+            raise ValueError(f"Unknown enrichment engine: {engine}")
+        
         self.input_path = input_path
         self.output_path = output_path
+        self.window_size = window_size
+        self.max_workers = max_workers
+        self.engine = engine
+        self.concurrency = concurrency
+        self.remaining_time = remaining_time
+        self.time_reserve_ms = time_reserve_ms
+        self.skip_records = skip_records
+        self.records_written = 0
+        self.finished = False
+        self._window_started = None
+        self._slowest_window_ms = 0
+        self._stopped = False
+        self.async_runner = None
+        self.company_dedup = companyDedup.CompanyDeduplicator(
+            COMPANY_FIELDS, copy_fields=["enrichmentStatus"]
+        )
         self.jwt_token = None
         self.last_auth_time = None
         self.data = []
+        self.client = zoominfoClient.get_client()
+        self.client.ensure_pool_size(max_workers)
         
     def process(self) -> None:
         """
-        Execute the full enrichment process
+        Execute the full enrichment process.
+        
+        Rows are read, enriched and written in windows of window_size rows,
+        so peak memory does not grow with the size of the input file.
+        With remaining_time set, the run may stop early at a window boundary;
+        finished and records_written then tell the caller where to continue.
         """
         try:
             # Get authentication token
             self.jwt_token = lambda_auth.get_valid_token()
+            self.last_auth_time = time.time()
             
-            # Convert CSV to JSON
-            self._csv_to_json()
-            
-            # Enrich the data
-            self._enrich_data()
-            
-            # Convert back to CSV
-            self._json_to_csv()
+            if self.engine == "async":
+                # One event loop and session serve every window of the file
+                token_manager = lambda_auth.get_token_manager()
+                token_manager.set_token(self.jwt_token, self.last_auth_time)
+                with asyncEnrich.AsyncStageRunner(token_manager, self.concurrency) as runner:
+                    self.async_runner = runner
+                    try:
+                        record_count = self._stream_records()
+                    finally:
+                        self.async_runner = None
+            else:
+                record_count = self._stream_records()
+            self.records_written = record_count
+            self.finished = not self._stopped
+            if self.finished:
+                logger.info(f"Enriched and wrote {record_count} records")
+            else:
+                logger.info(f"Enriched and wrote {record_count} records before running out of time")
+            logger.info(self.company_dedup.report())
+            if self.client.cache is not None:
+                logger.info(self.client.cache.report())
+            if negativeCache.get_cache() is not None:
+                logger.info(negativeCache.get_cache().report())
             
         except Exception as e:
             logger.exception("Error during enrichment process")
             raise
             
+    def _stream_records(self) -> int:
+        """Read, enrich and write the input file window by window"""
+        stream = fileConvert.stream_csv_records
+        if not isinstance(self.input_path, (str, os.PathLike)):
+            stream = fileConvert.stream_csv_file
+        return stream(
+            self.input_path,
+            self.output_path,
+            self._enrich_records,
+            window_size=self.window_size,
+            strip_values=True,
+            skip_records=self.skip_records,
+            should_stop=self._out_of_time if self.remaining_time is not None else None
+        )
+    
+    def _out_of_time(self) -> bool:
+        """
+        Check, before a window, whether it could still finish within the invocation.
+        The slowest window so far is the estimate; the first window always runs, so every run makes progress.
+        
+        Returns:
+            True when the run should stop and leave the remaining rows for a continuation
+        """
+        now = time.monotonic()
+        if self._window_started is not None:
+            self._slowest_window_ms = max(self._slowest_window_ms, (now - self._window_started) * 1000)
+        self._window_started = now
+        self._stopped = (
+            self._slowest_window_ms > 0
+            and self.remaining_time() - self.time_reserve_ms < self._slowest_window_ms
+        )
+        return self._stopped
+            
     def _csv_to_json(self) -> None:
         """
         Convert input CSV to JSON format
         """
-        header_mapping = {
-            "Supplier Company": "companyName",
-            "Supplier First Name": "firstName",
-            "Supplier Last Name": "lastName",
-            "Supplier Email": "emailAddress",
-            "Supplier Phone": "phone",
-            "Supplier Street": "companyStreet",
-            "Supplier City": "companyCity",
-            "Supplier State": "companyState",
-            "Supplier Zip Code": "companyZipCode",
-            "Supplier Country": "companyCountry",
-            "Site Name": "siteName",
-            "Site ID": "siteID",
-            "Additional Contact Info": "additionalContactInfo"
-        }
-        
-        new_json_values = {
-            "zi_c_name": "",
-            "zi_c_company_id": "",
-            "zi_c_company_name": "",
-            "jobTitle": "",
-            "zi_c_phone": "",
-            "zi_c_url": "",
-            "zi_c_linkedin_url": "",
-            "zi_c_naics6": "",
-            "sectorTitle": "",
-            "primaryIndustry": "",
-            "zi_c_employees": "",
-            "zi_c_street": "",
-            "zi_c_city": "",
-            "zi_c_state": "",
-            "zi_c_zip": "",
-            "zi_c_country": "",
-            "zi_c_location_id": "",
-            "needsContact": "",
-            "newContactFound": "",
-            "personId": "",
-            "contactMatchCriteria": "",
-            "enrichmentStatus": "Success",
-            "errorMessage": ""
-        }
-        
         try:
-            with open(self.input_path, 'r', encoding='utf-8-sig') as csv_file:
-                csv_reader = csv.DictReader(csv_file)
-                for row in csv_reader:
-                    mapped_row = {}
-                    
-                    # Map CSV headers to JSON fields
-                    for key, value in row.items():
-                        new_key = header_mapping.get(key, key)
-                        mapped_row[new_key] = value.strip()
-                    
-                    # Add additional fields
-                    mapped_row.update(new_json_values)
-                    self.data.append(mapped_row)
+            self.data.extend(
+                fileConvert.iter_csv_records(self.input_path, strip_values=True)
+            )
                     
             logger.info(f"Converted {len(self.data)} records to JSON format")
             
@@ -117,12 +176,8 @@ class EnrichmentProcessor:
             raise
             
     def _check_token(self) -> None:
-        """Check if token needs refresh and get new one if needed"""
-        current_time = time.time()
-        if not self.jwt_token or not self.last_auth_time or \
-           (current_time - self.last_auth_time) > (55 * 60):  # Refresh if older than 55 minutes
-            self.jwt_token = lambda_auth.get_valid_token()
-            self.last_auth_time = current_time
+        """Get the current token from the shared token manager, which refreshes it before it expires"""
+        self.jwt_token = lambda_auth.get_valid_token()
 
     def _enrich_contact(self, entry: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -139,10 +194,6 @@ class EnrichmentProcessor:
             
             # Prepare the API request
             url = "https://api.zoominfo.com/enrich/contact"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.jwt_token}"
-            }
             
             payload = {
                 "firstName": entry.get("firstName", ""),
@@ -152,7 +203,7 @@ class EnrichmentProcessor:
                 "companyName": entry.get("companyName", "")
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.client.post(url, jwt_token=self.jwt_token, json=payload)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -182,6 +233,49 @@ class EnrichmentProcessor:
             
         return entry
 
+    def _company_payload(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the /enrich/company request for an entry"""
+        return {
+            "companyName": entry.get("companyName", ""),
+            "street": entry.get("companyStreet", ""),
+            "city": entry.get("companyCity", ""),
+            "state": entry.get("companyState", ""),
+            "zipCode": entry.get("companyZipCode", ""),
+            "country": entry.get("companyCountry", "")
+        }
+
+    def _apply_company_response(self, entry: Dict[str, Any], response: Any) -> None:
+        """
+        Fill an entry's company fields and status from an /enrich/company response
+        
+        Args:
+            entry: The entry the request was built from
+            response: The response, from either engine
+        """
+        if response.status_code == 200:
+            response_data = response.json()
+            if response_data.get("success") and response_data.get("data", {}).get("result"):
+                result = response_data["data"]["result"][0]
+                if result.get("data"):
+                    company_data = result["data"]
+                    entry.update({
+                        "zi_c_name": company_data.get("zi_c_name", ""),
+                        "zi_c_company_id": company_data.get("zi_c_company_id", ""),
+                        "zi_c_url": company_data.get("zi_c_url", ""),
+                        "zi_c_linkedin_url": company_data.get("zi_c_linkedin_url", ""),
+                        "zi_c_naics6": company_data.get("zi_c_naics6", ""),
+                        "zi_c_employees": company_data.get("zi_c_employees", ""),
+                        "enrichmentStatus": "Success"
+                    })
+                else:
+                    entry["enrichmentStatus"] = "No Data Available"
+            else:
+                entry["enrichmentStatus"] = "No Match Found"
+                companyEnrich.remember_no_match(entry)
+        else:
+            logger.error(f"Company enrichment failed with status {response.status_code}: {response.text}")
+            entry["enrichmentStatus"] = f"API Error: {response.status_code}"
+
     def _enrich_company(self, entry: Dict[str, Any]) -> Dict[str, Any]:
         """
         Enrich company information using ZoomInfo API
@@ -192,49 +286,43 @@ class EnrichmentProcessor:
         Returns:
             Dictionary with enriched company information
         """
+        # Companies without a match in a recent run are not looked up again
+        if companyEnrich.is_known_no_match(entry):
+            entry["enrichmentStatus"] = "No Match Found"
+            return entry
+            
         try:
             self._check_token()
+            response = self.client.post(COMPANY_URL, jwt_token=self.jwt_token, json=self._company_payload(entry))
+            self._apply_company_response(entry, response)
+                
+        except Exception as e:
+            logger.error(f"Error enriching company: {str(e)}")
+            entry["enrichmentStatus"] = f"Error: {str(e)}"
             
-            # Prepare the API request
-            url = "https://api.zoominfo.com/enrich/company"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.jwt_token}"
-            }
-            
-            payload = {
-                "companyName": entry.get("companyName", ""),
-                "street": entry.get("companyStreet", ""),
-                "city": entry.get("companyCity", ""),
-                "state": entry.get("companyState", ""),
-                "zipCode": entry.get("companyZipCode", ""),
-                "country": entry.get("companyCountry", "")
-            }
+        return entry
+
+    async def _enrich_company_async(self, client: Any, tokens: Any, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        _enrich_company on the async engine: the same request and fields, on the runner's session
+        
+        Args:
+            client: The runner's AsyncZoomInfoClient
+            tokens: The runner's AsyncTokenSource
+            entry: Dictionary containing company information
             
-            response = requests.post(url, headers=headers, json=payload)
+        Returns:
+            Dictionary with enriched company information
+        """
+        # The negative cache is SQLite, so it is read and written off the event loop
+        if await asyncio.to_thread(companyEnrich.is_known_no_match, entry):
+            entry["enrichmentStatus"] = "No Match Found"
+            return entry
             
-            if response.status_code == 200:
-                response_data = response.json()
-                if response_data.get("success") and response_data.get("data", {}).get("result"):
-                    result = response_data["data"]["result"][0]
-                    if result.get("data"):
-                        company_data = result["data"]
-                        entry.update({
-                            "zi_c_name": company_data.get("zi_c_name", ""),
-                            "zi_c_company_id": company_data.get("zi_c_company_id", ""),
-                            "zi_c_url": company_data.get("zi_c_url", ""),
-                            "zi_c_linkedin_url": company_data.get("zi_c_linkedin_url", ""),
-                            "zi_c_naics6": company_data.get("zi_c_naics6", ""),
-                            "zi_c_employees": company_data.get("zi_c_employees", ""),
-                            "enrichmentStatus": "Success"
-                        })
-                    else:
-                        entry["enrichmentStatus"] = "No Data Available"
-                else:
-                    entry["enrichmentStatus"] = "No Match Found"
-            else:
-                logger.error(f"Company enrichment failed with status {response.status_code}: {response.text}")
-                entry["enrichmentStatus"] = f"API Error: {response.status_code}"
+        try:
+            jwt_token = await tokens.get_token()
+            response = await client.post(COMPANY_URL, jwt_token=jwt_token, json=self._company_payload(entry))
+            await asyncio.to_thread(self._apply_company_response, entry, response)
                 
         except Exception as e:
             logger.error(f"Error enriching company: {str(e)}")
@@ -243,80 +331,65 @@ class EnrichmentProcessor:
         return entry
 
     def _update_needs_contact(self, entry: Dict[str, Any]) -> Dict[str, Any]:
-        """Update the needsContact flag based on contact information presence"""
-        has_contact = all([
-            entry.get("firstName", "").strip(),
-            entry.get("lastName", "").strip(),
-            entry.get("emailAddress", "").strip(),
-            entry.get("phone", "").strip()
-        ])
-        entry["needsContact"] = "No" if has_contact else "Yes"
+        """
+        Update the needsContact flag with the desktop rule (jsonParser.update_needs_contact_records):
+        a row needs a contact only when all four contact fields are empty
+        """
+        entry["needsContact"] = "No" if contactEnrich.has_contact_fields(entry) else "Yes"
         return entry
 
-    def _enrich_data(self) -> None:
+    def _enrich_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Enrich the data using various enrichment modules
+        Run the per-record steps for a single record whose company data is set
+        
+        Args:
+            entry: The record to enrich
+            
+        Returns:
+            The enriched record
+        """
+        # Flag rows without any contact field. Contact enrichment cannot match those, so,
+        # as before streaming, no row is sent to /enrich/contact and no credits are spent.
+        entry = self._update_needs_contact(entry)
+        
+        return entry
+
+    def _enrich_records(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Enrich a window of records in place, up to max_workers at a time
+        (or up to concurrency requests at a time with the async engine)
+        
+        Args:
+            records: The records to enrich
         """
         try:
-            for entry in self.data:
-                # Check and refresh token if needed
-                self._check_token()
-                
-                # Enrich company data
-                entry = self._enrich_company(entry)
-                
-                # Enrich contact data if needed
-                if entry["needsContact"] == "Yes":
-                    entry = self._enrich_contact(entry)
+            # One company lookup per unique company, shared with its other rows.
+            # Both engines run the same steps; only how the lookups are sent differs.
+            lookups, pending = self.company_dedup.plan(records)
+            if self.async_runner is not None:
+                self.async_runner.run_each(self._enrich_company_async, lookups)
+                self.jwt_token = self.async_runner.jwt_token
+                self.last_auth_time = self.async_runner.last_auth_time
+            else:
+                workerPool.map_records(self._enrich_company, lookups, self.max_workers)
+            self.company_dedup.fan_out(pending)
+            
+            workerPool.map_records(self._enrich_entry, records, self.max_workers)
                     
         except Exception as e:
             logger.error(f"Error during data enrichment: {str(e)}")
             raise
+
+    def _enrich_data(self) -> None:
+        """
+        Enrich the data using various enrichment modules
+        """
+        self._enrich_records(self.data)
             
     def _json_to_csv(self) -> None:
         """
         Convert enriched JSON data back to CSV format
         """
-        csv_mapping = {
-            "companyName": "Supplier Company",
-            "companyStreet": "Supplier Street",
-            "companyCity": "Supplier City",
-            "companyState": "Supplier State",
-            "companyZipCode": "Supplier Zip Code",
-            "companyCountry": "Supplier Country",
-            "firstName": "Supplier First Name",
-            "lastName": "Supplier Last Name",
-            "emailAddress": "Supplier Email",
-            "phone": "Supplier Phone",
-            "siteName": "Site Name",
-            "siteID": "Site ID",
-            "additionalContactInfo": "Additional Contact Info",
-            "zi_c_name": "Zoominfo Company Name",
-            "zi_c_company_id": "Zoominfo Company ID",
-            "zi_c_company_name": "Company HQ Name",
-            "zi_c_phone": "Company Phone",
-            "zi_c_url": "Website",
-            "zi_c_linkedin_url": "Company LinkedIn URL",
-            "jobTitle": "Contact Job Title",
-            "zi_c_naics6": "6-digit NAICS Code",
-            "sectorTitle": "Sector Title",
-            "primaryIndustry": "Primary Industry",
-            "zi_c_employees": "Number of Employees",
-            "zi_c_street": "Company Street",
-            "zi_c_city": "Company City",
-            "zi_c_state": "Company State",
-            "zi_c_zip": "Company Zip Code",
-            "zi_c_country": "Company Country",
-            "zi_c_location_id": "Company Location ID",
-            "needsContact": "Needs New Contact",
-            "newContactFound": "New Contact Found",
-            "personId": "Contact Person ID",
-            "contactMatchCriteria": "Contact Match Criteria",
-            "company_match_criteria": "Company Match Criteria",
-            "enrichmentStatus": "Enrichment Status",
-            "errorMessage": "Error Message"
-        }
-        
         try:
             # Get all fields from the data
             all_keys = set()
@@ -324,9 +397,7 @@ class EnrichmentProcessor:
                 all_keys.update(entry.keys())
                 
             # Create headers list
-            mapped_keys = [k for k in csv_mapping if k in all_keys]
-            unmapped_keys = [k for k in all_keys if k not in mapped_keys]
-            headers = [csv_mapping.get(key, key) for key in mapped_keys + unmapped_keys]
+            headers = fileConvert.output_headers(all_keys)
             
             # Write CSV file
             with open(self.output_path, 'w', newline='', encoding='utf-8-sig') as csv_file:
@@ -334,8 +405,7 @@ class EnrichmentProcessor:
                 writer.writeheader()
                 
                 for entry in self.data:
-                    row = {csv_mapping.get(k, k): v for k, v in entry.items()}
-                    writer.writerow(row)
+                    writer.writerow(fileConvert.to_csv_row(entry))
                     
             logger.info(f"Converted {len(self.data)} records to CSV format")
             
@@ -2,30 +2,182 @@ import json
 import os
 import boto3
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from urllib.parse import unquote_plus
-from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from aws_lambda_powertools.utilities.data_classes import S3Event
 from aws_lambda_powertools.metrics import Metrics
+from botocore.exceptions import NoRegionError
 from lambda_enrichment import EnrichmentProcessor
+import lambda_checkpoint
+import lambda_s3
+import lambda_shards
+import naicsMatch
+import negativeCache
+import responseCache
+import zoominfoClient
+
+# Lambda entry point.
+
+# - Everything that outlives an invocation is created once per container, during init:
+#   the S3 client, the pooled ZoomInfo session, the NAICS lookup table and the response
+#   and negative caches in /tmp. Warm invocations only do per-file work.
+# - The X-Ray SDK is only imported when tracing is on (POWERTOOLS_TRACE_DISABLED unset or
+#   false); Lambda active tracing still records every invocation without it. pandas and
+#   pydantic are not on the handler path and are never imported.
+# - benchmarks/lambda_cold_start.py measures the init duration against a git revision.
+# - With ENRICHMENT_S3_STREAMING=true the CSV is read from the get_object body as it is
+#   parsed and the output is sent as a multipart upload while rows are enriched (see
+#   lambda_s3), so nothing is staged in /tmp and file size is not limited by ephemeral
+#   storage. Otherwise the file is downloaded to /tmp, processed and uploaded.
+# - Raw files of at least ENRICHMENT_SHARD_THRESHOLD_MB are not enriched here: the
+#   invocation splits them into shards under WORK_PREFIX and invokes this function
+#   asynchronously once per shard, so large files are enriched in parallel within the
+#   timeout. The last worker to finish merges the shards into the _enhanced.csv (see
+#   lambda_shards). The threshold defaults to 0, which turns sharding off.
+# - With ENRICHMENT_CHECKPOINT=true a file that would outrun the timeout stops between
+#   windows, checkpoints its progress to S3 and continues in a new invocation of this
+#   function, which skips the rows already enriched (see lambda_checkpoint).
 
 # Initialize AWS Lambda Powertools
 logger = Logger()
-tracer = Tracer()
 metrics = Metrics()
 
 # Constants for S3 paths
 BUCKET_NAME = 'intit-systemsautomations'
 RAW_PREFIX = 'SupplierOperations/dataEnrichment/raw/'
 ENHANCED_PREFIX = 'SupplierOperations/dataEnrichment/enhanced/'
+WORK_PREFIX = 'SupplierOperations/dataEnrichment/work/'
 TEMP_DIR = '/tmp'
 
 class EnrichmentError(Exception):
     """Custom exception for enrichment process errors"""
     pass
 
-@tracer.capture_lambda_handler
+def _tracing_enabled() -> bool:
+    return os.environ.get("POWERTOOLS_TRACE_DISABLED", "false").lower() not in ("1", "true")
+
+def _create_tracer():
+    """Create the Powertools tracer, or None when tracing is disabled"""
+    if not _tracing_enabled():
+        return None
+    from aws_lambda_powertools import Tracer
+    return Tracer()
+
+def _capture_lambda_handler(function):
+    """Trace the handler with X-Ray when the tracer is enabled"""
+    if tracer is None:
+        return function
+    return tracer.capture_lambda_handler(function)
+
+def _create_s3_client():
+    """Create the S3 client, or None when no AWS region is configured"""
+    try:
+        return boto3.client('s3')
+    except NoRegionError:
+        return None
+
+tracer = _create_tracer()
+
+# Created once per container at module load and reused by every warm invocation
+_s3_client = _create_s3_client()
+zoominfoClient.get_client()
+naicsMatch.load_prefix_index()
+responseCache.get_cache()
+negativeCache.get_cache()
+
+def get_s3_client():
+    """
+    Get the shared S3 client, creating it on first use if it could not be
+    created at module load
+    
+    Returns:
+        The boto3 S3 client
+    """
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+_orchestrator = None
+
+def get_orchestrator():
+    """
+    Get the orchestrator shard worker events are submitted to, creating it on first use
+    
+    Returns:
+        The orchestrator, which invokes this function asynchronously by default
+    """
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = lambda_shards.LambdaOrchestrator()
+    return _orchestrator
+
+def _object_size(event: Dict[str, Any], s3_client: Any, bucket: str, key: str) -> int:
+    """Get the object size from the S3 event, or from S3 when the event has none"""
+    size = event["Records"][0]["s3"]["object"].get("size")
+    if size is None:
+        size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    return size
+
+def _event_run_id(event: Dict[str, Any], context: LambdaContext) -> str:
+    """
+    Identify the upload an S3 event reports, so redeliveries and retries of the event map
+    to the same run while a new upload of the same key starts a new one
+    """
+    s3_object = event["Records"][0]["s3"]["object"]
+    return (s3_object.get("sequencer") or s3_object.get("versionId")
+            or s3_object.get("eTag") or context.aws_request_id)
+
+def _streaming_enabled() -> bool:
+    return os.environ.get("ENRICHMENT_S3_STREAMING", "false").lower() in ("1", "true")
+
+def _checkpoint_enabled() -> bool:
+    return os.environ.get("ENRICHMENT_CHECKPOINT", "false").lower() in ("1", "true")
+
+def _checkpoint_response(checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the handler response for a time-budgeted run and record its metrics"""
+    if checkpoint['finished']:
+        metrics.add_metric(name="FilesProcessed", unit="Count", value=1)
+        message = 'File processed successfully'
+    else:
+        metrics.add_metric(name="Continuations", unit="Count", value=1)
+        message = 'Progress checkpointed, continuing in a new invocation'
+    return {
+        'statusCode': 200 if checkpoint['finished'] else 202,
+        'body': json.dumps({
+            'message': message,
+            'input_file': checkpoint['source_key'],
+            'output_file': checkpoint['output_key'],
+            'rows_done': checkpoint['rows_done']
+        })
+    }
+
+def _duplicate_event_response(key: str) -> Dict[str, Any]:
+    """Build the handler response for an S3 event whose run another invocation holds"""
+    metrics.add_metric(name="DuplicateEvents", unit="Count", value=1)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Enrichment of this upload already started, ignoring',
+            'file': key
+        })
+    }
+
+def parse_s3_event(event: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Get the bucket and the decoded object key of the first record of an S3 event
+    
+    Args:
+        event: The S3 notification event
+        
+    Returns:
+        Tuple containing the bucket name and the object key
+    """
+    s3 = event["Records"][0]["s3"]
+    return s3["bucket"]["name"], unquote_plus(s3["object"]["key"])
+
+@_capture_lambda_handler
 @logger.inject_lambda_context
 @metrics.log_metrics
 def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
@@ -40,10 +192,21 @@ def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
         Dict containing the processing results
     """
     try:
+        # Shard worker submitted by a coordinating invocation
+        if event.get("action") == lambda_shards.SHARD_ACTION:
+            result = lambda_shards.run_shard(get_s3_client(), event)
+            metrics.add_metric(name="ShardsProcessed", unit="Count", value=1)
+            if result["merged"]:
+                metrics.add_metric(name="FilesProcessed", unit="Count", value=1)
+            return {'statusCode': 200, 'body': json.dumps(result)}
+        
+        # Continuation of a run that checkpointed before its deadline
+        if event.get("action") == lambda_checkpoint.CONTINUE_ACTION:
+            checkpoint = lambda_checkpoint.resume(get_s3_client(), event, context, get_orchestrator())
+            return _checkpoint_response(checkpoint)
+        
         # Parse S3 event
-        s3_event = S3Event(event)
-        bucket = s3_event.bucket_name
-        key = unquote_plus(s3_event.object_key)
+        bucket, key = parse_s3_event(event)
         
         # Validate event is for raw directory
         if not key.startswith(RAW_PREFIX):
@@ -63,25 +226,63 @@ def handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
         output_path = os.path.join(TEMP_DIR, output_filename)
         enhanced_key = f"{ENHANCED_PREFIX}{output_filename}"
         
-        # Initialize S3 client
-        s3_client = boto3.client('s3')
-        
-        # Download input file
-        logger.info(f"Downloading file {key} from bucket {bucket}")
-        s3_client.download_file(bucket, key, input_path)
+        # Shared S3 client, created at init
+        s3_client = get_s3_client()
         
-        # Process the file
-        logger.info("Starting enrichment process")
-        processor = EnrichmentProcessor(input_path, output_path)
-        processor.process()
-        
-        # Upload processed file
-        logger.info(f"Uploading enhanced file to {enhanced_key}")
-        s3_client.upload_file(output_path, bucket, enhanced_key)
+        threshold = lambda_shards.SHARD_THRESHOLD_BYTES
+        if threshold and _object_size(event, s3_client, bucket, key) >= threshold:
+            # Fan out: split into shards and let parallel invocations enrich them
+            manifest = lambda_shards.coordinate(
+                s3_client, bucket, key, enhanced_key, get_orchestrator(), WORK_PREFIX,
+                run_id=_event_run_id(event, context), request_id=context.aws_request_id
+            )
+            if manifest is None:
+                return _duplicate_event_response(key)
+            metrics.add_metric(name="FilesSharded", unit="Count", value=1)
+            return {
+                'statusCode': 202,
+                'body': json.dumps({
+                    'message': 'File split into shards for parallel enrichment',
+                    'input_file': key,
+                    'output_file': enhanced_key,
+                    'shards': manifest['shard_count']
+                })
+            }
         
-        # Cleanup temporary files
-        os.remove(input_path)
-        os.remove(output_path)
+        if _checkpoint_enabled():
+            # Enrich within the time left, checkpointing and continuing if it runs out
+            logger.info(f"Enriching file {key} from bucket {bucket} within the time budget")
+            checkpoint = lambda_checkpoint.enrich_with_budget(
+                s3_client, bucket, key, enhanced_key, context, get_orchestrator(), WORK_PREFIX,
+                run_id=_event_run_id(event, context)
+            )
+            if checkpoint is None:
+                return _duplicate_event_response(key)
+            return _checkpoint_response(checkpoint)
+        elif _streaming_enabled():
+            # Read, enrich and upload at the same time, without touching /tmp
+            logger.info(f"Streaming file {key} from bucket {bucket} to {enhanced_key}")
+            with lambda_s3.open_s3_text_reader(s3_client, bucket, key) as input_file, \
+                 lambda_s3.open_s3_text_writer(s3_client, bucket, enhanced_key) as output_file:
+                processor = EnrichmentProcessor(input_file, output_file)
+                processor.process()
+        else:
+            # Download input file
+            logger.info(f"Downloading file {key} from bucket {bucket}")
+            s3_client.download_file(bucket, key, input_path)
+            
+            # Process the file
+            logger.info("Starting enrichment process")
+            processor = EnrichmentProcessor(input_path, output_path)
+            processor.process()
+            
+            # Upload processed file
+            logger.info(f"Uploading enhanced file to {enhanced_key}")
+            s3_client.upload_file(output_path, bucket, enhanced_key)
+            
+            # Cleanup temporary files
+            os.remove(input_path)
+            os.remove(output_path)
         
         metrics.add_metric(name="FilesProcessed", unit="Count", value=1)
         
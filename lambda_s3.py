@@ -0,0 +1,203 @@
+import contextlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+from aws_lambda_powertools import Logger
+
+logger = Logger()
+
+# S3 streaming for the Lambda handler.
+
+# - open_s3_text_reader decodes the get_object body as it is read, so the CSV parser
+#   pulls the object from S3 window by window instead of downloading it to /tmp first.
+# - open_s3_text_writer buffers the encoded output and sends every full part of a
+#   multipart upload from a background thread while the next rows are enriched.
+#   Download, enrichment and upload overlap, and neither file touches local disk.
+# - Output smaller than one part is sent with a single put_object. If enrichment fails,
+#   the multipart upload is aborted so no partial object or orphaned parts are left.
+
+# S3 parts other than the last must be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = int(os.environ.get("S3_PART_SIZE_MB", 8)) * 1024 * 1024
+# Parts uploading at once; bounds the output buffered in memory to about this many parts
+DEFAULT_MAX_IN_FLIGHT = 2
+# Bytes requested from the get_object body at a time
+READ_BUFFER_SIZE = 1024 * 1024
+
+class S3BodyReader(io.RawIOBase):
+    """
+    Readable binary stream over a get_object body, so it can be buffered and decoded by io
+    """
+    
+    def __init__(self, body: Any):
+        self.body = body
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        data = self.body.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    
+    def close(self) -> None:
+        if not self.closed:
+            self.body.close()
+        super().close()
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Writable binary stream that uploads to an S3 object in parts as data arrives
+    """
+    
+    def __init__(self, client: Any, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        """
+        Initialize the writer. The multipart upload is created when the first part is full.
+        
+        Args:
+            client: The boto3 S3 client
+            bucket: The destination bucket
+            key: The destination object key
+            part_size: Bytes per uploaded part, at least MIN_PART_SIZE
+            max_in_flight: Parts uploading at once before writes wait
+        """
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_in_flight = max_in_flight
+        self.upload_id = None
+        self.bytes_written = 0
+        self.aborted = False
+        self._buffer = bytearray()
+        self._parts = []
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        if self.aborted:
+            return len(data)
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+    
+    def _upload_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+            self.upload_id = response["UploadId"]
+        
+        # Wait for the oldest part before buffering more than max_in_flight parts
+        in_flight = [future for _, future in self._parts if not future.done()]
+        if len(in_flight) >= self.max_in_flight:
+            in_flight[0].result()
+        
+        part_number = len(self._parts) + 1
+        future = self._executor.submit(
+            self.client.upload_part,
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        self._parts.append((part_number, future))
+    
+    def close(self) -> None:
+        """Upload what is left and complete the object"""
+        if self.closed:
+            return
+        try:
+            if not self.aborted:
+                self._complete()
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._executor.shutdown(wait=True)
+            super().close()
+    
+    def _complete(self) -> None:
+        if self.upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+            self._buffer.clear()
+            return
+        
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+        parts = [
+            {"PartNumber": part_number, "ETag": future.result()["ETag"]}
+            for part_number, future in self._parts
+        ]
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        logger.info(f"Uploaded {self.bytes_written} bytes to {self.key} in {len(parts)} parts")
+    
+    def abort(self) -> None:
+        """Abandon the upload, deleting any parts already sent"""
+        if self.aborted:
+            return
+        self.aborted = True
+        self._buffer.clear()
+        self._executor.shutdown(wait=True)
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+            logger.info(f"Aborted multipart upload of {self.key}")
+
+def open_s3_text_reader(client: Any, bucket: str, key: str):
+    """
+    Open an S3 object as a text stream that is read from S3 as it is consumed
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The bucket
+        key: The object key
+    
+    Returns:
+        A readable text stream over the object body, decoded as UTF-8 with an optional BOM
+    """
+    body = client.get_object(Bucket=bucket, Key=key)["Body"]
+    return io.TextIOWrapper(
+        io.BufferedReader(S3BodyReader(body), READ_BUFFER_SIZE), encoding="utf-8-sig", newline=""
+    )
+
+@contextlib.contextmanager
+def open_s3_text_writer(client: Any, bucket: str, key: str,
+                        part_size: int = DEFAULT_PART_SIZE) -> Iterator[io.TextIOWrapper]:
+    """
+    Open a text stream whose content is uploaded to an S3 object while it is written.
+    The object is completed when the block exits normally, and the upload is aborted if it raises.
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The destination bucket
+        key: The destination object key
+        part_size: Bytes per uploaded part
+    
+    Yields:
+        A writable text stream, encoded as UTF-8 with a BOM like the local CSV output
+    """
+    writer = S3MultipartWriter(client, bucket, key, part_size)
+    text = io.TextIOWrapper(io.BufferedWriter(writer), encoding="utf-8-sig", newline="")
+    try:
+        yield text
+        text.close()
+    except BaseException:
+        writer.abort()
+        raise
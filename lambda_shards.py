@@ -0,0 +1,301 @@
+import csv
+import json
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import boto3
+from aws_lambda_powertools import Logger
+from lambda_enrichment import EnrichmentProcessor
+import lambda_s3
+
+logger = Logger()
+
+# Fan-out/fan-in processing of large files across parallel invocations.
+
+# - coordinate splits a raw CSV into shards of ENRICHMENT_SHARD_ROWS rows under
+#   <work prefix>/<file>/<run id>/shards/, writes a manifest, and submits one worker
+#   event per shard to an orchestrator.
+# - run_shard enriches one shard into <run>/enhanced/. The worker that finds every
+#   shard output present merges them, in shard order, into the single _enhanced.csv.
+#   Two workers finishing at once may both merge; the merge is idempotent and writes
+#   the same object, so the duplicate only costs a re-read.
+# - LambdaOrchestrator submits worker events as asynchronous invocations of this
+#   function; LocalOrchestrator runs them on a thread pool for tests and local runs.
+# - Shard objects are not deleted by the workers, because a late duplicate merge may
+#   still read them; the bucket's lifecycle rule expires the work prefix.
+# - A run is keyed by the S3 event that started it, and its manifest records the
+#   coordinating request and whether every shard was submitted. A redelivered S3 event
+#   finds the manifest and exits. A Lambda retry of a coordinator that failed before
+#   submitting every shard submits them again; it does not split the file twice.
+# - ZOOMINFO_RATE_LIMIT and ZOOMINFO_MAX_RATE pace each container on its own. With
+#   shard workers running in parallel, ZoomInfo sees up to MaxConcurrency times those
+#   rates, so set them to the account's limit divided by MaxConcurrency.
+
+SHARD_ACTION = "enrich_shard"
+SHARD_ROWS = int(os.environ.get("ENRICHMENT_SHARD_ROWS", 2000))
+# Files at least this large are sharded; smaller files are enriched in one invocation. 0 turns sharding off.
+SHARD_THRESHOLD_BYTES = int(float(os.environ.get("ENRICHMENT_SHARD_THRESHOLD_MB", 0)) * 1024 * 1024)
+
+class LambdaOrchestrator:
+    """
+    Runs worker events as asynchronous invocations of a Lambda function
+    """
+    
+    def __init__(self, function_name: str = None, client: Any = None):
+        """
+        Initialize the orchestrator
+        
+        Args:
+            function_name: The function to invoke (defaults to this function, AWS_LAMBDA_FUNCTION_NAME)
+            client: The boto3 Lambda client (created on first use by default)
+        """
+        self.function_name = function_name or os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        self.client = client
+    
+    def submit(self, event: Dict[str, Any]) -> None:
+        if self.client is None:
+            self.client = boto3.client('lambda')
+        self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType='Event',
+            Payload=json.dumps(event).encode("utf-8")
+        )
+
+class LocalOrchestrator:
+    """
+    Runs worker events in-process on a thread pool, standing in for Lambda invocations
+    """
+    
+    def __init__(self, handler: Callable[[Dict[str, Any], Any], Any], context: Any = None,
+                 max_workers: int = 4):
+        """
+        Initialize the orchestrator
+        
+        Args:
+            handler: The function called with each event and the context, e.g. lambda_function.handler
+            context: The context passed to the handler
+            max_workers: The number of events handled at once
+        """
+        self.handler = handler
+        self.context = context
+        self.events = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+    
+    def submit(self, event: Dict[str, Any]) -> None:
+        # Round-trip through JSON like a real invocation payload
+        event = json.loads(json.dumps(event))
+        self.events.append(event)
+        self._futures.append(self._executor.submit(self.handler, event, self.context))
+    
+    def wait(self) -> List[Any]:
+        """
+        Wait for every submitted event, including events submitted by the handlers
+        
+        Returns:
+            The handler results, in submission order
+        """
+        results = []
+        while len(results) < len(self._futures):
+            results.append(self._futures[len(results)].result())
+        return results
+
+def run_prefix(work_prefix: str, key: str, run_id: str) -> str:
+    """Get the work prefix of one sharded run of a raw file"""
+    name = os.path.splitext(os.path.basename(key))[0]
+    return f"{work_prefix}{name}/{run_id}/"
+
+def shard_key(prefix: str, index: int) -> str:
+    return f"{prefix}shards/{index:05d}.csv"
+
+def enhanced_shard_key(prefix: str, index: int) -> str:
+    return f"{prefix}enhanced/{index:05d}.csv"
+
+def load_json(client: Any, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+    """Load a JSON object from S3, or None if it does not exist"""
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=key):
+        if any(item["Key"] == key for item in page.get("Contents", [])):
+            body = client.get_object(Bucket=bucket, Key=key)["Body"]
+            try:
+                return json.loads(body.read())
+            finally:
+                body.close()
+    return None
+
+def split_into_shards(client: Any, bucket: str, key: str, prefix: str,
+                      shard_rows: int = None) -> int:
+    """
+    Stream a CSV object into shard objects of at most shard_rows rows, each with the header
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The bucket
+        key: The raw CSV object key
+        prefix: The run's work prefix
+        shard_rows: The maximum number of rows per shard (defaults to ENRICHMENT_SHARD_ROWS)
+    
+    Returns:
+        int: The number of shards written
+    """
+    shard_rows = shard_rows or SHARD_ROWS
+    shard_count = 0
+    
+    with lambda_s3.open_s3_text_reader(client, bucket, key) as input_file:
+        reader = csv.reader(input_file)
+        header = next(reader, None)
+        if header is None:
+            return 0
+        
+        rows = []
+        
+        def write_shard():
+            nonlocal shard_count
+            with lambda_s3.open_s3_text_writer(client, bucket, shard_key(prefix, shard_count)) as shard:
+                writer = csv.writer(shard)
+                writer.writerow(header)
+                writer.writerows(rows)
+            shard_count += 1
+            rows.clear()
+        
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= shard_rows:
+                write_shard()
+        if rows or shard_count == 0:
+            write_shard()
+    
+    return shard_count
+
+def manifest_key(prefix: str) -> str:
+    return f"{prefix}manifest.json"
+
+def _save_manifest(client: Any, bucket: str, manifest: Dict[str, Any]) -> None:
+    client.put_object(
+        Bucket=bucket, Key=manifest_key(manifest["prefix"]), Body=json.dumps(manifest).encode("utf-8")
+    )
+
+def coordinate(client: Any, bucket: str, key: str, output_key: str, orchestrator: Any,
+               work_prefix: str, run_id: str = None, shard_rows: int = None,
+               request_id: str = None) -> Optional[Dict[str, Any]]:
+    """
+    Split a raw file into shards and submit one worker event per shard
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The bucket
+        key: The raw CSV object key
+        output_key: The key of the merged _enhanced.csv
+        orchestrator: Where worker events are submitted
+        work_prefix: The prefix shards are written under
+        run_id: Identifies this run under the work prefix (random by default)
+        shard_rows: The maximum number of rows per shard (defaults to ENRICHMENT_SHARD_ROWS)
+        request_id: The coordinating invocation's request ID, kept in the manifest
+    
+    Returns:
+        The manifest of the run, or None if another delivery of the event already
+        coordinated it
+    """
+    prefix = run_prefix(work_prefix, key, run_id or uuid.uuid4().hex[:12])
+    manifest = load_json(client, bucket, manifest_key(prefix))
+    if manifest is not None and (manifest["submitted"] or manifest["owner"] != request_id):
+        logger.info(f"Ignoring duplicate event for {key}; run {prefix} already coordinated")
+        return None
+    
+    if manifest is None:
+        shard_rows = shard_rows or SHARD_ROWS
+        shard_count = split_into_shards(client, bucket, key, prefix, shard_rows)
+        manifest = {
+            "source_key": key,
+            "output_key": output_key,
+            "prefix": prefix,
+            "shard_count": shard_count,
+            "shard_rows": shard_rows,
+            "owner": request_id,
+            "submitted": False
+        }
+        _save_manifest(client, bucket, manifest)
+        logger.info(f"Split {key} into {shard_count} shards under {prefix}")
+    else:
+        # A retry of this coordinator, which failed before submitting every shard
+        shard_count = manifest["shard_count"]
+        logger.info(f"Resubmitting the {shard_count} shards of {prefix}")
+    
+    for index in range(shard_count):
+        orchestrator.submit({
+            "action": SHARD_ACTION,
+            "bucket": bucket,
+            "prefix": prefix,
+            "shard": index,
+            "shard_count": shard_count,
+            "output_key": output_key
+        })
+    manifest["submitted"] = True
+    _save_manifest(client, bucket, manifest)
+    return manifest
+
+def _enrich_stream(input_file, output_file) -> None:
+    EnrichmentProcessor(input_file, output_file).process()
+
+def shards_complete(client: Any, bucket: str, prefix: str, shard_count: int) -> bool:
+    """Check whether every shard of a run has its enhanced output"""
+    paginator = client.get_paginator('list_objects_v2')
+    found = sum(
+        page.get("KeyCount", 0)
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}enhanced/")
+    )
+    return found >= shard_count
+
+def merge_shards(client: Any, bucket: str, prefix: str, shard_count: int, output_key: str) -> None:
+    """
+    Concatenate the enhanced shards, in shard order, into one CSV with a single header
+    
+    Args:
+        client: The boto3 S3 client
+        bucket: The bucket
+        prefix: The run's work prefix
+        shard_count: The number of shards
+        output_key: The key of the merged _enhanced.csv
+    """
+    header = None
+    with lambda_s3.open_s3_text_writer(client, bucket, output_key) as output_file:
+        for index in range(shard_count):
+            with lambda_s3.open_s3_text_reader(client, bucket, enhanced_shard_key(prefix, index)) as shard:
+                shard_header = shard.readline()
+                if header is None:
+                    header = shard_header
+                    output_file.write(header)
+                elif shard_header != header:
+                    raise ValueError(f"Shard {index} of {prefix} has a different header")
+                shutil.copyfileobj(shard, output_file)
+    logger.info(f"Merged {shard_count} shards into {output_key}")
+
+def run_shard(client: Any, event: Dict[str, Any],
+              process: Callable[[Any, Any], None] = None) -> Dict[str, Any]:
+    """
+    Enrich one shard and, if it was the last one to finish, merge the run
+    
+    Args:
+        client: The boto3 S3 client
+        event: The worker event submitted by coordinate
+        process: Enriches a readable CSV text stream into a writable one (EnrichmentProcessor by default)
+    
+    Returns:
+        Dict describing what the worker did
+    """
+    bucket = event["bucket"]
+    prefix = event["prefix"]
+    index = event["shard"]
+    shard_count = event["shard_count"]
+    process = process or _enrich_stream
+    
+    with lambda_s3.open_s3_text_reader(client, bucket, shard_key(prefix, index)) as input_file, \
+         lambda_s3.open_s3_text_writer(client, bucket, enhanced_shard_key(prefix, index)) as output_file:
+        process(input_file, output_file)
+    logger.info(f"Enriched shard {index + 1} of {shard_count} under {prefix}")
+    
+    merged = shards_complete(client, bucket, prefix, shard_count)
+    if merged:
+        merge_shards(client, bucket, prefix, shard_count, event["output_key"])
+    return {"shard": index, "merged": merged}
@@ -1,22 +1,48 @@
-import PySimpleGUI as sg
-import time
-import contactEnrich
-import fileConvert
-import auth
-import companyEnrich
-import jsonParser
-import contactSearch
-import addNewContact
-import naicsMatch
+import argparse
+import json
+import os
+import sys
 
 # Data Enrichment main file.
 
 # - Application Function: Serves as a data enrichment tool using the Zoominfo API.
 # - Process Flow:
-#     1. Converts a CSV file into JSON format.
+#     1. Loads the CSV file into memory once.
 #     2. Utilizes the Zoominfo API to supplement missing contact and company information.
+#     3. Writes the enriched records back to CSV once every stage has run.
 # - Requirements: Requires an authorized Zoominfo account and the Data Enrichment Template.
-# - Output: Enriched data is saved in same directory as your input file.
+# - Output: Enriched data is saved in same directory as your input file, or at --output.
+# - Run without arguments (or with --gui) to pick the file in a dialog and type the
+#   credentials. Pass the input CSV to run headless, e.g. on a batch server:
+#       python main.py input.csv --output enriched.csv --credentials-file zoominfo.json
+#   Credentials come from --credentials-file (JSON with "username" and "password", the
+#   format of the Lambda secret), else ZOOMINFO_USERNAME and ZOOMINFO_PASSWORD, else a
+#   prompt when running in a terminal. Use --stages to run only some of the stages.
+# - Pass --checkpoint to save the records after every stage, so a run that fails part
+#   way resumes from the last finished stage instead of starting over. It is off by
+#   default because each checkpoint serializes every record.
+# - Only argparse is imported up front. PySimpleGUI loads when the file dialog is shown,
+#   and the enrichment modules load after the arguments are parsed, so --help and usage
+#   errors return immediately (see benchmarks/cli_startup.py).
+# - Pass --workers N (or set ENRICHMENT_WORKERS, as Lambda does) to enrich N records at
+#   once on a thread pool. The default of 1 enriches one record at a time.
+# - Set ENRICHMENT_ENGINE=async (and optionally ENRICHMENT_CONCURRENCY) to run the API
+#   stages on asyncio instead of one record at a time.
+# - Set ENRICHMENT_FRAME=1 to run the local clean-up stages as pandas column operations,
+#   which is faster on large files.
+# - Set ENRICHMENT_DRY_RUN=1 (or pass --dry-run) to print the estimated requests, credits
+#   and time of the run and stop before any API call; no credentials are needed for that.
+# - Set ZOOMINFO_CONTACT_SEARCH_MODE=single to find contacts with one search per company
+#   instead of up to four.
+# - ZoomInfo responses are cached in a local file (ZOOMINFO_CACHE_PATH, default
+#   ~/.dataEnrichmentTool/zoominfo_cache.sqlite), so re-enriching the same suppliers
+#   next month only pays for what changed. Companies and contacts ZoomInfo found no
+#   match for are recorded in the same file and skipped until the entry expires. Set
+#   ZOOMINFO_CACHE_PATH to an empty value to disable both caches.
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".dataEnrichmentTool", "zoominfo_cache.sqlite"
+)
 
 
 def select_file():
@@ -27,6 +53,8 @@ def select_file():
         str: The path of the selected CSV file.
     """
 
+    import PySimpleGUI as sg
+
     layout = [
         [sg.Text("Please select the CSV file to process:")],
         [sg.In(), sg.FileBrowse(file_types=(("CSV Files", "*.csv"),), key="-FILE-")],
@@ -51,25 +79,172 @@ def select_file():
     return None
 
 
-def main():
+def load_credentials(credentials_file=None):
+    """
+    Reads the ZoomInfo credentials from a JSON file or from the environment.
+
+    Args:
+        credentials_file (str): A JSON file with "username" and "password", if any.
+
+    Returns:
+        tuple: The username and password, or None if neither source has them.
+    """
+
+    if credentials_file:
+        with open(credentials_file, "r", encoding="utf-8") as file:
+            credentials = json.load(file)
+        if "username" not in credentials or "password" not in credentials:
+            raise ValueError(
+                f"{credentials_file} must contain a username and a password."
+            )
+        return credentials["username"], credentials["password"]
+
+    username = os.environ.get("ZOOMINFO_USERNAME")
+    password = os.environ.get("ZOOMINFO_PASSWORD")
+    if username and password:
+        return username, password
+    return None
+
+
+def env_flag(name):
+    """
+    Reads an on/off setting from the environment.
+
+    Args:
+        name (str): The environment variable.
+
+    Returns:
+        bool: True if it is set to 1, true or yes (in any case).
+    """
+
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes")
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line.
+
+    Args:
+        argv (list): The arguments, without the program name. Defaults to sys.argv[1:].
+
+    Returns:
+        Namespace: The parsed arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Enrich a Data Enrichment Template CSV file with ZoomInfo data."
+    )
+    parser.add_argument(
+        "input_csv",
+        nargs="?",
+        help="The input CSV file. Without it, a file dialog is shown.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help='The enhanced CSV file. Defaults to "<input> - Enhanced.csv".',
+    )
+    parser.add_argument(
+        "--credentials-file",
+        help='A JSON file with "username" and "password". Defaults to '
+        "ZOOMINFO_USERNAME and ZOOMINFO_PASSWORD.",
+    )
+    parser.add_argument(
+        "--stages",
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        help="Comma-separated stages to run, in pipeline order: remove_spaces, "
+        "contact_enrich, company_enrich, needs_contact, contact_search, "
+        "add_new_contact, sector_and_industry, update_address. Defaults to all.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("ENRICHMENT_WORKERS", 1)),
+        help="Records each API stage enriches at once with the threads engine.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "async"),
+        default=os.environ.get("ENRICHMENT_ENGINE", "threads"),
+        help="Run the API stages on threads or on asyncio.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("ENRICHMENT_CONCURRENCY", 100)),
+        help="Requests in flight at once with the async engine.",
+    )
+    parser.add_argument(
+        "--frame",
+        action="store_true",
+        default=env_flag("ENRICHMENT_FRAME"),
+        help="Run the local clean-up stages on a pandas DataFrame.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Save the records after every stage so a failed run can resume.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=env_flag("ENRICHMENT_DRY_RUN"),
+        help="Print the estimated requests, credits and time, then stop.",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=os.environ.get("ZOOMINFO_CACHE_PATH", DEFAULT_CACHE_PATH),
+        help="The response cache file. Pass an empty value to disable caching.",
+    )
+    parser.add_argument(
+        "--gui",
+        action="store_true",
+        help="Pick the file in a dialog even when an input file is given.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Runs the Data Enrichment Tool, which enriches a CSV file with additional data using the ZoomInfo API.
-    The user is prompted to enter their ZoomInfo credentials, select a CSV file, and then the program performs
-    contact and company enrichment using the ZoomInfo API. The program then scans for missing contacts, searches
-    for contact IDs, updates missing contacts, and updates the addresses in the CSV file. Finally, the program
-    converts the enriched JSON file back to CSV format and saves it to disk.
+    The input file comes from the command line or a file selection dialog, and the credentials from a file,
+    the environment or a prompt. The program then performs contact and company enrichment using the ZoomInfo
+    API, scans for missing contacts, searches for contact IDs, updates missing contacts, and updates the
+    addresses of the records. All stages share one in-memory copy of the records, and the enriched CSV file
+    is written to disk once at the end.
+
+    Args:
+        argv (list): The command line arguments. Defaults to sys.argv[1:].
     """
 
+    args = parse_args(argv)
+    headless = args.input_csv is not None and not args.gui
+
+    import apiPlanner
+    import auth
+    import enrichmentPipeline
+    import fileConvert
+    import negativeCache
+    import responseCache
+
+    unknown = set(args.stages or ()) - set(enrichmentPipeline.STAGE_NAMES)
+    if unknown:
+        sys.exit(f"Unknown enrichment stages: {', '.join(sorted(unknown))}")
+
     # Welcome message
     print(
         "\nWelcome to the Data Enrichment Tool!\nPlease ensure you are using the most current Data Enrichment Template to prevent errors while running this application."
     )
 
-    username, password = auth.get_login_credentials()
+    # Must be opened before the first ZoomInfo client is created.
+    cache = responseCache.configure(args.cache_path)
+    no_matches = negativeCache.configure(args.cache_path)
 
     # File selection and formatting
-    print("Select your file using the popup window.")
-    input_csv = select_file()
+    input_csv = args.input_csv
+    if not headless:
+        print("Select your file using the popup window.")
+        input_csv = select_file()
 
     if not input_csv:
         print("No file selected. Exiting the program.")
@@ -77,54 +252,49 @@ def main():
 
     fileConvert.count_records(input_csv)
 
-    print(f"Converting {input_csv} to JSON")
-    fileConvert.csv_to_json(input_csv)
-
-    input_json = input_csv.rsplit(".", 1)[0] + ".json"
-    print("Conversion complete.")
-
-    jsonParser.remove_spaces(input_json)
-
-    print("Requesting new security token...")
-    jwt_token = auth.authenticate(username, password)
-    last_auth_time = time.time()
-
-    print("Beginning contact enrichment...")
-    jwt_token, last_auth_time = contactEnrich.contact_enrich(
-        input_json, jwt_token, last_auth_time, username, password
-    )
-    print("\nContact enrichment complete.\nBeginning company enrichment...")
-
-    jwt_token, last_auth_time = companyEnrich.company_enrich(
-        input_json, jwt_token, last_auth_time, username, password
-    )
-
-    print("\nCompany enrichment complete.")
+    if args.dry_run:
+        summary = apiPlanner.dry_run(
+            input_csv, args.concurrency if args.engine == "async" else 1
+        )
+        print(apiPlanner.format_estimate(summary))
+        return
 
-    print("Scanning for missing Contacts...")
-    jsonParser.updateNeedsContact(input_json)
+    # Authenticate once; the pipeline reuses the token through the shared token manager.
+    credentials = load_credentials(args.credentials_file)
+    if credentials is not None:
+        username, password = credentials
+        if not auth.login(username, password):
+            sys.exit("Invalid ZoomInfo login.")
+        print("User authenticated.\n")
+    elif headless and not sys.stdin.isatty():
+        sys.exit(
+            "No ZoomInfo credentials: pass --credentials-file or set "
+            "ZOOMINFO_USERNAME and ZOOMINFO_PASSWORD."
+        )
+    else:
+        username, password = auth.get_login_credentials()
 
-    print("Returning Contact IDs...")
-    jwt_token, last_auth_time = contactSearch.contact_search(
-        input_json, jwt_token, last_auth_time, username, password
+    print(f"Loading {input_csv}")
+    pipeline = enrichmentPipeline.EnrichmentPipeline(
+        input_csv,
+        username,
+        password,
+        checkpoint=args.checkpoint,
+        workers=args.workers,
+        engine=args.engine,
+        concurrency=args.concurrency,
+        frame=args.frame,
+        output_csv=args.output,
+        stages=args.stages,
     )
+    output_csv = pipeline.run()
 
-    print("Updating Missing Contacts...")
-    jwt_token, last_auth_time = addNewContact.add_new_contact(
-        input_json, jwt_token, last_auth_time, username, password
-    )
-    print("\nContact updates complete.")
+    if cache is not None:
+        print(cache.report())
+    if no_matches is not None:
+        print(no_matches.report())
 
-    # Update the addresses in the JSON file
-    print("Preparing new CSV file...")
-    naicsMatch.get_sector_and_industry(input_json)
-    jsonParser.update_address(input_json)
-
-    # Convert the JSON file back to CSV format
-    fileConvert.json_to_csv(input_json)
-    print(
-        f"Data enrichment complete. Output file: {input_json.rsplit('.', 1)[0] + ' - enhanced.csv'}"
-    )
+    print(f"Data enrichment complete. Output file: {output_csv}")
 
 
 if __name__ == "__main__":
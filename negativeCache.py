@@ -0,0 +1,223 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# Negative cache of inputs ZoomInfo has no match for.
+
+# - Companies without a company-master match cost a strict and a non-strict lookup, and
+#   rows without a contact cost the whole four-step search cascade, on every run.
+#   Recording those inputs lets later rows and later runs skip straight to "no match".
+# - Entries live in a SQLite table with a TTL, so an input is tried again once the
+#   entry expires and ZoomInfo may have added the company or contact since.
+# - An in-memory Bloom filter answers the common case, an input that is not in the
+#   table, without touching the database. Possible hits are confirmed against the table.
+# - The table lives next to the response cache, in the file named by ZOOMINFO_CACHE_PATH.
+
+COMPANY = "company"
+CONTACT_SEARCH = "contact_search"
+
+DEFAULT_TTL = 30 * 24 * 60 * 60
+DEFAULT_CAPACITY = 100000
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership filter with no false negatives.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=0.01):
+        """
+        Initialize an empty filter.
+
+        Args:
+            capacity (int): The number of items the filter is sized for.
+            error_rate (float): The false positive rate at capacity.
+        """
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class NegativeCache:
+    """
+    Persistent record of inputs that returned no match, each kept for a TTL.
+    Safe to share between worker threads.
+    """
+
+    def __init__(self, path, ttl=None, capacity=DEFAULT_CAPACITY):
+        """
+        Initialize the cache, loading the unexpired entries into the Bloom filter.
+
+        Args:
+            path (str): The database file.
+            ttl (float): Seconds an entry is kept. Defaults to ZOOMINFO_NEGATIVE_TTL_DAYS.
+            capacity (int): The number of entries the Bloom filter is first sized for.
+        """
+        if ttl is None:
+            ttl = float(os.environ.get("ZOOMINFO_NEGATIVE_TTL_DAYS", 30)) * 24 * 60 * 60
+
+        self.path = path
+        self.ttl = ttl
+        self.skipped = 0
+        self.recorded = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS no_matches "
+                "(key TEXT PRIMARY KEY, kind TEXT, recorded_at REAL)"
+            )
+            self._connection.execute(
+                "DELETE FROM no_matches WHERE recorded_at <= ?", (time.time() - ttl,)
+            )
+        self._load_filter(capacity)
+
+    def _load_filter(self, capacity):
+        keys = [
+            row[0] for row in self._connection.execute("SELECT key FROM no_matches")
+        ]
+        self._filter = BloomFilter(max(capacity, 2 * len(keys)))
+        for key in keys:
+            self._filter.add(key)
+
+    @staticmethod
+    def key(kind, identity):
+        return f"{kind}\n{json.dumps(identity)}"
+
+    def contains(self, kind, identity):
+        """
+        Returns whether an input is known to have no match.
+
+        Args:
+            kind (str): The lookup kind, COMPANY or CONTACT_SEARCH.
+            identity: The JSON-serializable identity of the input, or None.
+
+        Returns:
+            bool: True if the input returned no match within the TTL.
+        """
+        if identity is None:
+            return False
+        key = self.key(kind, identity)
+        if key not in self._filter:
+            return False
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT recorded_at FROM no_matches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] <= time.time() - self.ttl:
+                return False
+            self.skipped += 1
+        return True
+
+    def add(self, kind, identity):
+        """
+        Records an input that returned no match.
+
+        Args:
+            kind (str): The lookup kind, COMPANY or CONTACT_SEARCH.
+            identity: The JSON-serializable identity of the input, or None to record nothing.
+        """
+        if identity is None:
+            return
+        key = self.key(kind, identity)
+
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO no_matches (key, kind, recorded_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, kind, time.time()),
+                )
+            self.recorded += 1
+            self._filter.add(key)
+            if self._filter.count > self._filter.capacity:
+                self._load_filter(self._filter.capacity * 2)
+
+    def report(self):
+        """
+        Summarizes the lookups skipped and the no-matches recorded.
+
+        Returns:
+            str: The report line.
+        """
+        return (
+            f"Negative cache: {self.skipped} known no-match lookups skipped, "
+            f"{self.recorded} new no-matches recorded."
+        )
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+_cache = None
+_configured = False
+_cache_lock = threading.Lock()
+
+
+def configure(path):
+    """
+    Opens the shared negative cache at a path, or disables it.
+
+    Args:
+        path (str): The database file, or None to disable the cache.
+
+    Returns:
+        NegativeCache: The shared cache, or None.
+    """
+    global _cache, _configured
+
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = NegativeCache(path) if path else None
+        _configured = True
+    return _cache
+
+
+def get_cache():
+    """
+    Returns the shared negative cache, opening ZOOMINFO_CACHE_PATH on first use.
+
+    Returns:
+        NegativeCache: The shared cache, or None if caching is disabled.
+    """
+    global _cache, _configured
+
+    if not _configured:
+        with _cache_lock:
+            if not _configured:
+                path = os.environ.get("ZOOMINFO_CACHE_PATH")
+                _cache = NegativeCache(path) if path else None
+                _configured = True
+    return _cache
@@ -0,0 +1,176 @@
+import email.utils
+import os
+import threading
+import time
+
+# Shared, adaptive client-side rate limiter for the ZoomInfo API.
+
+# - A token bucket spaces requests out to `rate` per second across every thread and
+#   coroutine in the process, with short bursts up to `burst` requests.
+# - The rate adapts with AIMD: every successful request nudges it up (additive increase),
+#   every 429 halves it (multiplicative decrease, at most once per second so a burst of
+#   429s from one overshoot only counts once). Throughput settles just under the
+#   provider's ceiling.
+# - A 429's Retry-After pauses the whole bucket, so no caller sends again before the
+#   provider allows it.
+# - Starting and maximum rates come from ZOOMINFO_RATE_LIMIT and ZOOMINFO_MAX_RATE.
+
+DEFAULT_RATE = 20.0
+DEFAULT_MAX_RATE = 50.0
+MIN_RATE = 1.0
+MAX_THROTTLE_RETRIES = 6
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header given in seconds or as an HTTP date.
+
+    Args:
+        value (str): The header value.
+
+    Returns:
+        float: The number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def throttle_delay(retry_after, attempt):
+    """
+    Returns how long to wait before retrying a throttled request.
+
+    Args:
+        retry_after (float): The parsed Retry-After value, if any.
+        attempt (int): The number of throttled attempts so far, starting at 0.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if retry_after is not None:
+        return retry_after
+    return min(2.0**attempt, 30.0)
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token bucket whose rate adapts to observed 429 responses.
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        max_rate=None,
+        min_rate=MIN_RATE,
+        burst=None,
+        increase=1.0,
+        decrease_factor=0.5,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float): The starting rate in requests per second. Defaults to ZOOMINFO_RATE_LIMIT.
+            max_rate (float): The highest rate additive increase may reach. Defaults to ZOOMINFO_MAX_RATE.
+            min_rate (float): The lowest rate multiplicative decrease may reach.
+            burst (float): The bucket size. Defaults to one second of requests at the starting rate.
+            increase (float): The rate added over roughly one second of successful requests.
+            decrease_factor (float): The factor the rate is multiplied by on a 429.
+        """
+        if rate is None:
+            rate = float(os.environ.get("ZOOMINFO_RATE_LIMIT", DEFAULT_RATE))
+        if max_rate is None:
+            max_rate = float(
+                os.environ.get("ZOOMINFO_MAX_RATE", max(rate, DEFAULT_MAX_RATE))
+            )
+
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.throttled = 0
+
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes one token from the bucket.
+
+        Returns:
+            float: The number of seconds the caller must wait before sending its request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now > self._last:
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+            self._tokens -= 1
+            return max(0.0, self._last - now) + max(0.0, -self._tokens) / self.rate
+
+    def acquire(self):
+        """
+        Blocks until the caller may send one request.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        """
+        Additive increase: raises the rate by `increase` per second of successful requests.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        """
+        Multiplicative decrease after a 429, and a pause for its Retry-After.
+
+        Args:
+            retry_after (float): The number of seconds the provider asked to wait, if given.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            if now - self._last_decrease >= 1.0:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._last_decrease = now
+            if retry_after:
+                # Refill starts only once the pause is over.
+                self._tokens = min(self._tokens, 0.0)
+                self._last = max(self._last, now + retry_after)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """
+    Returns the limiter shared by every ZoomInfo client in the process.
+
+    Returns:
+        AdaptiveRateLimiter: The shared limiter.
+    """
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = AdaptiveRateLimiter()
+    return _limiter
@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+# Persistent cache of ZoomInfo enrich and search responses.
+
+# - Sits under the ZoomInfo clients: a request whose answer is cached is never sent.
+# - Keys are SHA-256 hashes of the endpoint and the normalized payload (sorted keys, empty
+#   values dropped, strings trimmed and lowercased), so cosmetic differences between runs
+#   still hit.
+# - Batched enrich requests are cached per input: only the inputs without a fresh answer
+#   are sent, and the answers are merged back in input order.
+# - Every endpoint has its own TTL. Once the cache holds more than max_entries, expired
+#   entries and then the least recently used ones are evicted.
+# - Hits and misses are counted per endpoint.
+# - The desktop tool keeps the cache in a local file. Lambda reads ZOOMINFO_CACHE_PATH,
+#   e.g. a file under /tmp that lives as long as the warm container.
+
+DAY = 24 * 60 * 60
+
+# Endpoint path -> seconds a response stays fresh. Other endpoints are never cached.
+DEFAULT_TTLS = {
+    "/enrich/company": 30 * DAY,
+    "/enrich/company-master": 30 * DAY,
+    "/enrich/contact": 30 * DAY,
+    "/search/contact": 7 * DAY,
+}
+
+DEFAULT_MAX_ENTRIES = 200000
+
+# Payload keys holding the inputs of a batched enrich request.
+BATCH_INPUT_KEYS = ("matchCompanyInput", "matchPersonInput")
+
+
+def normalize_payload(value):
+    """
+    Normalizes a request payload so equivalent requests produce the same cache key.
+
+    Args:
+        value: The payload or a value inside it.
+
+    Returns:
+        The normalized value.
+    """
+    if isinstance(value, dict):
+        return {
+            key: normalize_payload(item)
+            for key, item in sorted(value.items())
+            if item not in (None, "", [], {})
+        }
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(item) for item in value]
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def cache_key(endpoint, payload):
+    """
+    Builds the cache key of a request.
+
+    Args:
+        endpoint (str): The endpoint path, e.g. "/enrich/company".
+        payload (dict): The request payload.
+
+    Returns:
+        str: The key.
+    """
+    text = json.dumps(
+        normalize_payload(payload), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(f"{endpoint}\n{text}".encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """
+    A response served, fully or partly, from the cache.
+    """
+
+    __slots__ = ("status_code", "text")
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text) if self.text else None
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with per-endpoint TTLs and LRU eviction.
+    Safe to share between worker threads.
+    """
+
+    def __init__(self, path, ttls=None, max_entries=None):
+        """
+        Initialize the cache, creating the database file if needed.
+
+        Args:
+            path (str): The database file.
+            ttls (dict): Endpoint path -> TTL in seconds. Defaults to DEFAULT_TTLS.
+            max_entries (int): The number of entries kept. Defaults to ZOOMINFO_CACHE_MAX_ENTRIES.
+        """
+        if max_entries is None:
+            max_entries = int(
+                os.environ.get("ZOOMINFO_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+            )
+
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.hits = {}
+        self.misses = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT, body TEXT, "
+                "stored_at REAL, accessed_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed "
+                "ON responses (accessed_at)"
+            )
+        self._size = self._connection.execute(
+            "SELECT COUNT(*) FROM responses"
+        ).fetchone()[0]
+
+    def endpoint(self, url):
+        """
+        Returns the cached endpoint a URL belongs to.
+
+        Args:
+            url (str): The request URL or path.
+
+        Returns:
+            str: The endpoint path, or None if responses of the URL are not cached.
+        """
+        path = "/" + urlparse(url).path.strip("/")
+        return path if path in self.ttls else None
+
+    def get(self, endpoint, payload):
+        """
+        Returns the cached body of a request if it is still fresh.
+
+        Args:
+            endpoint (str): The endpoint path.
+            payload (dict): The request payload.
+
+        Returns:
+            The cached body (parsed JSON), or None on a miss.
+        """
+        key = cache_key(endpoint, payload)
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now - self.ttls[endpoint]:
+                self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+            self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+
+        return json.loads(row[0])
+
+    def contains(self, endpoint, payload):
+        """
+        Checks whether a fresh answer to a request is cached, without counting a hit or miss.
+
+        Args:
+            endpoint (str): The endpoint path, or None.
+            payload (dict): The request payload.
+
+        Returns:
+            bool: True if the request would be answered from the cache.
+        """
+        if endpoint is None:
+            return False
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stored_at FROM responses WHERE key = ?",
+                (cache_key(endpoint, payload),),
+            ).fetchone()
+        return row is not None and row[0] > time.time() - self.ttls[endpoint]
+
+    def put(self, endpoint, payload, body):
+        """
+        Stores the body of a successful request.
+
+        Args:
+            endpoint (str): The endpoint path.
+            payload (dict): The request payload.
+            body: The parsed JSON body.
+        """
+        key = cache_key(endpoint, payload)
+        now = time.time()
+
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, endpoint, body, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, endpoint, json.dumps(body), now, now),
+                )
+                self._size += cursor.rowcount
+                if self._size > self.max_entries:
+                    self._evict(now)
+
+    def _evict(self, now):
+        # Drops expired entries, then the least recently used, down to 90% of the bound.
+        for endpoint, ttl in self.ttls.items():
+            self._connection.execute(
+                "DELETE FROM responses WHERE endpoint = ? AND stored_at <= ?",
+                (endpoint, now - ttl),
+            )
+        self._size = self._connection.execute(
+            "SELECT COUNT(*) FROM responses"
+        ).fetchone()[0]
+        excess = self._size - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self._size -= excess
+
+    def request(self, url, payload):
+        """
+        Prepares a request to be served from the cache where possible.
+
+        Args:
+            url (str): The request URL or path.
+            payload (dict): The request payload.
+
+        Returns:
+            CachedRequest: The prepared request, or None if the endpoint is not cached.
+        """
+        endpoint = self.endpoint(url)
+        if endpoint is None or not isinstance(payload, dict):
+            return None
+        return CachedRequest(self, endpoint, payload)
+
+    def report(self):
+        """
+        Summarizes hits and misses per endpoint.
+
+        Returns:
+            str: The report line.
+        """
+        endpoints = sorted(set(self.hits) | set(self.misses))
+        counts = ", ".join(
+            f"{endpoint} {self.hits.get(endpoint, 0)} hits / "
+            f"{self.misses.get(endpoint, 0)} misses"
+            for endpoint in endpoints
+        )
+        return f"Response cache: {counts or 'unused'}."
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class CachedRequest:
+    """
+    One request split into its cached answers and the payload that still has to be sent.
+    """
+
+    def __init__(self, cache, endpoint, payload):
+        self.cache = cache
+        self.endpoint = endpoint
+        self.input_key = next(
+            (key for key in BATCH_INPUT_KEYS if isinstance(payload.get(key), list)),
+            None,
+        )
+
+        if self.input_key is None:
+            self.inputs = None
+            self.body = cache.get(endpoint, payload)
+            self.payload = payload if self.body is None else None
+            return
+
+        # One cache entry per input, keyed together with the requested fields.
+        shared = {key: value for key, value in payload.items() if key != self.input_key}
+        self.inputs = [
+            dict(shared, **{self.input_key: match_input})
+            for match_input in payload[self.input_key]
+        ]
+        self.results = [cache.get(endpoint, item) for item in self.inputs]
+        self.missing = [
+            index for index, result in enumerate(self.results) if result is None
+        ]
+        self.payload = (
+            dict(
+                payload,
+                **{self.input_key: [payload[self.input_key][i] for i in self.missing]},
+            )
+            if self.missing
+            else None
+        )
+
+    def cached_response(self):
+        """
+        Returns the answer of a request that was fully served from the cache.
+
+        Returns:
+            CachedResponse: The response.
+        """
+        if self.inputs is None:
+            return CachedResponse(200, json.dumps(self.body))
+        return CachedResponse(
+            200, json.dumps({"success": True, "data": {"result": self.results}})
+        )
+
+    def complete(self, response):
+        """
+        Stores the answers of a sent request and merges them with the cached ones.
+
+        Args:
+            response: The response to the payload of this request.
+
+        Returns:
+            The response to return to the caller.
+        """
+        if response.status_code != 200:
+            return response
+
+        body = response.json()
+        if self.inputs is None:
+            if body is not None and body.get("success", True):
+                self.cache.put(self.endpoint, self.payload, body)
+            return response
+
+        if not body or not body.get("success"):
+            return response
+
+        fresh = (body.get("data") or {}).get("result") or []
+        for index, result in zip(self.missing, fresh):
+            self.results[index] = result
+            self.cache.put(self.endpoint, self.inputs[index], result)
+
+        if len(self.missing) == len(self.inputs):
+            return response
+        body["data"]["result"] = self.results
+        return CachedResponse(200, json.dumps(body))
+
+
+_cache = None
+_configured = False
+_cache_lock = threading.Lock()
+
+
+def configure(path):
+    """
+    Opens the shared cache at a path, or disables it.
+
+    Args:
+        path (str): The database file, or None to disable the cache.
+
+    Returns:
+        ResponseCache: The shared cache, or None.
+    """
+    global _cache, _configured
+
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = ResponseCache(path) if path else None
+        _configured = True
+    return _cache
+
+
+def get_cache():
+    """
+    Returns the shared cache, opening ZOOMINFO_CACHE_PATH on first use.
+
+    Returns:
+        ResponseCache: The shared cache, or None if caching is disabled.
+    """
+    global _cache, _configured
+
+    if not _configured:
+        with _cache_lock:
+            if not _configured:
+                path = os.environ.get("ZOOMINFO_CACHE_PATH")
+                _cache = ResponseCache(path) if path else None
+                _configured = True
+    return _cache
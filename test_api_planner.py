@@ -0,0 +1,117 @@
+import csv
+import time
+from unittest.mock import patch, MagicMock
+import apiPlanner
+import contactEnrich
+import negativeCache
+import responseCache
+from enrichmentRecord import EnrichmentRecord, HEADER_MAPPING
+
+def make_row(name, first_name="", street="1 Main St", **fields):
+    row = dict.fromkeys(HEADER_MAPPING, "")
+    row.update({"Supplier Company": name, "Supplier First Name": first_name, "Supplier Street": street})
+    record = EnrichmentRecord.from_row(row)
+    for key, value in fields.items():
+        record[key] = value
+    return record
+
+def sample_rows():
+    return [
+        make_row("Acme", first_name="Ann"),
+        make_row("Acme"),                          # same site, no contact
+        make_row("Acme", street="9 Side St"),      # another Acme site
+        make_row("Globex", zi_c_company_id="42"),  # resumed, already enriched
+        make_row(""),                              # nothing to match on
+    ]
+
+def test_plan_skips_calls_that_cannot_succeed():
+    plans = apiPlanner.plan_records(sample_rows())
+    actions = [plan for _, plan in plans]
+
+    assert [plan["contact_enrich"] for plan in actions] == [
+        apiPlanner.CALL, apiPlanner.NO_CONTACT_FIELDS, apiPlanner.NO_CONTACT_FIELDS,
+        apiPlanner.NO_CONTACT_FIELDS, apiPlanner.NO_CONTACT_FIELDS,
+    ]
+    assert [plan["company_enrich"] for plan in actions] == [
+        apiPlanner.CALL, apiPlanner.SHARED, apiPlanner.CALL, apiPlanner.ALREADY_ENRICHED, apiPlanner.CALL,
+    ]
+    assert [plan["contact_search"] for plan in actions] == [
+        apiPlanner.HAS_CONTACT, apiPlanner.CALL, apiPlanner.CALL, apiPlanner.CALL, apiPlanner.NO_COMPANY,
+    ]
+
+def test_estimate_requests_credits_and_time():
+    plans = list(apiPlanner.plan_records(sample_rows()))
+
+    cascade = apiPlanner.estimate(plans, concurrency=10, rate=4, search_mode="cascade")
+    assert cascade["stages"]["contact_enrich"] == {"records": 1, "requests": 1, "credits": 1}
+    assert cascade["stages"]["company_enrich"] == {"records": 3, "requests": 2, "credits": 3}
+    # Two sites still to be enriched, each its own location and company, and Globex's company ID:
+    # 2 steps per location and 2 per company
+    assert cascade["stages"]["contact_search"] == {"records": 3, "requests": 10, "credits": 0}
+    assert cascade["stages"]["add_new_contact"] == {"records": 3, "requests": 1, "credits": 3}
+    assert cascade["requests"] == 14 and cascade["credits"] == 7
+    assert cascade["seconds"] == 14 / 4
+
+    # Worst case: a page per company, each incomplete and followed by the cascade
+    single = apiPlanner.estimate(plans, concurrency=1, rate=4, search_mode="single", latency=0.5)
+    assert single["stages"]["contact_search"]["requests"] == 13
+    assert single["seconds"] == 17 / 2
+    assert "up to 17 requests and 7 credits" in apiPlanner.format_estimate(single)
+
+def test_searches_shared_by_search_key():
+    """Enriched rows share searches by location and company ID, as SearchMemo does"""
+    rows = [
+        make_row("Acme", zi_c_company_id="1", zi_c_location_id="10"),
+        make_row("Acme Inc", street="9 Side St", zi_c_company_id="1", zi_c_location_id="10"),
+        make_row("Acme", street="5 Other St", zi_c_company_id="1", zi_c_location_id="11"),
+    ]
+    plans = list(apiPlanner.plan_records(rows))
+
+    assert [plan["contact_search"] for _, plan in plans] == [
+        apiPlanner.CALL, apiPlanner.SHARED, apiPlanner.CALL,
+    ]
+    # Locations 10 and 11 and company 1
+    assert apiPlanner.estimate(plans, search_mode="cascade")["stages"]["contact_search"]["requests"] == 6
+
+def test_plan_uses_caches(tmp_path):
+    cache = responseCache.ResponseCache(str(tmp_path / "zoominfo.sqlite"))
+    no_matches = negativeCache.NegativeCache(cache.path)
+    rows = sample_rows()
+    cache.put("/enrich/contact", {
+        "matchPersonInput": contactEnrich.build_contact_input(rows[0]),
+        "outputFields": contactEnrich.CONTACT_OUTPUT_FIELDS,
+    }, {"data": []})
+    no_matches.add(negativeCache.CONTACT_SEARCH, ["", "42"])
+
+    actions = [plan for _, plan in apiPlanner.plan_records(rows, cache, no_matches)]
+    assert actions[0]["contact_enrich"] == apiPlanner.CACHED
+    assert actions[3]["contact_search"] == apiPlanner.KNOWN_NO_MATCH
+    assert cache.hits == {} and cache.misses == {}
+    cache.close()
+    no_matches.close()
+
+def test_dry_run_writes_plan(tmp_path):
+    input_csv = tmp_path / "input.csv"
+    with open(input_csv, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(HEADER_MAPPING))
+        writer.writeheader()
+        writer.writerow({"Supplier Company": "Acme", "Supplier Email": "a@acme.com"})
+        writer.writerow({"Supplier Company": " Acme "})
+
+    summary = apiPlanner.dry_run(str(input_csv), plan_path=str(tmp_path / "plan.csv"), search_mode="single")
+
+    assert summary["rows"] == 2
+    with open(tmp_path / "plan.csv", encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["company_enrich"] for row in rows] == [apiPlanner.CALL, apiPlanner.SHARED]
+
+def test_contact_enrich_skips_rows_without_contact_fields():
+    data = [make_row("Acme", first_name="Ann"), make_row("Acme")]
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"success": True, "data": {"result": []}}
+
+    with patch('requests.Session.post', return_value=response) as mock_post:
+        contactEnrich.contact_enrich_records(data, "token", time.time(), "user", "pass")
+
+    inputs = mock_post.call_args.kwargs["json"]["matchPersonInput"]
+    assert [match_input["firstName"] for match_input in inputs] == ["Ann"]
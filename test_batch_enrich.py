@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import patch, MagicMock
+import batchEnrich
+
+def _build_input(entry):
+    return {"personId": entry["personId"]}
+
+def _fake_enrich(url, jwt_token=None, json=None, **kwargs):
+    """Reject any batch containing the 'bad' input; echo every other input"""
+    inputs = json["matchPersonInput"]
+    response = MagicMock()
+    if any(match_input["personId"] == "bad" for match_input in inputs):
+        response.status_code = 400
+        response.text = "Invalid input"
+        return response
+    response.status_code = 200
+    response.json.return_value = {
+        "success": True,
+        "data": {"result": [{"input": match_input} for match_input in inputs]},
+    }
+    return response
+
+@pytest.fixture
+def mock_post():
+    with patch('requests.Session.post', side_effect=_fake_enrich) as mock:
+        yield mock
+
+def test_results_mapped_back_by_index(mock_post):
+    """Inputs are packed into full batches and each result returns to its row"""
+    entries = [{"personId": str(i)} for i in range(60)]
+
+    results = batchEnrich.enrich_in_batches(
+        "https://example.test/enrich", entries, _build_input,
+        "matchPersonInput", [], lambda: "token", workers=3,
+    )
+
+    assert mock_post.call_count == 3
+    assert [len(c.kwargs["json"]["matchPersonInput"]) for c in mock_post.call_args_list] == [25, 25, 10]
+    assert [result["input"]["personId"] for result in results] == [str(i) for i in range(60)]
+
+def test_rejected_input_is_isolated(mock_post):
+    """A 400 splits the batch until only the rejected row fails"""
+    entries = [{"personId": str(i)} for i in range(8)]
+    entries[5]["personId"] = "bad"
+
+    results = batchEnrich.enrich_in_batches(
+        "https://example.test/enrich", entries, _build_input,
+        "matchPersonInput", [], lambda: "token",
+    )
+
+    assert results[5] is None
+    assert entries[5]["enrichmentStatus"] == "Failed"
+    assert entries[5]["errorMessage"] == "Invalid input"
+    assert all(results[i]["input"]["personId"] == str(i) for i in range(8) if i != 5)
+    assert all("enrichmentStatus" not in entries[i] for i in range(8) if i != 5)
+
+def test_company_passes_only_resend_strict_misses():
+    """Strict matches skip the non-strict batch; a rejected email is retried without it"""
+    import time
+    import companyEnrich
+    from enrichmentRecord import EnrichmentRecord, HEADER_MAPPING
+
+    def fake_company(url, jwt_token=None, json=None, **kwargs):
+        inputs = json["matchCompanyInput"]
+        response = MagicMock(status_code=200)
+        if any(match_input.get("email") == "bad" for match_input in inputs):
+            response.status_code = 400
+            return response
+        strict = "zi_c_street" in inputs[0]["address"]
+        response.json.return_value = {"success": True, "data": {"result": [
+            {"data": {"zi_c_company_id": match_input["zi_c_name"]}}
+            if strict == match_input["zi_c_name"].startswith("Strict") else {"data": {}}
+            for match_input in inputs
+        ]}}
+        return response
+
+    names = ["Strict A", "Loose B", "Strict C", "Loose D"]
+    data = [
+        EnrichmentRecord.from_row(dict.fromkeys(HEADER_MAPPING, ""))
+        for name in names
+    ]
+    for entry, name in zip(data, names):
+        entry["companyName"] = name
+    data[3]["emailAddress"] = "bad"
+
+    with patch('requests.Session.post', side_effect=fake_company) as mock_post:
+        companyEnrich.company_enrich_records(data, "token", time.time(), "user", "pass")
+
+    inputs = [c.kwargs["json"]["matchCompanyInput"] for c in mock_post.call_args_list]
+    non_strict = [i["zi_c_name"] for batch in inputs for i in batch if "zi_c_street" not in i["address"]]
+    assert [i["zi_c_name"] for i in inputs[0]] == names
+    assert sorted(set(non_strict)) == ["Loose B", "Loose D"]
+    assert [entry["company_match_criteria"] for entry in data] == [
+        "Strict", "Non-strict", "Strict", "Non-strict"
+    ]
+    assert [entry["zi_c_company_id"] for entry in data] == names
@@ -0,0 +1,79 @@
+import time
+from unittest.mock import patch, MagicMock
+import companyDedup
+import companyEnrich
+from enrichmentRecord import EnrichmentRecord, HEADER_MAPPING
+
+def make_row(name, country="United States", street="1 Main St", zip_code="78701"):
+    row = dict.fromkeys(HEADER_MAPPING, "")
+    row.update({
+        "Supplier Company": name, "Supplier Country": country,
+        "Supplier Street": street, "Supplier Zip Code": zip_code,
+    })
+    return EnrichmentRecord.from_row(row)
+
+def test_company_key_normalizes_rows():
+    """Case, punctuation, legal suffixes and country aliases do not split a company"""
+    key = companyDedup.company_key(make_row("Acme, Inc."))
+
+    assert companyDedup.company_key(make_row("ACME", country="USA", zip_code="78701-1234")) == key
+    assert companyDedup.company_key(make_row("Acme", street="9 Side St")) != key
+    assert companyDedup.company_key(make_row("Acme", street="9 Side St"), include_address=False) == \
+        companyDedup.company_key(make_row("Acme"), include_address=False)
+    assert companyDedup.company_key(make_row("")) is None
+
+def test_each_company_looked_up_once(capsys):
+    """Only one row per company is sent to company-master; the rest receive its result"""
+    def fake_company(url, jwt_token=None, json=None, **kwargs):
+        inputs = json["matchCompanyInput"]
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"success": True, "data": {"result": [
+            {"data": {"zi_c_company_id": match_input["zi_c_name"].upper(), "zi_c_url": "acme.com"}}
+            for match_input in inputs
+        ]}}
+        return response
+
+    data = [make_row("Acme Inc"), make_row("Globex"), make_row("ACME"), make_row("acme, inc.")]
+    data[2]["zi_c_url"] = "KEEP"
+
+    with patch('requests.Session.post', side_effect=fake_company) as mock_post:
+        companyEnrich.company_enrich_records(data, "token", time.time(), "user", "pass")
+
+    inputs = mock_post.call_args.kwargs["json"]["matchCompanyInput"]
+    assert [match_input["zi_c_name"] for match_input in inputs] == ["Acme Inc", "Globex"]
+    assert [entry["zi_c_company_id"] for entry in data] == ["ACME INC", "GLOBEX", "ACME INC", "ACME INC"]
+    assert data[2]["zi_c_url"] == "KEEP"
+    assert all(entry["company_match_criteria"] == "Strict" for entry in data)
+    assert "4 rows, 2 unique companies looked up, 2 lookups saved" in capsys.readouterr().out
+
+def test_outcomes_are_bounded():
+    """Only the most recently used outcomes are kept; an evicted company is looked up again"""
+    dedup = companyDedup.CompanyDeduplicator(["zi_c_url"], max_outcomes=2)
+
+    def run_window(names):
+        rows = [make_row(name) for name in names]
+        to_enrich, pending = dedup.plan(rows)
+        for entry in to_enrich:
+            entry["zi_c_url"] = entry["companyName"].lower() + ".com"
+        dedup.fan_out(pending)
+        return to_enrich, rows
+
+    to_enrich, rows = run_window(["Acme", "Globex", "Acme", "Initech"])
+    assert [entry["companyName"] for entry in to_enrich] == ["Acme", "Globex", "Initech"]
+    assert rows[2]["zi_c_url"] == "acme.com"
+    assert len(dedup._outcomes) == 2
+
+    to_enrich, rows = run_window(["Initech", "Acme", "Globex"])
+    assert [entry["companyName"] for entry in to_enrich] == ["Acme"]
+    assert rows[0]["zi_c_url"] == "initech.com"
+    assert rows[2]["zi_c_url"] == "globex.com"
+
+    to_enrich, rows = run_window(["Globex", "Initech"])
+    assert [entry["companyName"] for entry in to_enrich] == ["Initech"]
+    assert len(dedup._outcomes) == 2
+
+def test_outcome_limit_from_environment():
+    with patch.dict('os.environ', {"ENRICHMENT_DEDUP_MAX_COMPANIES": "5"}):
+        assert companyDedup.CompanyDeduplicator([]).max_outcomes == 5
+    with patch.dict('os.environ', clear=True):
+        assert companyDedup.CompanyDeduplicator([]).max_outcomes == companyDedup.DEFAULT_MAX_OUTCOMES
@@ -0,0 +1,154 @@
+import json
+import time
+from unittest.mock import patch, MagicMock
+import asyncEnrich
+import contactSearch
+
+def search_response(status_code=200, person_id=None):
+    response = MagicMock(status_code=status_code, text="" if status_code == 200 else "Server error")
+    response.json.return_value = {"data": [{"id": person_id}] if person_id else []}
+    return response
+
+def make_rows():
+    # Three rows at location L1 of company C1, one row at another company without a location
+    rows = [{"needsContact": "Yes", "zi_c_location_id": "L1", "zi_c_company_id": "C1"} for _ in range(3)]
+    rows.append({"needsContact": "Yes", "zi_c_location_id": "", "zi_c_company_id": "C2"})
+    return rows
+
+def fake_search(url, jwt_token=None, json=None, **kwargs):
+    # Only loose searches find anyone, so the cascade has to go past the strict step
+    if "managementLevel" in json:
+        return search_response()
+    return search_response(person_id="P-" + str(json.get("companyId") or json["locationCompanyId"][0]))
+
+def test_search_cascade_runs_once_per_location(capsys):
+    """Rows at the same location reuse the search results of the first row"""
+    data = make_rows()
+
+    with patch('requests.Session.post', side_effect=fake_search) as mock_post:
+        contactSearch.contact_search_records(data, "token", time.time(), "user", "pass", workers=3)
+
+    # L1 strict + loose, C2 strict + loose
+    assert mock_post.call_count == 4
+    assert [entry["personId"] for entry in data] == ["P-L1", "P-L1", "P-L1", "P-C2"]
+    assert all(entry["contactMatchCriteria"] == "locationId_loose" for entry in data[:3])
+    assert data[3]["contactMatchCriteria"] == "companyId_loose"
+    assert "Contact searches: 4 sent, 4 reused." in capsys.readouterr().out
+
+def test_failed_search_is_not_memoized():
+    """A failed search is retried by the next row instead of being shared"""
+    memo = contactSearch.SearchMemo()
+    responses = iter([search_response(500), search_response(person_id="P1")])
+    entries = [{"zi_c_company_id": "C1"}, {"zi_c_company_id": "C1"}, {"zi_c_company_id": "C1"}]
+
+    with patch('requests.Session.post', side_effect=lambda *args, **kwargs: next(responses)) as mock_post:
+        results = [
+            contactSearch.get_contact_person_id(entry, "token", False, False, memo=memo)
+            for entry in entries
+        ]
+
+    assert results == [None, "P1", "P1"]
+    assert mock_post.call_count == 2
+    assert entries[0]["enrichmentStatus"] == "Failed"
+    assert "enrichmentStatus" not in entries[1]
+
+def test_async_search_shared_across_runs():
+    """The async runner shares searches between concurrent entries and later windows"""
+    calls = []
+
+    async def fake_post(self, url, **kwargs):
+        calls.append(kwargs["json"])
+        response = fake_search(url, **kwargs)
+        return asyncEnrich.AsyncResponse(200, json.dumps(response.json.return_value))
+
+    token_manager = MagicMock()
+    token_manager.needs_refresh.return_value = False
+    token_manager.get_token.return_value = "token"
+
+    with patch('asyncEnrich.AsyncZoomInfoClient.post', fake_post):
+        with asyncEnrich.AsyncStageRunner(token_manager, concurrency=4) as runner:
+            first, second = make_rows(), make_rows()
+            runner.run(first, ["contact_search"])
+            runner.run(second, ["contact_search"])
+
+    assert len(calls) == 4
+    assert [entry["personId"] for entry in first + second] == ["P-L1", "P-L1", "P-L1", "P-C2"] * 2
+    assert runner.search_memo.reused == 12
+
+DIRECTORY = [
+    # Sorted by hierarchy, as the API returns them
+    {"id": "CEO", "companyId": "C1", "locationCompanyId": "L9", "managementLevel": ["C Level Exec"], "department": ["C-Suite"]},
+    {"id": "VP-SALES", "companyId": "C1", "locationCompanyId": "L1", "managementLevel": ["VP Level Exec"], "department": ["Sales"]},
+    {"id": "MGR-OPS", "companyId": "C1", "locationCompanyId": "L1", "managementLevel": ["Manager"], "department": ["Operations"]},
+    {"id": "STAFF", "companyId": "C1", "locationCompanyId": "L2", "managementLevel": ["Non Manager"], "department": ["Operations"]},
+    {"id": "ONLY", "companyId": "C2", "locationCompanyId": "L3", "managementLevel": "Non Manager", "department": "Finance"},
+]
+
+def fake_directory(url, json=None, **kwargs):
+    contacts = DIRECTORY
+    if "locationCompanyId" in json:
+        contacts = [c for c in contacts if c["locationCompanyId"] in json["locationCompanyId"]]
+    if "companyId" in json:
+        contacts = [c for c in contacts if c["companyId"] == json["companyId"]]
+    if "managementLevel" in json:
+        contacts = [c for c in contacts if contactSearch.matches_search(c, {}, True, False)]
+    page = contacts[:json["rpp"]]
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"totalResults": len(contacts), "data": [
+        {field: c[field] for field in c if field == "id" or "outputFields" in json} for c in page
+    ]}
+    return response
+
+def directory_rows():
+    return [
+        {"needsContact": "Yes", "zi_c_location_id": "L1", "zi_c_company_id": "C1"},
+        {"needsContact": "Yes", "zi_c_location_id": "L2", "zi_c_company_id": "C1"},
+        {"needsContact": "Yes", "zi_c_location_id": "L7", "zi_c_company_id": "C1"},
+        {"needsContact": "Yes", "zi_c_location_id": "", "zi_c_company_id": "C2"},
+        {"needsContact": "Yes", "zi_c_location_id": "L8", "zi_c_company_id": "C3"},
+    ]
+
+def test_single_call_mode_picks_cascade_contact():
+    """One page per company picks the same contact and criteria as the four-step cascade"""
+    cascade, single = directory_rows(), directory_rows()
+
+    with patch('requests.Session.post', side_effect=fake_directory):
+        contactSearch.contact_search_records(cascade, "token", time.time(), "user", "pass", mode="cascade")
+    with patch('requests.Session.post', side_effect=fake_directory) as mock_post:
+        contactSearch.contact_search_records(single, "token", time.time(), "user", "pass", mode="single")
+
+    assert [(e.get("personId"), e.get("contactMatchCriteria")) for e in single] == \
+        [(e.get("personId"), e.get("contactMatchCriteria")) for e in cascade]
+    assert [e.get("personId") for e in single] == ["MGR-OPS", "STAFF", "CEO", "ONLY", None]
+    # One page each for C1, C2 and C3
+    assert mock_post.call_count == 3
+
+def test_single_call_mode_falls_back_on_partial_page():
+    """When the page does not hold every contact, undecided steps are searched as before"""
+    entry = {"zi_c_location_id": "L2", "zi_c_company_id": "C1"}
+    page = {"contacts": [DIRECTORY[0]], "complete": False}
+
+    assert contactSearch.choose_contact(entry, page) == (None, None, 0)
+    assert contactSearch.choose_contact(dict(entry, zi_c_location_id=""), page) == ("CEO", "companyId_strict", None)
+
+    with patch('requests.Session.post', side_effect=fake_directory), \
+         patch.object(contactSearch, 'SEARCH_PAGE_SIZE', 1):
+        person_id, match_criteria = contactSearch.find_contact(entry, lambda: "token", mode="single")
+    assert (person_id, match_criteria) == ("STAFF", "locationId_loose")
+
+def test_async_single_call_mode():
+    async def fake_post(self, url, **kwargs):
+        response = fake_directory(url, **kwargs)
+        return asyncEnrich.AsyncResponse(200, json.dumps(response.json.return_value))
+
+    token_manager = MagicMock()
+    token_manager.needs_refresh.return_value = False
+    token_manager.get_token.return_value = "token"
+
+    data = directory_rows()
+    with patch('asyncEnrich.AsyncZoomInfoClient.post', fake_post):
+        with asyncEnrich.AsyncStageRunner(token_manager, concurrency=4, search_mode="single") as runner:
+            runner.run(data, ["contact_search"])
+
+    assert [e.get("personId") for e in data] == ["MGR-OPS", "STAFF", "CEO", "ONLY", None]
+    assert runner.search_memo.searches == 3
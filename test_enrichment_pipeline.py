@@ -0,0 +1,212 @@
+import pytest
+import os
+import csv
+import json
+from unittest.mock import patch, MagicMock
+from enrichmentPipeline import EnrichmentPipeline
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    """Create a sample CSV file with one complete and one contactless row"""
+    csv_path = tmp_path / "suppliers.csv"
+    fieldnames = [
+        "Supplier Company", "Supplier First Name", "Supplier Last Name",
+        "Supplier Email", "Supplier Phone", "Supplier Street", "Supplier City",
+        "Supplier State", "Supplier Zip Code", "Supplier Country", "Site Name",
+        "Site ID", "Additional Contact Info"
+    ]
+    rows = [
+        ["  Test  Company ", "John", "Doe", "john@test.com", "1234567890",
+         "123 Test St", "Test City", "TS", "12345", "United States",
+         "Site A", "SITE001", ""],
+        ["Other Company", "", "", "", "", "", "", "", "", "United States",
+         "Site B", "SITE002", ""],
+    ]
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+    return str(csv_path)
+
+def _response(payload):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = payload
+    return response
+
+def fake_zoominfo(url, *args, **kwargs):
+    """Answer every ZoomInfo endpoint with a canned successful response"""
+    if url.endswith("/enrich/company-master"):
+        company = {"data": {
+            "zi_c_company_id": 42, "zi_c_location_id": 7,
+            "zi_c_naics6": "111110", "zi_c_street": "1 Main St",
+            "zi_c_city": "Austin", "zi_c_state": "TX", "zi_c_zip": "78701",
+        }}
+        return _response({
+            "success": True,
+            "data": {"result": [company] * len(kwargs["json"]["matchCompanyInput"])},
+        })
+    if url.endswith("/search/contact"):
+        return _response({"data": [{"id": 99}]})
+    return _response({
+        "success": True,
+        "data": {"result": [
+            _person_result(match_input)
+            for match_input in kwargs["json"]["matchPersonInput"]
+        ]},
+    })
+
+def _person_result(match_input):
+    if not match_input.get("personId") and not match_input.get("firstName"):
+        return {"matchStatus": "NO_MATCH", "data": []}
+    return {"matchStatus": "FULL_MATCH", "data": [{
+        "firstName": "Jane", "lastName": "Roe", "email": "jane@other.com",
+        "phone": "555", "jobTitle": "Buyer",
+    }]}
+
+@pytest.fixture
+def mock_zoominfo():
+    with patch('requests.Session.post', side_effect=fake_zoominfo) as mock:
+        yield mock
+
+def read_output(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+def test_pipeline_runs_all_stages_in_memory(sample_csv, mock_zoominfo):
+    """The pipeline writes only the enhanced CSV and no intermediate JSON"""
+    pipeline = EnrichmentPipeline(sample_csv, "user", "pass", jwt_token="token")
+    output_csv = pipeline.run()
+
+    assert output_csv.endswith("suppliers - Enhanced.csv")
+    assert not os.path.exists(os.path.splitext(sample_csv)[0] + ".json")
+
+    rows = read_output(output_csv)
+    assert len(rows) == 2
+    assert rows[0]["Supplier Company"] == "Test Company"
+    assert rows[0]["Needs New Contact"] == "No"
+    assert rows[0]["Sector Title"] == "Agriculture, Forestry, Fishing and Hunting"
+    assert rows[1]["Needs New Contact"] == "Yes"
+    assert rows[1]["Contact Person ID"] == "99"
+    assert rows[1]["Supplier First Name"] == "Jane"
+    assert rows[1]["Supplier Street"] == "1 Main St"
+
+def test_pipeline_checkpoint_removed_after_success(sample_csv, mock_zoominfo):
+    """Checkpoints are written during the run and removed once the output exists"""
+    pipeline = EnrichmentPipeline(
+        sample_csv, "user", "pass", jwt_token="token", checkpoint=True
+    )
+    pipeline.run()
+
+    assert pipeline.completed_stages[-1] == "update_address"
+    assert not os.path.exists(pipeline.checkpoint_path)
+
+def test_pipeline_resumes_from_checkpoint(sample_csv, mock_zoominfo):
+    """Stages recorded in the checkpoint are not run again"""
+    pipeline = EnrichmentPipeline(
+        sample_csv, "user", "pass", jwt_token="token", checkpoint=True
+    )
+    pipeline.load()
+    for name, function, needs_auth, _ in pipeline.stages[:3]:
+        pipeline.run_stage(name, function, needs_auth)
+    calls_before_resume = mock_zoominfo.call_count
+
+    resumed = EnrichmentPipeline(
+        sample_csv, "user", "pass", jwt_token="token", checkpoint=True
+    )
+    with open(resumed.checkpoint_path, 'r', encoding='utf-8') as f:
+        assert json.load(f)["completed_stages"] == [
+            "remove_spaces", "contact_enrich", "company_enrich"
+        ]
+    resumed.run()
+
+    endpoints = [c.args[0] for c in mock_zoominfo.call_args_list[calls_before_resume:]]
+    assert not any(url.endswith("/enrich/company-master") for url in endpoints)
+    assert read_output(resumed.output_csv)[1]["Contact Person ID"] == "99"
+
+def test_pipeline_stream_matches_in_memory_run(sample_csv, mock_zoominfo):
+    """Streaming in small windows produces the same output as the in-memory run"""
+    expected = read_output(
+        EnrichmentPipeline(sample_csv, "user", "pass", jwt_token="token").run()
+    )
+
+    pipeline = EnrichmentPipeline(sample_csv, "user", "pass", jwt_token="token")
+    with patch.object(pipeline, 'run_window', wraps=pipeline.run_window) as spy:
+        output_csv = pipeline.stream(window_size=1)
+
+    assert [len(c.args[0]) for c in spy.call_args_list] == [1, 1]
+    assert read_output(output_csv) == expected
+
+def test_pipeline_workers_match_sequential_run(sample_csv, mock_zoominfo):
+    """Concurrent stages produce the same rows, in the same order, as one worker"""
+    expected = read_output(
+        EnrichmentPipeline(sample_csv, "user", "pass", jwt_token="token").run()
+    )
+
+    pipeline = EnrichmentPipeline(
+        sample_csv, "user", "pass", jwt_token="token", workers=4
+    )
+
+    assert read_output(pipeline.run()) == expected
+
+def test_pipeline_frame_groups_local_stages(sample_csv, mock_zoominfo):
+    """frame=True converts back-to-back local stages once and matches the loop path"""
+    import frameParser
+
+    expected = read_output(
+        EnrichmentPipeline(sample_csv, "user", "pass", jwt_token="token").run()
+    )
+
+    pipeline = EnrichmentPipeline(
+        sample_csv, "user", "pass", jwt_token="token", frame=True
+    )
+    with patch('frameParser.run_local_stages', wraps=frameParser.run_local_stages) as spy:
+        output_csv = pipeline.run()
+
+    assert [c.kwargs["names"] for c in spy.call_args_list] == [
+        ["remove_spaces"], ["needs_contact"], ["sector_and_industry", "update_address"]
+    ]
+    assert pipeline.completed_stages == [name for name, _, _, _ in pipeline.stages]
+    assert read_output(output_csv) == expected
+
+def test_pipeline_async_engine_matches_threads(sample_csv, mock_zoominfo):
+    """The asyncio engine enriches the same rows as the threaded engine"""
+    import asyncEnrich
+
+    expected = read_output(
+        EnrichmentPipeline(sample_csv, "user", "pass", jwt_token="token").run()
+    )
+
+    async def fake_post(self, url, **kwargs):
+        response = fake_zoominfo(url, **kwargs)
+        return asyncEnrich.AsyncResponse(200, json.dumps(response.json.return_value))
+
+    pipeline = EnrichmentPipeline(
+        sample_csv, "async-user", "pass", engine="async", concurrency=4
+    )
+    with patch('asyncEnrich.AsyncZoomInfoClient.post', fake_post), \
+         patch('auth.authenticate', return_value="token") as mock_auth:
+        output_csv = pipeline.run()
+
+    assert read_output(output_csv) == expected
+    assert mock_auth.call_count == 1
+    assert pipeline.jwt_token == "token"
+
+def test_token_refreshed_once_by_concurrent_workers():
+    """Only one worker re-authenticates an expired token; the rest reuse it"""
+    import threading
+    import auth
+    import workerPool
+
+    refresher = auth.TokenRefresher("user", "pass", "old", last_auth_time=0)
+    barrier = threading.Barrier(8)
+
+    def use_token(_):
+        barrier.wait()
+        return refresher.get_token()
+
+    with patch('auth.authenticate', return_value="new") as mock_auth:
+        tokens = workerPool.map_records(use_token, list(range(8)), workers=8)
+
+    assert tokens == ["new"] * 8
+    assert mock_auth.call_count == 1
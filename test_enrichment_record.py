@@ -0,0 +1,39 @@
+import json
+import pickle
+from enrichmentRecord import EnrichmentRecord, RECORD_FIELDS
+
+def test_from_row_maps_headers_and_defaults():
+    """Template headers are mapped, defaults added and unknown columns kept"""
+    record = EnrichmentRecord.from_row(
+        {"Supplier Company": " Acme ", "Supplier Country": "US", "Region": "West"},
+        strip_values=True,
+    )
+
+    assert record["companyName"] == "Acme"
+    assert record["enrichmentStatus"] == "Success"
+    assert record["Region"] == "West"
+    assert "firstName" not in record
+    assert "company_match_criteria" not in record
+    assert record.get("firstName", "") == ""
+    assert list(record.keys())[:2] == ["companyName", "companyCountry"]
+
+def test_record_behaves_like_a_dict():
+    """Records support the mapping operations the enrichment stages use"""
+    record = EnrichmentRecord({"companyName": "Acme"})
+    record["company_match_criteria"] = "Strict"
+    record.update({"zi_c_name": "Acme Inc", "Notes": "x"})
+
+    expected = {"companyName": "Acme", "zi_c_name": "Acme Inc", "Notes": "x"}
+    assert all(record[key] == value for key, value in expected.items())
+    assert record == record.to_dict()
+    assert json.loads(json.dumps(record.to_dict()))["company_match_criteria"] == "Strict"
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert not hasattr(record, "__dict__")
+    assert set(RECORD_FIELDS) >= set(record.keys()) - {"Notes"}
+
+def test_repeated_values_are_interned():
+    """Identical input values across rows share one string object"""
+    first = EnrichmentRecord.from_row({"Supplier Country": "".join(["United ", "States"])})
+    second = EnrichmentRecord.from_row({"Supplier Country": "".join(["United ", "States"])})
+
+    assert first["companyCountry"] is second["companyCountry"]
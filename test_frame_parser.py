@@ -0,0 +1,88 @@
+import copy
+import frameParser
+import jsonParser
+import naicsMatch
+from enrichmentRecord import EnrichmentRecord
+
+def sample_records():
+    return [
+        {
+            "firstName": "  Ada ", "lastName": "Lovelace", "emailAddress": "", "phone": "",
+            "companyStreet": "", "companyCity": "", "companyState": "", "companyZipCode": "",
+            "zi_c_street": "1  Main   St", "zi_c_city": "Boston", "zi_c_state": "MA", "zi_c_zip": "02110",
+            "zi_c_naics6": "541511", "sectorTitle": "", "primaryIndustry": "", "count": 3,
+        },
+        {
+            "firstName": "", "lastName": "", "emailAddress": "", "phone": "",
+            "companyStreet": "", "companyCity": "Austin", "companyState": "", "companyZipCode": "",
+            "zi_c_street": "2 Elm St", "zi_c_city": "Dallas", "zi_c_state": "TX", "zi_c_zip": "75201",
+            "zi_c_naics6": "999999", "sectorTitle": "", "primaryIndustry": "",
+        },
+        {
+            "firstName": "", "lastName": "", "emailAddress": "", "phone": "\t",
+            "companyStreet": None, "companyCity": "", "companyState": "", "companyZipCode": "",
+            "zi_c_naics6": "", "sectorTitle": "", "primaryIndustry": "",
+        },
+    ]
+
+def run_loop(records):
+    jsonParser.remove_spaces_records(records)
+    count = jsonParser.update_needs_contact_records(records)
+    naicsMatch.get_sector_and_industry_records(records)
+    jsonParser.update_address_records(records)
+    return count
+
+def run_frame(records):
+    frameParser.remove_spaces_records(records)
+    count = frameParser.update_needs_contact_records(records)
+    frameParser.get_sector_and_industry_records(records)
+    frameParser.update_address_records(records)
+    return count
+
+def test_frame_path_matches_loop_path():
+    expected = sample_records()
+    records = copy.deepcopy(expected)
+
+    assert run_frame(records) == run_loop(expected) == 2
+    assert records == expected
+    assert records[0]["firstName"] == "Ada" and records[0]["companyStreet"] == "1 Main St"
+    assert records[1]["companyCity"] == "Austin" and records[1]["companyStreet"] == ""
+    assert records[2]["companyStreet"] == ""
+
+def test_frame_path_keeps_absent_fields_absent():
+    records = [EnrichmentRecord.from_row({"companyName": " Acme  Corp ", "firstName": "", "lastName": "", "emailAddress": "", "phone": ""})]
+    records[0]["zi_c_naics6"] = "111110"
+    records[0]["extra"] = "  x  y "
+    expected = copy.deepcopy(records)
+
+    run_frame(records)
+    run_loop(expected)
+
+    assert dict(records[0]) == dict(expected[0])
+    assert records[0]["extra"] == "x y"
+    assert records[0]["primaryIndustry"] == "Soybean Farming"
+
+def test_frame_path_resolves_missing_naics_like_loop_path():
+    """A code of None resolves to Unknown on both paths; only an empty code is skipped"""
+    expected = sample_records()
+    expected[0]["zi_c_naics6"] = None
+    records = copy.deepcopy(expected)
+
+    run_frame(records)
+    run_loop(expected)
+
+    assert records == expected
+    assert (records[0]["sectorTitle"], records[0]["primaryIndustry"]) == ("Unknown", "Unknown")
+    assert records[2]["sectorTitle"] == ""
+
+def test_local_stages_share_one_frame():
+    expected = sample_records()
+    expected[1]["zi_c_naics6"] = None
+    records = copy.deepcopy(expected)
+
+    frameParser.run_local_stages(
+        records, ["remove_spaces", "needs_contact", "sector_and_industry", "update_address"]
+    )
+    run_loop(expected)
+
+    assert records == expected
@@ -0,0 +1,138 @@
+import json
+import time
+import pytest
+from unittest.mock import patch
+# Sets the metrics namespace before lambda_function is first imported
+from test_lambda_function import FakeContext, FakeS3, s3_event
+from lambda_enrichment import EnrichmentProcessor
+import lambda_checkpoint
+import lambda_function
+import lambda_shards
+
+def raw_csv(rows):
+    lines = ["Supplier Company,Site ID"] + [f"Company {i},{i}" for i in range(rows)]
+    return ("\ufeff" + "\r\n".join(lines) + "\r\n").encode("utf-8")
+
+def one_window_processor(input_file, output_file, remaining_time, skip_records):
+    """Processor whose reserve is the whole budget, so every invocation enriches one window"""
+    return EnrichmentProcessor(
+        input_file, output_file, window_size=3, remaining_time=remaining_time,
+        time_reserve_ms=300000, skip_records=skip_records
+    )
+
+def test_handler_continues_across_invocations(tmp_path, monkeypatch):
+    """A file that outruns the budget is checkpointed and finished by continuations, enriching each row once"""
+    s3 = FakeS3(str(tmp_path / "s3"))
+    monkeypatch.setattr(lambda_function, "_s3_client", s3)
+    monkeypatch.setenv("ENRICHMENT_CHECKPOINT", "true")
+    monkeypatch.setattr(lambda_checkpoint, "_processor", one_window_processor)
+    orchestrator = lambda_shards.LocalOrchestrator(lambda_function.handler, FakeContext(), max_workers=1)
+    monkeypatch.setattr(lambda_function, "_orchestrator", orchestrator)
+    key = lambda_function.RAW_PREFIX + "suppliers.csv"
+    s3.put("bucket", key, raw_csv(7))
+    
+    with patch("lambda_auth.get_valid_token", return_value="token"), \
+         patch("lambda_enrichment.EnrichmentProcessor._enrich_records") as mock_enrich:
+        result = lambda_function.handler(s3_event("bucket", key), FakeContext())
+        continuations = orchestrator.wait()
+    
+    assert result["statusCode"] == 202
+    assert [r["statusCode"] for r in continuations] == [202, 200]
+    assert [[r["siteID"] for r in c.args[0]] for c in mock_enrich.call_args_list] == [
+        ["0", "1", "2"], ["3", "4", "5"], ["6"]
+    ]
+    body = json.loads(continuations[-1]["body"])
+    assert body["rows_done"] == 7
+    lines = s3.read("bucket", body["output_file"]).decode("utf-8-sig").splitlines()
+    assert lines[0].startswith("Supplier Company,")
+    assert [line.split(",")[0] for line in lines[1:]] == [f"Company {i}" for i in range(7)]
+
+def test_duplicate_continuation_is_ignored(tmp_path):
+    s3 = FakeS3(str(tmp_path))
+    s3.put("bucket", "raw/big.csv", raw_csv(4))
+    orchestrator = lambda_shards.LocalOrchestrator(handler=lambda event, context: None)
+    
+    with patch("lambda_auth.get_valid_token", return_value="token"), \
+         patch("lambda_enrichment.EnrichmentProcessor._enrich_records") as mock_enrich:
+        checkpoint = lambda_checkpoint.enrich_with_budget(
+            s3, "bucket", "raw/big.csv", "enhanced/big_enhanced.csv", FakeContext(), orchestrator,
+            "work/", create_processor=one_window_processor
+        )
+        event = orchestrator.events[0]
+        lambda_checkpoint.resume(s3, event, FakeContext(), orchestrator, one_window_processor)
+        lambda_checkpoint.resume(s3, event, FakeContext(), orchestrator, one_window_processor)
+        orchestrator.wait()
+    
+    assert checkpoint["rows_done"] == 3 and not checkpoint["finished"]
+    assert mock_enrich.call_count == 2
+    lines = s3.read("bucket", "enhanced/big_enhanced.csv").decode("utf-8-sig").splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == [f"Company {i}" for i in range(4)]
+
+def test_redelivered_s3_event_does_not_start_second_run(tmp_path, monkeypatch):
+    """A redelivered S3 event finds the run it started and exits; a new upload starts a new run"""
+    s3 = FakeS3(str(tmp_path / "s3"))
+    monkeypatch.setattr(lambda_function, "_s3_client", s3)
+    monkeypatch.setenv("ENRICHMENT_CHECKPOINT", "true")
+    monkeypatch.setattr(lambda_checkpoint, "_processor", one_window_processor)
+    orchestrator = lambda_shards.LocalOrchestrator(handler=lambda event, context: None)
+    monkeypatch.setattr(lambda_function, "_orchestrator", orchestrator)
+    key = lambda_function.RAW_PREFIX + "suppliers.csv"
+    s3.put("bucket", key, raw_csv(7))
+    event = s3_event("bucket", key)
+    event["Records"][0]["s3"]["object"]["sequencer"] = "0A1"
+    
+    with patch("lambda_auth.get_valid_token", return_value="token"), \
+         patch("lambda_enrichment.EnrichmentProcessor._enrich_records") as mock_enrich:
+        first = lambda_function.handler(event, FakeContext())
+        # S3 redeliveries are new invocations, with their own request IDs
+        redelivery = FakeContext()
+        redelivery.aws_request_id = "redelivery-id"
+        retry = lambda_function.handler(event, redelivery)
+        event["Records"][0]["s3"]["object"]["sequencer"] = "0A2"
+        upload = lambda_function.handler(event, FakeContext())
+        orchestrator.wait()
+    
+    assert [r["statusCode"] for r in (first, retry, upload)] == [202, 200, 202]
+    assert "already started" in json.loads(retry["body"])["message"]
+    assert mock_enrich.call_count == 2
+    assert len(orchestrator.events) == 2
+
+def test_failed_first_invocation_is_resumed_by_retry(tmp_path, monkeypatch):
+    """A Lambda retry of an invocation that failed after claiming the run enriches the file"""
+    s3 = FakeS3(str(tmp_path / "s3"))
+    monkeypatch.setattr(lambda_function, "_s3_client", s3)
+    monkeypatch.setenv("ENRICHMENT_CHECKPOINT", "true")
+    monkeypatch.setattr(lambda_checkpoint, "_processor", one_window_processor)
+    orchestrator = lambda_shards.LocalOrchestrator(lambda_function.handler, FakeContext(), max_workers=1)
+    monkeypatch.setattr(lambda_function, "_orchestrator", orchestrator)
+    key = lambda_function.RAW_PREFIX + "suppliers.csv"
+    s3.put("bucket", key, raw_csv(4))
+    event = s3_event("bucket", key)
+    event["Records"][0]["s3"]["object"]["sequencer"] = "0A1"
+    
+    with patch("lambda_auth.get_valid_token", return_value="token"), \
+         patch("lambda_enrichment.EnrichmentProcessor._enrich_records",
+               side_effect=[RuntimeError("ZoomInfo unavailable"), None, None]) as mock_enrich:
+        with pytest.raises(lambda_function.EnrichmentError):
+            lambda_function.handler(event, FakeContext())
+        retry = lambda_function.handler(event, FakeContext())
+        continuations = orchestrator.wait()
+    
+    assert retry["statusCode"] == 202
+    assert [r["statusCode"] for r in continuations] == [200]
+    assert mock_enrich.call_count == 3
+    lines = s3.read("bucket", "SupplierOperations/dataEnrichment/enhanced/suppliers_enhanced.csv")
+    lines = lines.decode("utf-8-sig").splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == [f"Company {i}" for i in range(4)]
+
+def test_stale_claims_can_be_taken_over():
+    claim = {"finished": False, "owner": "request-id", "segments": 0, "expires_at": 0}
+    redelivery = FakeContext()
+    redelivery.aws_request_id = "redelivery-id"
+    
+    assert lambda_checkpoint.claim_is_stale(claim, FakeContext())
+    # Expired without progress or a continuation
+    assert lambda_checkpoint.claim_is_stale(claim, redelivery)
+    assert not lambda_checkpoint.claim_is_stale(dict(claim, expires_at=time.time() * 1000 + 60000), redelivery)
+    assert not lambda_checkpoint.claim_is_stale(dict(claim, segments=1), redelivery)
+    assert not lambda_checkpoint.claim_is_stale(dict(claim, finished=True), FakeContext())
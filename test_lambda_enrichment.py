@@ -49,8 +49,8 @@ def mock_auth():
 
 @pytest.fixture
 def mock_requests():
-    """Mock requests module"""
-    with patch('requests.post') as mock:
+    """Mock the pooled ZoomInfo session"""
+    with patch('requests.Session.post') as mock:
         yield mock
 
 def test_csv_to_json_conversion(sample_csv, output_csv, mock_auth):
@@ -174,6 +174,11 @@ def test_needs_contact_update(sample_csv, output_csv, mock_auth):
     updated_entry = processor._update_needs_contact(entry)
     assert updated_entry["needsContact"] == "No"
     
+    # Like the desktop rule, one contact field is enough
+    entry["phone"] = ""
+    updated_entry = processor._update_needs_contact(entry)
+    assert updated_entry["needsContact"] == "No"
+    
     # Test with no contact info
     entry["firstName"] = ""
     entry["lastName"] = ""
@@ -233,6 +238,111 @@ def test_full_process_with_enrichment(sample_csv, output_csv, mock_auth, mock_re
     assert record["Supplier Company"] == "Test Company"
     assert record["Needs New Contact"] in ["Yes", "No"]
 
+def test_process_streams_in_windows(tmp_path, output_csv, mock_auth, mock_requests):
+    """Test that rows are enriched and written in bounded windows, in input order"""
+    csv_path = tmp_path / "many_rows.csv"
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=["Supplier Company", "Site ID"])
+        writer.writeheader()
+        writer.writerows({"Supplier Company": f"Company {i}", "Site ID": str(i)} for i in range(5))
+    mock_requests.return_value = MagicMock(status_code=404, text="Not found")
+    
+    processor = EnrichmentProcessor(str(csv_path), output_csv, window_size=2, max_workers=3)
+    with patch.object(processor, '_enrich_records', wraps=processor._enrich_records) as spy:
+        processor.process()
+    
+    assert [len(c.args[0]) for c in spy.call_args_list] == [2, 2, 1]
+    assert processor.data == []
+    
+    with open(output_csv, 'r', encoding='utf-8-sig') as f:
+        data = list(csv.DictReader(f))
+    assert [row["Site ID"] for row in data] == ["0", "1", "2", "3", "4"]
+    assert all(row["Needs New Contact"] == "Yes" for row in data)
+    assert not any(c.args[0].endswith("/enrich/contact") for c in mock_requests.call_args_list)
+
+def test_process_stops_before_deadline_and_resumes(tmp_path, mock_auth, mock_requests):
+    """Test that a run short of time stops between windows and a second run skips the rows already written"""
+    csv_path = tmp_path / "many_rows.csv"
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=["Supplier Company", "Site ID"])
+        writer.writeheader()
+        writer.writerows({"Supplier Company": f"Company {i}", "Site ID": str(i)} for i in range(5))
+    mock_requests.return_value = MagicMock(status_code=404, text="Not found")
+    
+    first = EnrichmentProcessor(str(csv_path), str(tmp_path / "first.csv"), window_size=2,
+                                remaining_time=lambda: 1000, time_reserve_ms=1000)
+    first.process()
+    second = EnrichmentProcessor(str(csv_path), str(tmp_path / "second.csv"), window_size=2,
+                                 remaining_time=lambda: 300000, time_reserve_ms=1000,
+                                 skip_records=first.records_written)
+    second.process()
+    
+    assert (first.finished, first.records_written) == (False, 2)
+    assert (second.finished, second.records_written) == (True, 3)
+    site_ids = []
+    for name in ("first.csv", "second.csv"):
+        with open(tmp_path / name, 'r', encoding='utf-8-sig') as f:
+            site_ids += [row["Site ID"] for row in csv.DictReader(f)]
+    assert site_ids == ["0", "1", "2", "3", "4"]
+
+def test_duplicate_companies_enriched_once(tmp_path, output_csv, mock_auth, mock_requests):
+    """Test that rows of the same company share one company lookup across windows"""
+    csv_path = tmp_path / "sites.csv"
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=["Supplier Company", "Supplier Country", "Site ID"])
+        writer.writeheader()
+        writer.writerows(
+            {"Supplier Company": "Acme Inc" if i % 2 else "ACME", "Supplier Country": "US", "Site ID": str(i)}
+            for i in range(6)
+        )
+    company_response = MagicMock(status_code=200)
+    company_response.json.return_value = {
+        "success": True,
+        "data": {"result": [{"data": {"zi_c_company_id": "123", "zi_c_name": "Acme"}}]}
+    }
+    mock_requests.return_value = company_response
+    
+    processor = EnrichmentProcessor(str(csv_path), output_csv, window_size=4)
+    processor.process()
+    
+    company_calls = [c for c in mock_requests.call_args_list if c.args[0].endswith("/enrich/company")]
+    assert len(company_calls) == 1
+    assert processor.company_dedup.saved == 5
+    with open(output_csv, 'r', encoding='utf-8-sig') as f:
+        assert all(row["Zoominfo Company ID"] == "123" for row in csv.DictReader(f))
+
+def test_process_async_engine(sample_csv, tmp_path, mock_auth, mock_requests):
+    """Test that the async engine runs the same steps over one event loop and writes the same file"""
+    import asyncEnrich
+    
+    company = {"success": True, "data": {"result": [{"data": {
+        "zi_c_company_id": 42, "zi_c_naics6": "111110", "zi_c_name": "Test Company Inc"}}]}}
+    mock_requests.return_value = MagicMock(status_code=200, json=MagicMock(return_value=company))
+    threads_csv = str(tmp_path / "threads.csv")
+    EnrichmentProcessor(sample_csv, threads_csv).process()
+    urls = []
+    
+    async def fake_post(self, url, **kwargs):
+        urls.append(url)
+        return asyncEnrich.AsyncResponse(200, json.dumps(company))
+    
+    async_csv = str(tmp_path / "async.csv")
+    processor = EnrichmentProcessor(sample_csv, async_csv, engine="async", concurrency=5)
+    with patch('asyncEnrich.AsyncZoomInfoClient.post', fake_post):
+        processor.process()
+    
+    with open(threads_csv, 'r', encoding='utf-8-sig') as f:
+        expected = f.read()
+    with open(async_csv, 'r', encoding='utf-8-sig') as f:
+        assert f.read() == expected
+    assert urls == [c.args[0] for c in mock_requests.call_args_list] == [
+        "https://api.zoominfo.com/enrich/company"
+    ]
+    with open(async_csv, 'r', encoding='utf-8-sig') as f:
+        data = list(csv.DictReader(f))
+    assert data[0]["Zoominfo Company ID"] == "42"
+    assert data[0]["Enrichment Status"] == "Success"
+
 def test_error_handling(sample_csv, output_csv, mock_auth, mock_requests):
     """Test error handling during processing"""
     # Mock API error
@@ -284,4 +394,58 @@ def test_aws_secret_auth():
     
     # Test authentication
     token = authenticate()
-    assert token is not None and len(token) > 0 
\ No newline at end of file
+    assert token is not None and len(token) > 0
+
+class FakeSecretsManager:
+    """Local stand-in for the Secrets Manager client"""
+    def __init__(self, secret):
+        self.version = 1
+        self.secret = secret
+        self.calls = []
+    
+    def rotate(self, secret):
+        self.version += 1
+        self.secret = secret
+    
+    def get_secret_value(self, SecretId):
+        self.calls.append("get_secret_value")
+        return {"SecretString": json.dumps(self.secret), "VersionId": f"v{self.version}"}
+    
+    def describe_secret(self, SecretId):
+        self.calls.append("describe_secret")
+        return {"VersionIdsToStages": {f"v{self.version}": ["AWSCURRENT"]}}
+
+def test_secret_cache_reuses_value_until_rotation(monkeypatch):
+    """Test that the secret is fetched once and re-read only after a rotation"""
+    import lambda_auth
+    
+    secrets = FakeSecretsManager({"username": "zi-user", "password": "one"})
+    cache = lambda_auth.SecretCache("zoominfo/credentials-dev", client=secrets, ttl=0)
+    monkeypatch.setattr(lambda_auth, "secret_cache", cache)
+    
+    assert lambda_auth.get_zoominfo_credentials() == ("zi-user", "one")
+    assert lambda_auth.get_zoominfo_credentials() == ("zi-user", "one")
+    assert secrets.calls == ["get_secret_value", "describe_secret"]
+    
+    secrets.rotate({"username": "zi-user", "password": "two"})
+    assert lambda_auth.get_zoominfo_credentials() == ("zi-user", "two")
+    assert secrets.calls[-2:] == ["describe_secret", "get_secret_value"]
+
+def test_authenticate_rereads_secret_after_rejection(monkeypatch):
+    """Test that rejected cached credentials are re-read once before failing"""
+    import lambda_auth
+    
+    secrets = FakeSecretsManager({"username": "zi-user", "password": "old"})
+    cache = lambda_auth.SecretCache("zoominfo/credentials-dev", client=secrets, ttl=3600)
+    monkeypatch.setattr(lambda_auth, "secret_cache", cache)
+    lambda_auth.get_zoominfo_credentials()
+    secrets.rotate({"username": "zi-user", "password": "new"})
+    
+    def fake_auth(url, data=None, **kwargs):
+        if json.loads(data)["password"] == "new":
+            return MagicMock(status_code=200, json=MagicMock(return_value={"jwt": "jwt-token"}))
+        return MagicMock(status_code=401, text="Unauthorized")
+    
+    with patch('requests.Session.post', side_effect=fake_auth) as mock_post:
+        assert lambda_auth.authenticate() == "jwt-token"
+    assert mock_post.call_count == 2
@@ -0,0 +1,182 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from unittest.mock import patch
+import pytest
+
+os.environ.setdefault("POWERTOOLS_METRICS_NAMESPACE", "DataEnrichmentTest")
+
+import lambda_function
+
+class FakeBody(io.BytesIO):
+    """get_object body that records how it is read"""
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+    
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+class FakeS3:
+    """Local stand-in for the S3 client, backed by a directory"""
+    def __init__(self, root):
+        self.root = root
+        self.uploads = {}
+        self.aborted = []
+        self.calls = []
+    
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, key)
+    
+    def put(self, bucket, key, body):
+        # Written aside and renamed, so concurrent readers never see a partial object
+        path = self._path(bucket, key)
+        staging = os.path.join(self.root, ".staging")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.makedirs(staging, exist_ok=True)
+        temp_path = os.path.join(staging, f"{threading.get_ident()}-{os.path.basename(path)}")
+        with open(temp_path, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, path)
+    
+    def read(self, bucket, key):
+        with open(self._path(bucket, key), "rb") as f:
+            return f.read()
+    
+    def download_file(self, bucket, key, filename):
+        shutil.copyfile(self._path(bucket, key), filename)
+    
+    def upload_file(self, filename, bucket, key):
+        with open(filename, "rb") as f:
+            self.put(bucket, key, f.read())
+    
+    def get_object(self, Bucket, Key):
+        self.calls.append("get_object")
+        self.body = FakeBody(self.read(Bucket, Key))
+        return {"Body": self.body}
+    
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append("put_object")
+        self.put(Bucket, Key, Body)
+    
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+    
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+    
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        parts = self.uploads.pop(UploadId)
+        assert [p["PartNumber"] for p in MultipartUpload["Parts"]] == sorted(parts)
+        self.put(Bucket, Key, b"".join(parts[n] for n in sorted(parts)))
+    
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId)
+    
+    def copy_object(self, Bucket, Key, CopySource):
+        self.calls.append("copy_object")
+        self.put(Bucket, Key, self.read(CopySource["Bucket"], CopySource["Key"]))
+    
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": os.path.getsize(self._path(Bucket, Key))}
+    
+    def list_keys(self, bucket, prefix):
+        root = os.path.join(self.root, bucket)
+        keys = []
+        for directory, _, files in os.walk(root):
+            for name in files:
+                key = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+    
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return self
+    
+    def paginate(self, Bucket, Prefix):
+        keys = self.list_keys(Bucket, Prefix)
+        return [{"KeyCount": len(keys), "Contents": [{"Key": key} for key in keys]}]
+
+class FakeContext:
+    function_name = "data-enrichment"
+    function_version = "$LATEST"
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:data-enrichment"
+    memory_limit_in_mb = 512
+    aws_request_id = "request-id"
+    log_group_name = "/aws/lambda/data-enrichment"
+    log_stream_name = "stream"
+    
+    def get_remaining_time_in_millis(self):
+        return 300000
+
+def s3_event(bucket, key):
+    return {"Records": [{"s3": {"bucket": {"name": bucket}, "object": {"key": key}}}]}
+
+def test_init_skips_tracing_and_unused_packages():
+    """With tracing disabled, init imports neither the X-Ray SDK nor pandas or pydantic"""
+    code = (
+        "import sys, lambda_function; "
+        "print(sorted(m for m in ('aws_xray_sdk', 'pandas', 'pydantic') if m in sys.modules))"
+    )
+    env = dict(os.environ, POWERTOOLS_TRACE_DISABLED="true")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    
+    assert result.stdout.strip() == "[]"
+
+def test_parse_s3_event_decodes_key():
+    assert lambda_function.parse_s3_event(s3_event("bucket", "raw/My+File%281%29.csv")) == (
+        "bucket", "raw/My File(1).csv"
+    )
+
+def test_handler_reuses_module_s3_client(tmp_path, monkeypatch):
+    """Every invocation uses the S3 client created at init"""
+    s3 = FakeS3(str(tmp_path / "s3"))
+    monkeypatch.setattr(lambda_function, "_s3_client", s3)
+    monkeypatch.setattr(lambda_function, "TEMP_DIR", str(tmp_path))
+    key = lambda_function.RAW_PREFIX + "suppliers.csv"
+    s3.put("bucket", key, b"Supplier Company,Supplier First Name\r\nAcme,Ann\r\n")
+    
+    with patch("boto3.client") as mock_client, \
+         patch("lambda_enrichment.EnrichmentProcessor.process",
+               lambda self: shutil.copyfile(self.input_path, self.output_path)):
+        for _ in range(2):
+            result = lambda_function.handler(s3_event("bucket", key), FakeContext())
+    
+    mock_client.assert_not_called()
+    body = json.loads(result["body"])
+    assert body["output_file"] == lambda_function.ENHANCED_PREFIX + "suppliers_enhanced.csv"
+    assert s3.read("bucket", body["output_file"]).startswith(b"Supplier Company")
+
+def test_handler_streams_without_tmp(tmp_path, monkeypatch):
+    """In streaming mode the file is read from get_object and written with put/multipart, not via /tmp"""
+    s3 = FakeS3(str(tmp_path / "s3"))
+    monkeypatch.setattr(lambda_function, "_s3_client", s3)
+    monkeypatch.setattr(lambda_function, "TEMP_DIR", str(tmp_path / "missing"))
+    monkeypatch.setenv("ENRICHMENT_S3_STREAMING", "true")
+    monkeypatch.setattr(s3, "download_file", None)
+    key = lambda_function.RAW_PREFIX + "suppliers.csv"
+    s3.put("bucket", key, "\ufeffSupplier Company,Supplier First Name\r\n  Acmé ,Ann\r\nBeta,\r\n".encode("utf-8"))
+    
+    with patch("lambda_auth.get_valid_token", return_value="token"), \
+         patch("lambda_enrichment.EnrichmentProcessor._enrich_records") as mock_enrich:
+        result = lambda_function.handler(s3_event("bucket", key), FakeContext())
+    
+    assert [len(c.args[0]) for c in mock_enrich.call_args_list] == [2]
+    assert s3.calls == ["get_object", "put_object"]
+    output = s3.read("bucket", json.loads(result["body"])["output_file"]).decode("utf-8-sig")
+    lines = output.splitlines()
+    assert lines[0].startswith("Supplier Company,")
+    assert lines[1].startswith("Acmé,Ann")
+    assert not os.path.exists(tmp_path / "missing")
@@ -0,0 +1,69 @@
+import pytest
+import lambda_s3
+from test_lambda_function import FakeS3
+
+PART = lambda_s3.MIN_PART_SIZE
+
+def test_small_output_uses_single_put(tmp_path):
+    s3 = FakeS3(str(tmp_path))
+    
+    with lambda_s3.open_s3_text_writer(s3, "bucket", "out.csv") as f:
+        f.write("a,b\r\n1,2\r\n")
+    
+    assert s3.calls == ["put_object"]
+    assert s3.read("bucket", "out.csv") == "\ufeffa,b\r\n1,2\r\n".encode("utf-8")
+
+def test_large_output_uploads_parts_while_writing(tmp_path):
+    """Full parts are sent before the writer is closed; the object is the parts in order"""
+    s3 = FakeS3(str(tmp_path))
+    line = "x" * 1023 + "\n"
+    
+    with lambda_s3.open_s3_text_writer(s3, "bucket", "out.csv", part_size=PART) as f:
+        # More than a part, beyond what the text and byte buffers hold
+        for _ in range(PART // 1024 + 32):
+            f.write(line)
+        assert s3.calls == ["create_multipart_upload"]
+        for _ in range(PART // 1024):
+            f.write(line)
+    
+    assert s3.calls == ["create_multipart_upload", "complete_multipart_upload"]
+    data = s3.read("bucket", "out.csv")
+    assert data == b"\xef\xbb\xbf" + line.encode() * (2 * (PART // 1024) + 32)
+
+def test_failure_aborts_multipart_upload(tmp_path):
+    s3 = FakeS3(str(tmp_path))
+    
+    with pytest.raises(RuntimeError):
+        with lambda_s3.open_s3_text_writer(s3, "bucket", "out.csv", part_size=PART) as f:
+            f.write("x" * (PART + 1))
+            f.flush()
+            raise RuntimeError("enrichment failed")
+    
+    assert s3.aborted == ["upload-1"]
+    assert s3.uploads == {}
+    assert not (tmp_path / "bucket" / "out.csv").exists()
+
+def test_reader_pulls_body_in_chunks(tmp_path):
+    s3 = FakeS3(str(tmp_path))
+    s3.put("bucket", "in.csv", ("\ufeffh\r\n" + "row\r\n" * 500000).encode("utf-8"))
+    
+    with lambda_s3.open_s3_text_reader(s3, "bucket", "in.csv") as f:
+        assert f.readline() == "h\r\n"
+        assert s3.body.reads == 1
+        assert sum(1 for _ in f) == 500000
+    
+    assert s3.body.reads > 2 and s3.body.closed
+
+def test_round_trip_with_moto():
+    """The same reader and writer against moto's S3, when it is installed"""
+    moto = pytest.importorskip("moto")
+    import boto3
+    
+    mock = getattr(moto, "mock_aws", None) or moto.mock_s3
+    with mock():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="bucket")
+        with lambda_s3.open_s3_text_writer(s3, "bucket", "out.csv", part_size=PART) as f:
+            f.write("y" * (PART + 100))
+        with lambda_s3.open_s3_text_reader(s3, "bucket", "out.csv") as f:
+            assert f.read() == "y" * (PART + 100)
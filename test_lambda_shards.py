@@ -0,0 +1,83 @@
+import json
+import shutil
+import pytest
+from unittest.mock import patch
+# Sets the metrics namespace before lambda_function is first imported
+from test_lambda_function import FakeContext, FakeS3, s3_event
+import lambda_function
+import lambda_shards
+
+def raw_csv(rows):
+    lines = ["Supplier Company,Supplier First Name"] + [f"Company {i},Name {i}" for i in range(rows)]
+    return ("\ufeff" + "\r\n".join(lines) + "\r\n").encode("utf-8")
+
+def test_split_writes_shards_with_header(tmp_path):
+    s3 = FakeS3(str(tmp_path))
+    s3.put("bucket", "raw/big.csv", raw_csv(5))
+    
+    assert lambda_shards.split_into_shards(s3, "bucket", "raw/big.csv", "work/", shard_rows=2) == 3
+    
+    shards = [s3.read("bucket", lambda_shards.shard_key("work/", i)).decode("utf-8-sig") for i in range(3)]
+    assert all(shard.startswith("Supplier Company,Supplier First Name\r\n") for shard in shards)
+    assert [shard.count("\r\n") for shard in shards] == [3, 3, 2]
+
+def test_last_shard_to_finish_merges_in_row_order(tmp_path):
+    """Shards finish out of order; only the last one merges, and the output keeps the input order"""
+    s3 = FakeS3(str(tmp_path))
+    s3.put("bucket", "raw/big.csv", raw_csv(7))
+    orchestrator = lambda_shards.LocalOrchestrator(handler=None)
+    manifest = lambda_shards.coordinate(
+        s3, "bucket", "raw/big.csv", "enhanced/big_enhanced.csv", orchestrator, "work/",
+        run_id="run", shard_rows=3
+    )
+    copy = lambda input_file, output_file: shutil.copyfileobj(input_file, output_file)
+    
+    assert manifest["prefix"] == "work/big/run/"
+    assert [event["shard"] for event in orchestrator.events] == [0, 1, 2]
+    merged = [lambda_shards.run_shard(s3, orchestrator.events[i], copy)["merged"] for i in (2, 0, 1)]
+    
+    assert merged == [False, False, True]
+    assert s3.read("bucket", "enhanced/big_enhanced.csv") == raw_csv(7)
+
+def test_handler_fans_out_large_file(tmp_path, monkeypatch):
+    """A large raw file is split, its shards are enriched by parallel invocations and merged"""
+    s3 = FakeS3(str(tmp_path / "s3"))
+    monkeypatch.setattr(lambda_function, "_s3_client", s3)
+    monkeypatch.setattr(lambda_shards, "SHARD_THRESHOLD_BYTES", 1)
+    monkeypatch.setattr(lambda_shards, "SHARD_ROWS", 4)
+    orchestrator = lambda_shards.LocalOrchestrator(lambda_function.handler, FakeContext())
+    monkeypatch.setattr(lambda_function, "_orchestrator", orchestrator)
+    key = lambda_function.RAW_PREFIX + "suppliers.csv"
+    s3.put("bucket", key, raw_csv(10))
+    
+    with patch("lambda_auth.get_valid_token", return_value="token"), \
+         patch("lambda_enrichment.EnrichmentProcessor._enrich_records") as mock_enrich:
+        result = lambda_function.handler(s3_event("bucket", key), FakeContext())
+        shard_results = orchestrator.wait()
+    
+    body = json.loads(result["body"])
+    assert result["statusCode"] == 202 and body["shards"] == 3
+    assert sorted(len(c.args[0]) for c in mock_enrich.call_args_list) == [2, 4, 4]
+    assert sum(json.loads(r["body"])["merged"] for r in shard_results) >= 1
+    lines = s3.read("bucket", body["output_file"]).decode("utf-8-sig").splitlines()
+    assert len(lines) == 11
+    assert lines[0].startswith("Supplier Company,")
+    assert [line.split(",")[0] for line in lines[1:]] == [f"Company {i}" for i in range(10)]
+
+def test_duplicate_coordination_is_skipped(tmp_path):
+    """A redelivered event skips a coordinated run; a retry of a failed coordinator resubmits without re-splitting"""
+    s3 = FakeS3(str(tmp_path))
+    s3.put("bucket", "raw/big.csv", raw_csv(5))
+    orchestrator = lambda_shards.LocalOrchestrator(handler=None)
+    args = (s3, "bucket", "raw/big.csv", "enhanced/big_enhanced.csv", orchestrator, "work/")
+    
+    with patch.object(orchestrator, "submit", side_effect=[None, RuntimeError("throttled")]):
+        with pytest.raises(RuntimeError):
+            lambda_shards.coordinate(*args, run_id="0A1", shard_rows=2, request_id="first")
+    
+    assert lambda_shards.coordinate(*args, run_id="0A1", shard_rows=2, request_id="redelivery") is None
+    with patch.object(lambda_shards, "split_into_shards") as mock_split:
+        manifest = lambda_shards.coordinate(*args, run_id="0A1", shard_rows=2, request_id="first")
+    mock_split.assert_not_called()
+    assert manifest["submitted"] and [event["shard"] for event in orchestrator.events] == [0, 1, 2]
+    assert lambda_shards.coordinate(*args, run_id="0A1", shard_rows=2, request_id="first") is None
@@ -0,0 +1,90 @@
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+import pytest
+import main
+from test_enrichment_pipeline import fake_zoominfo, read_output, sample_csv
+
+def test_import_does_not_load_gui_or_pipeline():
+    """Importing the entry point loads neither PySimpleGUI nor the enrichment modules"""
+    code = (
+        "import sys, main; "
+        "print(sorted(m for m in ('PySimpleGUI', 'enrichmentPipeline', 'requests') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+def test_credentials_from_file_then_environment(tmp_path, monkeypatch):
+    credentials_file = tmp_path / "zoominfo.json"
+    credentials_file.write_text(json.dumps({"username": "file-user", "password": "secret"}))
+    monkeypatch.setenv("ZOOMINFO_USERNAME", "env-user")
+    monkeypatch.setenv("ZOOMINFO_PASSWORD", "env-pass")
+
+    assert main.load_credentials(str(credentials_file)) == ("file-user", "secret")
+    assert main.load_credentials() == ("env-user", "env-pass")
+
+    monkeypatch.delenv("ZOOMINFO_PASSWORD")
+    assert main.load_credentials() is None
+
+def test_headless_run_authenticates_once(sample_csv, tmp_path, monkeypatch):
+    """A headless run writes to --output, runs the selected stages and logs in only once"""
+    monkeypatch.setenv("ZOOMINFO_USERNAME", "cli-user")
+    monkeypatch.setenv("ZOOMINFO_PASSWORD", "pass")
+    output_csv = str(tmp_path / "out.csv")
+
+    with patch('requests.Session.post', side_effect=fake_zoominfo), \
+         patch('auth.authenticate', return_value="token") as mock_auth, \
+         patch('main.select_file') as mock_select, \
+         patch('apiPlanner.dry_run') as mock_dry_run:
+        main.main([
+            sample_csv, "--output", output_csv, "--cache-path", "",
+            "--stages", "remove_spaces,company_enrich,sector_and_industry",
+        ])
+
+    assert mock_auth.call_count == 1
+    # The estimate is only planned for --dry-run
+    mock_dry_run.assert_not_called()
+    mock_select.assert_not_called()
+    rows = read_output(output_csv)
+    assert rows[0]["Supplier Company"] == "Test Company"
+    assert rows[0]["Sector Title"] == "Agriculture, Forestry, Fishing and Hunting"
+    # needs_contact was not selected
+    assert rows[1]["Needs New Contact"] == ""
+
+def test_unknown_stage_exits_before_login(sample_csv):
+    with patch('auth.authenticate') as mock_auth, pytest.raises(SystemExit):
+        main.main([sample_csv, "--stages", "remove_spaces,typo", "--cache-path", ""])
+
+    mock_auth.assert_not_called()
+
+def test_checkpoint_is_opt_in(sample_csv):
+    assert main.parse_args([sample_csv]).checkpoint is False
+    assert main.parse_args([sample_csv, "--checkpoint"]).checkpoint is True
+
+@pytest.mark.parametrize("value, expected", [("0", False), ("false", False), ("no", False), ("", False),
+                                             ("1", True), ("TRUE", True), ("yes", True)])
+def test_environment_flags(sample_csv, monkeypatch, value, expected):
+    monkeypatch.setenv("ENRICHMENT_DRY_RUN", value)
+    monkeypatch.setenv("ENRICHMENT_FRAME", value)
+
+    args = main.parse_args([sample_csv])
+    assert args.dry_run is expected
+    assert args.frame is expected
+
+def test_workers_from_flag_or_environment(sample_csv, monkeypatch):
+    assert main.parse_args([sample_csv]).workers == 1
+    monkeypatch.setenv("ENRICHMENT_WORKERS", "8")
+    assert main.parse_args([sample_csv]).workers == 8
+    assert main.parse_args([sample_csv, "--workers", "4"]).workers == 4
+
+def test_workers_passed_to_pipeline(sample_csv, monkeypatch):
+    monkeypatch.setenv("ZOOMINFO_USERNAME", "cli-user")
+    monkeypatch.setenv("ZOOMINFO_PASSWORD", "pass")
+
+    with patch('enrichmentPipeline.EnrichmentPipeline') as mock_pipeline, \
+         patch('auth.authenticate', return_value="token"):
+        main.main([sample_csv, "--workers", "4", "--cache-path", ""])
+
+    assert mock_pipeline.call_args.kwargs["workers"] == 4
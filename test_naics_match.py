@@ -0,0 +1,43 @@
+import naicsMatch
+
+def test_sector_and_industry_titles():
+    records = [
+        {"zi_c_naics6": "541511", "sectorTitle": "", "primaryIndustry": ""},
+        {"zi_c_naics6": "111110", "sectorTitle": "", "primaryIndustry": ""},
+        {"zi_c_naics6": "999999", "sectorTitle": "", "primaryIndustry": ""},
+        {"zi_c_naics6": "", "sectorTitle": "", "primaryIndustry": ""},
+    ]
+
+    naicsMatch.get_sector_and_industry_records(records)
+
+    assert [(r["sectorTitle"], r["primaryIndustry"]) for r in records] == [
+        ("Professional, Scientific, and Technical Services", "Custom Computer Programming Services "),
+        ("Agriculture, Forestry, Fishing and Hunting", "Soybean Farming"),
+        ("Unknown", "Unknown"),
+        ("", ""),
+    ]
+
+def test_table_is_sorted_and_loaded_once():
+    codes = [int(digits) for digits, _ in naicsMatch.iter_naics_file()]
+
+    assert codes == sorted(codes) and len(codes) == len(set(codes))
+    assert naicsMatch.load_prefix_index() is naicsMatch.load_prefix_index()
+
+def test_unknown_codes_fall_back_to_known_prefix():
+    services = "Professional, Scientific, and Technical Services"
+
+    # 541599 is not in the table; its 2-digit sector is the most specific known title
+    assert naicsMatch.resolve_naics("541599") == (services, services)
+    assert naicsMatch.resolve_naics(" 111110.0 ") == ("Agriculture, Forestry, Fishing and Hunting", "Soybean Farming")
+    assert naicsMatch.resolve_naics(541511) == naicsMatch.resolve_naics("541511")
+    for value in ("N/A", "99", "1234567", "54-15"):
+        assert naicsMatch.resolve_naics(value) == ("Unknown", "Unknown")
+
+def test_repeated_codes_are_memoized():
+    naicsMatch.resolve_naics.cache_clear()
+    records = [{"zi_c_naics6": "541511", "sectorTitle": "", "primaryIndustry": ""} for _ in range(100)]
+
+    naicsMatch.get_sector_and_industry_records(records)
+
+    info = naicsMatch.resolve_naics.cache_info()
+    assert (info.misses, info.hits) == (1, 99)
@@ -0,0 +1,82 @@
+import time
+from unittest.mock import patch, MagicMock
+import pytest
+import companyEnrich
+import contactSearch
+import negativeCache
+from enrichmentRecord import EnrichmentRecord, HEADER_MAPPING
+
+def no_match_response(url, json=None, **kwargs):
+    response = MagicMock(status_code=200)
+    if "matchCompanyInput" in json:
+        response.json.return_value = {"success": True, "data": {"result": [
+            {"matchStatus": "NO_MATCH", "data": {}} for _ in json["matchCompanyInput"]
+        ]}}
+    else:
+        response.json.return_value = {"data": []}
+    return response
+
+@pytest.fixture
+def cache_path(tmp_path):
+    path = str(tmp_path / "zoominfo.sqlite")
+    negativeCache.configure(path)
+    yield path
+    negativeCache.configure(None)
+
+def make_company(name):
+    row = dict.fromkeys(HEADER_MAPPING, "")
+    row["Supplier Company"] = name
+    return EnrichmentRecord.from_row(row)
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = negativeCache.BloomFilter(capacity=1000)
+    for number in range(1000):
+        bloom.add(f"item-{number}")
+
+    assert all(f"item-{number}" in bloom for number in range(1000))
+    false_positives = sum(f"other-{number}" in bloom for number in range(10000))
+    assert false_positives < 300
+
+def test_unmatched_company_skipped_in_later_runs(cache_path):
+    """A company that matched neither strictly nor loosely is not looked up again"""
+    with patch('requests.Session.post', side_effect=no_match_response) as mock_post:
+        companyEnrich.company_enrich_records([make_company("Nobody Inc")], "token", time.time(), "user", "pass")
+    assert mock_post.call_count == 2
+
+    # A later run reopens the same file
+    negativeCache.configure(cache_path)
+    data = [make_company("NOBODY"), make_company("Somebody")]
+    with patch('requests.Session.post', side_effect=no_match_response) as mock_post:
+        companyEnrich.company_enrich_records(data, "token", time.time(), "user", "pass")
+
+    sent = [c.kwargs["json"]["matchCompanyInput"][0]["zi_c_name"] for c in mock_post.call_args_list]
+    assert sent == ["Somebody", "Somebody"]
+    assert data[0]["company_match_criteria"] == "None"
+    assert negativeCache.get_cache().skipped == 1
+
+def test_contact_cascade_skipped_until_expiry(cache_path):
+    """A location with no contact skips the whole search cascade while the entry is fresh"""
+    def rows():
+        return [{"needsContact": "Yes", "zi_c_location_id": "L1", "zi_c_company_id": "C1"}]
+
+    with patch('requests.Session.post', side_effect=no_match_response) as mock_post:
+        contactSearch.contact_search_records(rows(), "token", time.time(), "user", "pass")
+        assert mock_post.call_count == 4
+
+        data = rows()
+        contactSearch.contact_search_records(data, "token", time.time(), "user", "pass")
+        assert mock_post.call_count == 4
+        assert data[0]["newContactFound"] == "No"
+
+        negativeCache.get_cache().ttl = 0
+        contactSearch.contact_search_records(rows(), "token", time.time(), "user", "pass")
+        assert mock_post.call_count == 8
+
+def test_failed_search_not_recorded(cache_path):
+    response = MagicMock(status_code=500, text="Server error")
+    with patch('requests.Session.post', return_value=response):
+        contactSearch.contact_search_records(
+            [{"needsContact": "Yes", "zi_c_company_id": "C1"}], "token", time.time(), "user", "pass"
+        )
+
+    assert not contactSearch.is_known_no_match({"zi_c_company_id": "C1"})
@@ -0,0 +1,48 @@
+import time
+from unittest.mock import patch, MagicMock
+import rateLimiter
+import zoominfoClient
+
+def test_throttled_request_retried_after_retry_after():
+    """A 429 slows the limiter, waits out Retry-After and the row is not lost"""
+    limiter = rateLimiter.AdaptiveRateLimiter(rate=10, max_rate=20)
+    client = zoominfoClient.ZoomInfoClient(rate_limiter=limiter)
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+    ok = MagicMock(status_code=200)
+
+    with patch.object(client.session, 'post', side_effect=[throttled, ok]) as mock_post, \
+         patch('rateLimiter.time.sleep') as mock_sleep:
+        response = client.post("/enrich/contact", jwt_token="token", json={})
+
+    assert response is ok
+    assert mock_post.call_count == 2
+    assert limiter.throttled == 1
+    assert limiter.rate < 10
+    assert mock_sleep.call_args.args[0] >= 1.9
+
+def test_rate_adapts_with_aimd():
+    """Successes raise the rate additively; a burst of 429s halves it once"""
+    limiter = rateLimiter.AdaptiveRateLimiter(rate=10, max_rate=12)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 12
+
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.rate == 6
+
+def test_bucket_spaces_requests_at_the_rate():
+    """Once the burst is spent, each reservation waits one interval longer"""
+    limiter = rateLimiter.AdaptiveRateLimiter(rate=10, burst=1)
+    delays = [limiter.reserve() for _ in range(4)]
+
+    assert delays[0] == 0
+    assert [round(delay, 1) for delay in delays[1:]] == [0.1, 0.2, 0.3]
+
+def test_parse_retry_after_date():
+    """Retry-After may be an HTTP date instead of seconds"""
+    import email.utils
+    header = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+    assert 28 <= rateLimiter.parse_retry_after(header) <= 30
+    assert rateLimiter.parse_retry_after("soon") is None
@@ -0,0 +1,131 @@
+import json
+from unittest.mock import patch, MagicMock
+import pytest
+import responseCache
+import zoominfoClient
+from responseCache import ResponseCache
+
+def api_response(body, status_code=200):
+    response = MagicMock(status_code=status_code, text=json.dumps(body))
+    response.json.return_value = body
+    return response
+
+def fake_company(url, json=None, **kwargs):
+    return api_response({"success": True, "data": {"result": [
+        {"data": {"zi_c_name": match_input["companyName"].upper()}} for match_input in json["matchCompanyInput"]
+    ]}})
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache" / "zoominfo.sqlite"))
+    yield cache
+    cache.close()
+
+def test_search_served_from_cache_until_expiry(cache):
+    """A repeated request is answered from disk, regardless of key order and case, until its TTL"""
+    client = zoominfoClient.ZoomInfoClient(cache=cache)
+    body = {"data": [{"id": "P1"}]}
+
+    with patch('requests.Session.post', return_value=api_response(body)) as mock_post:
+        first = client.post("https://api.zoominfo.com/search/contact", json={"companyId": "1", "rpp": 1})
+        second = client.post("/search/contact", json={"rpp": 1, "companyId": " 1 "})
+        # Auth and other endpoints are never cached
+        client.post("/authenticate", json={"username": "u"})
+        client.post("/authenticate", json={"username": "u"})
+
+    assert mock_post.call_count == 3
+    assert first.json() == second.json() == body
+    assert isinstance(second, responseCache.CachedResponse)
+
+    cache.ttls["/search/contact"] = 0
+    with patch('requests.Session.post', return_value=api_response(body)) as mock_post:
+        client.post("/search/contact", json={"companyId": "1", "rpp": 1})
+    assert mock_post.call_count == 1
+    assert cache.report() == "Response cache: /search/contact 1 hits / 2 misses."
+
+def test_batch_cached_per_input(cache):
+    """Only the inputs without a cached answer are sent, and results keep input order"""
+    client = zoominfoClient.ZoomInfoClient(cache=cache)
+    url = "https://api.zoominfo.com/enrich/company"
+    fields = ["zi_c_name"]
+
+    with patch('requests.Session.post', side_effect=fake_company):
+        client.post(url, json={"matchCompanyInput": [{"companyName": "a"}, {"companyName": "b"}], "outputFields": fields})
+
+    with patch('requests.Session.post', side_effect=fake_company) as mock_post:
+        response = client.post(url, json={
+            "matchCompanyInput": [{"companyName": "b"}, {"companyName": "c"}, {"companyName": "a"}],
+            "outputFields": fields,
+        })
+
+    assert mock_post.call_args.kwargs["json"]["matchCompanyInput"] == [{"companyName": "c"}]
+    results = response.json()["data"]["result"]
+    assert [result["data"]["zi_c_name"] for result in results] == ["B", "C", "A"]
+
+    # The cache is persistent: a new instance on the same file answers without the API
+    reopened = ResponseCache(cache.path)
+    with patch('requests.Session.post', side_effect=fake_company) as mock_post:
+        zoominfoClient.ZoomInfoClient(cache=reopened).post(url, json={
+            "matchCompanyInput": [{"companyName": "C"}], "outputFields": fields,
+        })
+    reopened.close()
+    assert mock_post.call_count == 0
+
+def test_failed_responses_not_cached(cache):
+    client = zoominfoClient.ZoomInfoClient(cache=cache)
+    payload = {"matchCompanyInput": [{"companyName": "a"}], "outputFields": ["zi_c_name"]}
+
+    with patch('requests.Session.post', side_effect=[
+        api_response({"error": "bad"}, status_code=500),
+        api_response({"success": False}),
+        api_response({"success": True, "data": {"result": [{"data": {}}]}}),
+    ]) as mock_post:
+        for _ in range(4):
+            client.post("/enrich/company", json=payload)
+
+    assert mock_post.call_count == 3
+
+def test_least_recently_used_entries_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "small.sqlite"), max_entries=10)
+    for number in range(10):
+        cache.put("/search/contact", {"companyId": number}, {"data": []})
+    # Touch entry 0, so entry 1 is the least recently used
+    assert cache.get("/search/contact", {"companyId": 0}) == {"data": []}
+    cache.put("/search/contact", {"companyId": 10}, {"data": []})
+
+    assert cache.get("/search/contact", {"companyId": 0}) is not None
+    assert cache.get("/search/contact", {"companyId": 1}) is None
+    assert cache.get("/search/contact", {"companyId": 10}) is not None
+    cache.close()
+
+def test_async_client_uses_cache_off_the_event_loop(cache):
+    """The SQLite lookups and writes of the async client do not run on the event loop thread"""
+    import asyncio
+    import threading
+    import asyncEnrich
+
+    threads = []
+    get, put = cache.get, cache.put
+
+    def record_thread(function):
+        def wrapper(*args):
+            threads.append(threading.get_ident())
+            return function(*args)
+        return wrapper
+
+    async def fake_send(self, url, jwt_token, payload):
+        return asyncEnrich.AsyncResponse(200, json.dumps({"data": [{"id": "P1"}]}))
+
+    async def run():
+        client = asyncEnrich.AsyncZoomInfoClient(cache=cache)
+        await client.post("/search/contact", json={"companyId": "1", "rpp": 1})
+        second = await client.post("/search/contact", json={"companyId": "1", "rpp": 1})
+        return threading.get_ident(), second
+
+    with patch.object(cache, 'get', record_thread(get)), \
+         patch.object(cache, 'put', record_thread(put)), \
+         patch('asyncEnrich.AsyncZoomInfoClient._send', fake_send):
+        loop_thread, second = asyncio.run(run())
+
+    assert len(threads) == 3 and loop_thread not in threads
+    assert second.json() == {"data": [{"id": "P1"}]}
@@ -0,0 +1,68 @@
+import base64
+import json
+import threading
+import time
+from unittest.mock import patch, MagicMock
+import tokenManager
+import workerPool
+import zoominfoClient
+
+def make_jwt(exp):
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{claims}.signature"
+
+def test_expiry_read_from_exp_claim():
+    """Tokens are cached until shortly before their own exp claim"""
+    token = make_jwt(time.time() + 3600)
+    fetch = MagicMock(return_value=token)
+    manager = tokenManager.TokenManager(fetch)
+
+    assert [manager.get_token() for _ in range(5)] == [token] * 5
+    assert fetch.call_count == 1
+    assert tokenManager.decode_expiry("not-a-jwt") is None
+
+    manager.set_token(make_jwt(time.time() + 60))
+    assert manager.needs_refresh()
+
+def test_concurrent_callers_share_one_refresh():
+    """Workers that find the token expired wait for a single in-flight refresh"""
+    barrier = threading.Barrier(8)
+    fetch = MagicMock(side_effect=lambda: time.sleep(0.05) or make_jwt(time.time() + 3600))
+    manager = tokenManager.TokenManager(fetch)
+
+    def use_token(_):
+        barrier.wait()
+        return manager.get_token()
+
+    tokens = workerPool.map_records(use_token, list(range(8)), workers=8)
+
+    assert fetch.call_count == 1
+    assert len(set(tokens)) == 1
+
+def test_token_refreshed_early_in_background():
+    """Inside the early-refresh window the current token is served while a new one is fetched"""
+    old_token = make_jwt(time.time() + 8 * 60)
+    new_token = make_jwt(time.time() + 3600)
+    manager = tokenManager.TokenManager(MagicMock(return_value=new_token))
+    manager.set_token(old_token)
+
+    assert manager.get_token() == old_token
+    manager._background.join()
+    assert manager.get_token() == new_token
+
+def test_unauthorized_request_retried_with_new_token():
+    """A 401 re-authenticates once and the request is retried transparently"""
+    client = zoominfoClient.ZoomInfoClient()
+    client.token_manager = tokenManager.TokenManager(MagicMock(return_value="fresh"))
+    client.token_manager.set_token("expired")
+
+    def fake_post(url, headers=None, **kwargs):
+        status = 200 if headers["Authorization"] == "Bearer fresh" else 401
+        return MagicMock(status_code=status)
+
+    with patch.object(client.session, 'post', side_effect=fake_post) as mock_post:
+        response = client.post("/enrich/contact", jwt_token="expired", json={})
+
+    assert response.status_code == 200
+    assert mock_post.call_count == 2
+    assert client.token_manager.jwt_token == "fresh"
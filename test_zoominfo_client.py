@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import patch, MagicMock
+import zoominfoClient
+from zoominfoClient import ZoomInfoClient
+
+@pytest.fixture
+def shared_client():
+    """Start and finish each test without a shared client"""
+    zoominfoClient.reset_client()
+    yield
+    zoominfoClient.reset_client()
+
+def test_pool_size_from_environment(monkeypatch):
+    """The connection pool size is tunable through ZOOMINFO_POOL_SIZE"""
+    monkeypatch.setenv("ZOOMINFO_POOL_SIZE", "32")
+    client = ZoomInfoClient()
+    adapter = client.session.get_adapter("https://api.zoominfo.com/enrich/contact")
+
+    assert client.pool_size == 32
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block is True
+
+def test_post_uses_session_defaults():
+    """Requests reuse the session, resolve paths and apply the default timeout"""
+    client = ZoomInfoClient(pool_size=2, timeout=(1, 2))
+    with patch.object(client.session, 'post', return_value=MagicMock(status_code=200)) as post:
+        client.post("/search/contact", jwt_token="abc", json={"rpp": 1})
+        client.post("https://api.zoominfo.com/authenticate", data="{}")
+
+    first, second = post.call_args_list
+    assert first.args[0] == "https://api.zoominfo.com/search/contact"
+    assert first.kwargs["headers"] == {"Authorization": "Bearer abc"}
+    assert first.kwargs["timeout"] == (1, 2)
+    assert second.kwargs["headers"] is None
+    assert client.session.headers["Content-Type"] == "application/json"
+
+def test_auth_headers_built_once_per_token():
+    """The Authorization header is reused until the token changes"""
+    client = ZoomInfoClient(pool_size=1)
+
+    assert client.auth_headers("a") is client.auth_headers("a")
+    assert client.auth_headers("b") == {"Authorization": "Bearer b"}
+
+def test_get_client_is_shared(shared_client):
+    """Every module gets the same client until it is reset"""
+    client = zoominfoClient.get_client(pool_size=3)
+
+    assert zoominfoClient.get_client() is client
+    assert client.pool_size == 3
+    zoominfoClient.reset_client()
+    assert zoominfoClient.get_client() is not client
+
+def test_growing_pool_leaves_old_adapter_open():
+    """Requests in flight on the old adapter are not cut off when the pool grows"""
+    client = ZoomInfoClient(pool_size=2)
+    old_adapter = client.session.get_adapter("https://api.zoominfo.com/search/contact")
+
+    with patch.object(old_adapter, 'close') as close:
+        client.ensure_pool_size(8)
+
+    close.assert_not_called()
+    new_adapter = client.session.get_adapter("https://api.zoominfo.com/search/contact")
+    assert new_adapter is not old_adapter and new_adapter._pool_maxsize == 8
@@ -0,0 +1,179 @@
+import base64
+import json
+import threading
+import time
+
+# Shared JWT token provider.
+
+# - The expiry is read from the token's `exp` claim. Tokens without one are assumed
+#   to live DEFAULT_TOKEN_LIFETIME seconds from when they were issued.
+# - get_token returns the cached token without locking while it is valid. Inside the
+#   early-refresh window a background thread replaces it before it expires, so workers
+#   never wait on the auth endpoint in steady state.
+# - When the token has expired, one caller fetches a new one and every other caller
+#   waits for that single in-flight refresh instead of authenticating again.
+# - refresh(stale_token) is used after a 401: it only re-authenticates if no other
+#   caller has already replaced the rejected token.
+
+DEFAULT_TOKEN_LIFETIME = 60 * 60
+REFRESH_MARGIN = 5 * 60
+EARLY_REFRESH_MARGIN = 10 * 60
+
+
+def decode_expiry(jwt_token):
+    """
+    Reads the `exp` claim of a JWT token without verifying its signature.
+
+    Args:
+        jwt_token (str): The JWT token.
+
+    Returns:
+        float: The expiry timestamp, or None if the token has no readable `exp` claim.
+    """
+    try:
+        payload = jwt_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """
+    Caches a JWT token and refreshes it before it expires.
+    Safe to share between worker threads.
+    """
+
+    def __init__(
+        self,
+        fetch_token,
+        refresh_margin=REFRESH_MARGIN,
+        early_refresh_margin=EARLY_REFRESH_MARGIN,
+    ):
+        """
+        Initialize the manager without a token. The first get_token call fetches one.
+
+        Args:
+            fetch_token (callable): Blocking function that authenticates and returns a new JWT token.
+            refresh_margin (float): Seconds before expiry after which callers wait for a new token.
+            early_refresh_margin (float): Seconds before expiry after which a background refresh starts.
+        """
+        self.fetch_token = fetch_token
+        self.refresh_margin = refresh_margin
+        self.early_refresh_margin = early_refresh_margin
+
+        # (token, issued_at, expires_at) swapped as one tuple so readers never see a mixed state.
+        self._state = (None, None, 0.0)
+        self._refresh_lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._background = None
+        self._background_token = None
+
+    @property
+    def jwt_token(self):
+        return self._state[0]
+
+    @property
+    def issued_at(self):
+        return self._state[1]
+
+    def set_token(self, jwt_token, issued_at=None):
+        """
+        Adopts a token that was issued outside the manager.
+
+        Args:
+            jwt_token (str): The JWT token. Ignored if None or already current.
+            issued_at (float): The timestamp the token was issued at. Defaults to now.
+        """
+        if jwt_token and jwt_token != self._state[0]:
+            self._store(jwt_token, issued_at)
+
+    def _store(self, jwt_token, issued_at=None):
+        if issued_at is None:
+            issued_at = time.time()
+        expires_at = decode_expiry(jwt_token) or issued_at + DEFAULT_TOKEN_LIFETIME
+        self._state = (jwt_token, issued_at, expires_at)
+
+    def _is_usable(self, state):
+        token, _, expires_at = state
+        return bool(token) and time.time() < expires_at - self.refresh_margin
+
+    def needs_refresh(self):
+        """
+        Returns whether the next get_token call has to wait for a new token.
+
+        Returns:
+            bool: True if there is no usable cached token.
+        """
+        return not self._is_usable(self._state)
+
+    def get_token(self):
+        """
+        Returns a valid JWT token, fetching a new one only when the cached token has expired.
+
+        Returns:
+            str: The JWT token.
+        """
+        state = self._state
+        if not self._is_usable(state):
+            return self.refresh(state[0])
+
+        if time.time() >= state[2] - self.early_refresh_margin:
+            self._start_background_refresh(state[0])
+        return state[0]
+
+    def refresh(self, stale_token=None):
+        """
+        Replaces a stale or rejected token. Concurrent callers share one refresh.
+
+        Args:
+            stale_token (str): The token the caller found unusable.
+
+        Returns:
+            str: The new JWT token.
+        """
+        with self._refresh_lock:
+            state = self._state
+            if state[0] != stale_token and self._is_usable(state):
+                return state[0]
+
+            jwt_token = self.fetch_token()
+            self._store(jwt_token)
+            return jwt_token
+
+    def invalidate(self, jwt_token):
+        """
+        Drops the cached token if it is still the given one, e.g. after a 401.
+
+        Args:
+            jwt_token (str): The rejected token.
+        """
+        with self._refresh_lock:
+            if self._state[0] == jwt_token:
+                self._state = (None, None, 0.0)
+
+    def _start_background_refresh(self, current_token):
+        with self._background_lock:
+            # One background attempt per token; if it fails, callers refresh at the margin.
+            if self._background_token == current_token:
+                return
+            self._background_token = current_token
+            self._background = threading.Thread(
+                target=self._refresh_early,
+                args=(current_token,),
+                name="token-refresh",
+                daemon=True,
+            )
+            self._background.start()
+
+    def _refresh_early(self, current_token):
+        with self._refresh_lock:
+            if self._state[0] != current_token:
+                return
+            try:
+                jwt_token = self.fetch_token()
+            except Exception:
+                return
+            if jwt_token:
+                self._store(jwt_token)
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded worker pool for record enrichment.
+
+# - Every enrichment stage is a loop of independent, I/O-bound API calls per record.
+# - map_records runs the per-record function on up to `workers` threads and returns the
+#   results in input order. With one worker it is a plain loop on the calling thread.
+
+
+def map_records(function, records, workers=1):
+    """
+    Applies function to every record using a bounded pool of worker threads.
+
+    Args:
+        function (callable): The per-record function.
+        records (list): The records to process.
+        workers (int): The maximum number of concurrent workers.
+
+    Returns:
+        list: The results of function, in the same order as records.
+    """
+    if workers <= 1 or len(records) <= 1:
+        return [function(record) for record in records]
+
+    with ThreadPoolExecutor(
+        max_workers=min(workers, len(records)), thread_name_prefix="enrich"
+    ) as executor:
+        # Executor.map yields results in submission order and re-raises worker errors.
+        return list(executor.map(function, records))
+
+
+class ProgressCounter:
+    """
+    Thread-safe counter that prints a progress line each time it is incremented.
+    """
+
+    def __init__(self, label):
+        """
+        Initialize the counter.
+
+        Args:
+            label (str): The text printed before the count.
+        """
+        self.label = label
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def increment(self, amount=1):
+        """
+        Adds to the count and prints the progress line.
+
+        Args:
+            amount (int): The number of finished records.
+        """
+        with self._lock:
+            self.count += amount
+            print(f"\r{self.label}: {self.count}", end="", flush=True)
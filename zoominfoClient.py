@@ -0,0 +1,221 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+import rateLimiter
+import responseCache
+
+# Shared HTTP client for every ZoomInfo API call.
+
+# - One requests.Session with a keep-alive connection pool, so each worker reuses an open
+#   TLS connection to api.zoominfo.com instead of handshaking for every request.
+# - The pool size comes from ZOOMINFO_POOL_SIZE (or get_client(pool_size=...)).
+# - Every request gets a default (connect, read) timeout.
+# - Authorization headers are built once per JWT token and reused.
+# - With a token manager registered, a request rejected with a 401 re-authenticates once
+#   and is retried with the new token.
+# - Every request waits its turn on the shared adaptive rate limiter. A 429 slows the
+#   limiter down, pauses it for the Retry-After, and the request is sent again.
+# - With a response cache, enrich and search requests answered in an earlier run are
+#   served from disk; batched requests only send the inputs that missed.
+# - The client lives at module scope, so warm Lambda invocations keep their connections.
+
+ZOOMINFO_BASE_URL = "https://api.zoominfo.com"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 60)
+
+
+class ZoomInfoClient:
+    """
+    Pooled, keep-alive HTTP client for the ZoomInfo API.
+    """
+
+    def __init__(
+        self,
+        pool_size=None,
+        timeout=DEFAULT_TIMEOUT,
+        base_url=ZOOMINFO_BASE_URL,
+        rate_limiter=None,
+        cache=None,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            pool_size (int): The maximum number of pooled connections. Defaults to ZOOMINFO_POOL_SIZE.
+            timeout (tuple): The default (connect, read) timeout in seconds.
+            base_url (str): The API root that relative paths are resolved against.
+            rate_limiter (AdaptiveRateLimiter): The limiter to pace requests with. Defaults to the shared one.
+            cache (ResponseCache): The response cache to use. Defaults to the shared one, if enabled.
+        """
+        if pool_size is None:
+            pool_size = int(os.environ.get("ZOOMINFO_POOL_SIZE", DEFAULT_POOL_SIZE))
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or rateLimiter.get_limiter()
+        self.cache = cache or responseCache.get_cache()
+        self.base_url = base_url.rstrip("/")
+
+        self.session = requests.Session()
+        self._mount_adapter(pool_size)
+        self.session.headers.update(
+            {"Content-Type": "application/json", "Accept": "application/json"}
+        )
+
+        # (token, headers) swapped as one tuple so concurrent workers never see a mismatched pair.
+        self._auth = (None, None)
+
+        # tokenManager.TokenManager used to replace tokens the API rejects.
+        self.token_manager = None
+
+    def _mount_adapter(self, pool_size):
+        # pool_block makes extra workers wait for a free connection instead of opening
+        # throwaway ones that are discarded after a single request.
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def ensure_pool_size(self, pool_size):
+        """
+        Grows the connection pool so that pool_size workers can each hold a connection.
+        The old adapter is not closed: threads may still have requests in flight on it,
+        and its pooled connections are released when it is garbage-collected.
+
+        Args:
+            pool_size (int): The number of concurrent workers that will share the client.
+        """
+        if pool_size > self.pool_size:
+            self.pool_size = pool_size
+            self._mount_adapter(pool_size)
+
+    def auth_headers(self, jwt_token):
+        """
+        Returns the Authorization header for a JWT token, reusing it while the token is unchanged.
+
+        Args:
+            jwt_token (str): The JWT token.
+
+        Returns:
+            dict: The request headers.
+        """
+        token, headers = self._auth
+        if jwt_token != token:
+            headers = {"Authorization": f"Bearer {jwt_token}"}
+            self._auth = (jwt_token, headers)
+        return headers
+
+    def url(self, path):
+        """
+        Resolves an API path against the base URL. Full URLs are returned unchanged.
+
+        Args:
+            path (str): The API path or URL.
+
+        Returns:
+            str: The request URL.
+        """
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def post(self, path, jwt_token=None, json=None, data=None, timeout=None):
+        """
+        Sends a POST request over the pooled session, unless the response cache answers it.
+        Throttled (429) requests are retried after the Retry-After, and a 401 is retried
+        once with a refreshed token when a token manager is registered.
+
+        Args:
+            path (str): The API path or URL.
+            jwt_token (str): The JWT token to authorize with, if any.
+            json (dict): The JSON payload.
+            data (str): A pre-serialized payload.
+            timeout: The request timeout. Defaults to the client timeout.
+
+        Returns:
+            requests.Response: The API response, or a CachedResponse served from the cache.
+        """
+        cached = None
+        if self.cache is not None and json is not None:
+            cached = self.cache.request(path, json)
+            if cached is not None:
+                if cached.payload is None:
+                    return cached.cached_response()
+                json = cached.payload
+
+        response = self._send(path, jwt_token, json, data, timeout)
+
+        if response.status_code == 401 and jwt_token and self.token_manager:
+            new_token = self.token_manager.refresh(jwt_token)
+            if new_token and new_token != jwt_token:
+                response = self._send(path, new_token, json, data, timeout)
+
+        return cached.complete(response) if cached is not None else response
+
+    def _send(self, path, jwt_token, json, data, timeout):
+        headers = self.auth_headers(jwt_token) if jwt_token else None
+
+        for attempt in range(rateLimiter.MAX_THROTTLE_RETRIES + 1):
+            self.rate_limiter.acquire()
+            response = self.session.post(
+                self.url(path),
+                json=json,
+                data=data,
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+            if response.status_code != 429:
+                self.rate_limiter.on_success()
+                return response
+
+            retry_after = rateLimiter.parse_retry_after(
+                response.headers.get("Retry-After")
+            )
+            self.rate_limiter.on_throttle(
+                rateLimiter.throttle_delay(retry_after, attempt)
+            )
+
+        return response
+
+    def close(self):
+        """
+        Closes every pooled connection.
+        """
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(pool_size=None):
+    """
+    Returns the shared ZoomInfo client, creating it on first use.
+
+    Args:
+        pool_size (int): The pool size to use if the client has not been created yet.
+
+    Returns:
+        ZoomInfoClient: The shared client.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ZoomInfoClient(pool_size=pool_size)
+    return _client
+
+
+def reset_client():
+    """
+    Closes and discards the shared client, e.g. to apply a new pool size.
+    """
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None